@@ -1,6 +1,8 @@
 # backend/api/ingest.py
-import os, re, csv, json, urllib.parse, urllib.request
-from flask import Blueprint, request, jsonify, send_from_directory
+import os, re
+from flask import Blueprint, request, jsonify
+from backend.services.meta_cache import lookup_metadata
+from backend.services.tab_parser import parse_song, model_lyrics, song_chords
 
 ingest_bp = Blueprint("ingest_bp", __name__)
 
@@ -11,7 +13,6 @@ LYRICS_DIR = os.path.join(SONGS_DIR, "lyrics")
 TABS_DIR   = os.path.join(SONGS_DIR, "tabs")
 CORE_DIR   = os.path.join(BASE_DIR, "core")
 CATALOG_CSV = os.path.join(CORE_DIR, "catalog_postgres.csv")
-META_CACHE_PATH = os.path.join(CORE_DIR, "metadata_cache.json")
 FRONTEND_DIR = os.path.join(os.path.dirname(BASE_DIR), "frontend")
 PUBLIC_DIR   = os.path.join(FRONTEND_DIR, "public")
 PUB_TABS_DIR   = os.path.join(PUBLIC_DIR, "songs", "tabs")
@@ -21,16 +22,8 @@ os.makedirs(PUB_LYRICS_DIR, exist_ok=True)
 os.makedirs(LYRICS_DIR, exist_ok=True)
 os.makedirs(TABS_DIR, exist_ok=True)
 os.makedirs(CORE_DIR, exist_ok=True)
-if not os.path.exists(META_CACHE_PATH):
-    with open(META_CACHE_PATH, "w", encoding="utf-8") as f: f.write("{}")
 
 # --- utilidades ---
-CHORD_TOKEN = r"(?:[A-G][#b]?m?(?:aj|sus|add|dim|aug|°|\+|-)?\d{0,2})"
-CHORD_IN_BRACKETS = re.compile(r"\[([A-G][#b]?[^]]{0,6})\]")
-ONLY_CHORDS_LINE  = re.compile(rf"^\s*(?:{CHORD_TOKEN}|\||/|–|-|\.)+(?:\s+{CHORD_TOKEN}|\s*[-/|.])*?\s*$")
-TIME_SIG_LINE     = re.compile(r"\b\d+/\d+\b")
-TEMPO_HINTS       = re.compile(r"(?:tempo|bpm|half|double|intro|verse|chorus|bridge)", re.I)
-
 def _slug_underscore(s: str) -> str:
     s = (s or "").strip().lower()
     s = re.sub(r"[’´`'“”\"(){}\[\],.?!:;]", "", s)
@@ -44,19 +37,6 @@ def _guess_year(lines):
         if m: return m.group(1)
     return ""
 
-def _strip_chords_to_lyrics(text: str) -> str:
-    t = CHORD_IN_BRACKETS.sub("", text)
-    out = []
-    for raw in t.splitlines():
-        ln = raw.rstrip()
-        if ONLY_CHORDS_LINE.match(ln): continue
-        if TIME_SIG_LINE.search(ln) and len(ln) < 40: continue
-        if TEMPO_HINTS.search(ln) and len(ln) < 80: continue
-        out.append(ln)
-    txt = "\n".join(out)
-    txt = re.sub(r"\n{3,}", "\n\n", txt).strip()
-    return txt
-
 def _parse_paste(text: str):
     lines = [l.rstrip() for l in text.splitlines()]
     non_empty = [l for l in lines if l.strip()]
@@ -73,7 +53,9 @@ def _parse_paste(text: str):
 
     year = _guess_year(non_empty)
     song_id = _slug_underscore(title)
-    lyrics_guess = _strip_chords_to_lyrics(text)
+    # una pasada: clasifica cada línea (acordes/letra/sección/tempo) y separa la letra
+    model = parse_song(text)
+    lyrics_guess = model_lyrics(model)
 
     return {
         "id": song_id,
@@ -83,57 +65,27 @@ def _parse_paste(text: str):
         "language": language,
         "genre": "",
         "lyrics_guess": lyrics_guess,
+        "chords": song_chords(model),
     }
 
-def _load_meta_cache():
-    try:
-        with open(META_CACHE_PATH, "r", encoding="utf-8") as f: return json.load(f)
-    except Exception:
-        return {}
-
-def _save_meta_cache(d):
-    with open(META_CACHE_PATH, "w", encoding="utf-8") as f:
-        json.dump(d, f, ensure_ascii=False, indent=2)
-
-def _http_json(url, headers=None, timeout=7):
-    req = urllib.request.Request(url, headers=headers or {"User-Agent":"PTO/1.0"})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        return json.loads(resp.read().decode("utf-8", errors="ignore"))
-
-def _score_match(qt, qa, it_title, it_artist):
-    t = (it_title or "").lower()
-    a = (it_artist or "").lower()
-    s = 0
-    if qt in t: s += 3
-    if qa and qa in a: s += 2
-    if t == qt: s += 2
-    if qa and a == qa: s += 1
-    return s
-
 def _write_text(path, content):
+    from backend.services.static_assets import assets
+    from backend.services.song_text_cache import song_texts
+    from backend.services.asset_resolver import refresh_for
     os.makedirs(os.path.dirname(path), exist_ok=True)
     with open(path, "w", encoding="utf-8") as f:
         f.write(content)
+    assets.precompress(path)  # variantes .gz/.br listas para servir
+    song_texts.invalidate(path)  # la copia en memoria (si la había) ya no vale
+    refresh_for(path)            # el resolutor por capas lo ve ya, sin esperar al sondeo
 
 def _append_catalog_row(row):
     """
-    Escribe SIEMPRE en backend/core/catalog_postgres.csv
-    - separador ';'
-    - cabecera exacta de 12 columnas PTO
-      id;name;artist;year;language;genre;popularity;duration;mood;key;tempo;enabled
+    Añade la fila al repositorio del catálogo (SQLite). Devuelve False si el id ya existe.
+    Columnas PTO: id;name;artist;year;language;genre;popularity;duration;mood;key;tempo;enabled
     """
-    header = ["id","name","artist","year","language","genre","popularity","duration","mood","key","tempo","enabled"]
-    delim = ";"
+    from backend.services.catalog_store import get_catalog
 
-    # Si no existe, crea con cabecera
-    is_new = not os.path.exists(CATALOG_CSV)
-    if is_new:
-        os.makedirs(os.path.dirname(CATALOG_CSV), exist_ok=True)
-        with open(CATALOG_CSV, "w", encoding="utf-8", newline="") as f:
-            w = csv.writer(f, delimiter=delim)
-            w.writerow(header)
-
-    # Construye la fila en el orden exacto de la cabecera
     values = {
         "id":        row.get("id",""),
         "name":      row.get("name",""),
@@ -148,10 +100,7 @@ def _append_catalog_row(row):
         "tempo":     row.get("tempo",""),
         "enabled":   row.get("enabled","Y"),
     }
-
-    with open(CATALOG_CSV, "a", encoding="utf-8", newline="") as f:
-        w = csv.writer(f, delimiter=delim)
-        w.writerow([values.get(k, "") for k in header])
+    return get_catalog().insert(values)
 
 
 # ---------- RUTAS ----------
@@ -181,62 +130,10 @@ def ingest_fetch_meta():
     if not title:
         return jsonify({"ok": False, "error": "missing_title"}), 400
 
-    key = "|".join([title.lower(), artist.lower()])
-    cache = _load_meta_cache()
-    if key in cache:
-        c = cache[key]
-        return jsonify({"ok": True, "source": c.get("source","cache"), "year": c.get("year",""), "genre": c.get("genre","")})
-
-    qt = title.lower()
-    qa = artist.lower()
-
-    # 1) iTunes
-    try:
-        q = urllib.parse.quote_plus((title + " " + artist).strip())
-        url = f"https://itunes.apple.com/search?term={q}&entity=song&limit=5"
-        data = _http_json(url)
-        best = None; best_score = -1
-        for it in data.get("results", []):
-            sc = _score_match(qt, qa, it.get("trackName",""), it.get("artistName",""))
-            if sc > best_score: best, best_score = it, sc
-        if best:
-            year = (best.get("releaseDate","") or "")[:4]
-            genre = best.get("primaryGenreName","") or ""
-            cache[key] = {"source":"itunes","year":year,"genre":genre}
-            _save_meta_cache(cache)
-            return jsonify({"ok": True, "source": "itunes", "year": year, "genre": genre})
-    except Exception:
-        pass
-
-    # 2) MusicBrainz
-    try:
-        if artist: q = f'recording:"{title}" AND artist:"{artist}"'
-        else:      q = f'recording:"{title}"'
-        url = "https://musicbrainz.org/ws/2/recording/?query=" + urllib.parse.quote(q) + "&fmt=json&limit=5"
-        data = _http_json(url, headers={"User-Agent":"PTO/1.0 (playthatone)"})
-        recs = data.get("recordings", []) or []
-        year = ""; genre = ""
-        if recs:
-            recs.sort(key=lambda r: int(r.get("score", 0)), reverse=True)
-            r0 = recs[0]
-            year = (r0.get("first-release-date","") or "")[:4]
-            if not year and r0.get("releases"):
-                for rel in r0["releases"]:
-                    d = rel.get("date","")
-                    if d and len(d)>=4: year = d[:4]; break
-            tags = r0.get("tags") or []
-            if tags:
-                tags.sort(key=lambda t: int(t.get("count",1)), reverse=True)
-                genre = tags[0].get("name","")
-        cache[key] = {"source":"musicbrainz","year":year,"genre":genre}
-        _save_meta_cache(cache)
-        return jsonify({"ok": True, "source": "musicbrainz", "year": year, "genre": genre})
-    except Exception:
-        pass
-
-    cache[key] = {"source":"none","year":"","genre":""}
-    _save_meta_cache(cache)
-    return jsonify({"ok": True, "source": "none", "year": "", "genre": ""})
+    # caché compartida (LRU + TTL); consultas iguales simultáneas comparten la petición
+    entry, cached = lookup_metadata(title, artist)
+    source = entry.get("source", "cache") if cached else entry["source"]
+    return jsonify({"ok": True, "source": source, "year": entry.get("year", ""), "genre": entry.get("genre", "")})
 
 @ingest_bp.route("/songs/ingest/create", methods=["POST"])
 def ingest_create():
@@ -261,11 +158,7 @@ def ingest_create():
     if os.path.exists(tab_path) or os.path.exists(lyr_path):
         return jsonify({"ok": False, "error": "id_exists", "id": sid}), 409
 
-    # guardar tablatura y letra
-    _write_text(tab_path, pasted)
-    _write_text(lyr_path, lyrics_g)
-
-    # fila de catálogo (solo 'name', no 'title')
+    # fila de catálogo (solo 'name', no 'title'); el INSERT reserva el id antes de escribir ficheros
     row = {
         "id": sid,
         "name": title,
@@ -275,45 +168,58 @@ def ingest_create():
         "genre": genre,
         "enabled": "Y",
     }
-    _append_catalog_row(row)
+    if not _append_catalog_row(row):
+        return jsonify({"ok": False, "error": "id_exists", "id": sid}), 409
 
-    # intentar regenerar catálogo automáticamente
-    updated = False
+    # guardar tablatura y letra
+    _write_text(tab_path, pasted)
+    _write_text(lyr_path, lyrics_g)
+
+    # catalog.json se regenera automáticamente con la mutación del repositorio
     try:
-        from backend.core.gen_catalog import generate_catalog  # si existe
-        generate_catalog()
-        updated = True
+        from backend.services.catalog_pipeline import get_catalog_pipeline
+        updated = get_catalog_pipeline().entry(sid) is not None
     except Exception:
-        pass
+        updated = False
 
-    return jsonify({"ok": True, "id": sid, "updated_catalog": updated, "csv_path": CATALOG_CSV})
+    return jsonify({"ok": True, "id": sid, "updated_catalog": updated})
     
 @ingest_bp.route("/songs/ingest/debug_catalog", methods=["GET"])
 def ingest_debug_catalog():
+    # Solo lectura: el catálogo vive en SQLite; el CSV se exporta con POST /songs/ingest/export_catalog
+    from backend.services.catalog_store import get_catalog
+    repo = get_catalog()
     info = {
-        "path": CATALOG_CSV,
-        "exists": os.path.exists(CATALOG_CSV),
-        "size": os.path.getsize(CATALOG_CSV) if os.path.exists(CATALOG_CSV) else 0,
+        "version": repo.version(),
+        "rows": repo.count(),
         "head": "",
         "tail": "",
+        "csv": {
+            "path": CATALOG_CSV,
+            "exists": os.path.exists(CATALOG_CSV),
+            "size": os.path.getsize(CATALOG_CSV) if os.path.exists(CATALOG_CSV) else 0,
+        },
     }
     try:
-        with open(CATALOG_CSV, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        info["head"] = "".join(lines[:2]).strip()   # cabecera + 1a fila
-        info["tail"] = "".join(lines[-2:]).strip()  # últimas 2 filas
+        rows = repo.all()
+        info["head"] = rows[0] if rows else ""   # 1a fila
+        info["tail"] = rows[-2:]                 # últimas 2 filas
     except Exception as e:
         info["error"] = str(e)
     return jsonify(info)
-    
-# Servir TABs y Lyrics desde backend/songs/*
-@ingest_bp.route("/songs/tabs/<path:filename>", methods=["GET"])
-def serve_tab_file(filename):
-    return send_from_directory(TABS_DIR, filename)
 
-@ingest_bp.route("/songs/lyrics/<path:filename>", methods=["GET"])
-def serve_lyrics_file(filename):
-    return send_from_directory(LYRICS_DIR, filename)
+@ingest_bp.route("/songs/ingest/export_catalog", methods=["POST"])
+def ingest_export_catalog():
+    from backend.services.catalog_store import get_catalog
+    repo = get_catalog()
+    try:
+        path = repo.export_csv(CATALOG_CSV)
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
+    return jsonify({"ok": True, "path": path, "version": repo.version(), "rows": repo.count(),
+                    "size": os.path.getsize(path)})
+    
+# TABs y Lyrics (también backend/songs/*) los sirve main.py con el resolutor por capas
 
 from flask import jsonify  # arriba ya tienes imports de Flask; si falta, déjalo aquí
 
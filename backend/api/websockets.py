@@ -5,32 +5,87 @@ import os
 
 # Import robusto de helpers (funciona tanto en local como en Render)
 try:
-    from backend.services.vote_logic import count_votes, save_votes, load_votes
+    from backend.services.vote_logic import vote_store, store_backend
+    from backend.services.broadcast import UpdateBroadcaster
+    from backend.core import config
+    from backend.core.config import UPDATE_WINDOW_MS, UPDATE_MAX_LATENCY_MS
+    from backend.services.rate_limit import TokenBucketLimiter, allow_all, client_ip
+    from backend.services.metrics import (
+        VOTE_SECONDS, VOTES_TOTAL, EMIT_SECONDS, EMIT_FANOUT, SOCKETS_CONNECTED,
+    )
 except Exception:
     try:
-        from ..services.vote_logic import count_votes, save_votes, load_votes  # type: ignore
+        from ..services.vote_logic import vote_store, store_backend  # type: ignore
+        from ..services.broadcast import UpdateBroadcaster  # type: ignore
+        from ..core import config  # type: ignore
+        from ..core.config import UPDATE_WINDOW_MS, UPDATE_MAX_LATENCY_MS  # type: ignore
+        from ..services.rate_limit import TokenBucketLimiter, allow_all, client_ip  # type: ignore
+        from ..services.metrics import (  # type: ignore
+            VOTE_SECONDS, VOTES_TOTAL, EMIT_SECONDS, EMIT_FANOUT, SOCKETS_CONNECTED,
+        )
     except Exception as e:
         raise
 
-# No importes config aquí; vote_logic ya resuelve rutas y persistencia
+# De config solo se leen parámetros de difusión; vote_logic ya resuelve rutas y persistencia
 socketio = SocketIO(cors_allowed_origins="*")
 
-# Estado en memoria (mapa device_id -> song_id)
-song_states = load_votes()
+def _fanout(to):
+    """Destinatarios locales de un emit (sin sala = todos los conectados a este worker)."""
+    if to is None:
+        return SOCKETS_CONNECTED.value
+    try:
+        return sum(1 for _ in socketio.server.manager.get_participants("/", to))
+    except Exception:
+        return 0
 
-@socketio.on("vote")
-def handle_vote(data):
-    device_id = data.get("deviceId")
-    song_id = data.get("songId")
-    if not device_id or not song_id:
-        return
+def instrumented_emit(event, data=None, to=None, **kwargs):
+    """socketio.emit con tamaño de fan-out y duración en /metrics."""
+    EMIT_FANOUT.labels(event=event).observe(_fanout(to))
+    with EMIT_SECONDS.labels(event=event).time():
+        return socketio.emit(event, data, to=to, **kwargs)
 
-    prev = song_states.get(device_id)
-    if prev == song_id:
-        return  # idempotente
+@socketio.on("connect")
+def handle_connect(auth=None):
+    SOCKETS_CONNECTED.inc()
+
+@socketio.on("disconnect")
+def handle_disconnect(*args):
+    SOCKETS_CONNECTED.dec()
 
-    song_states[device_id] = song_id
-    save_votes(song_states)
+# Deltas versionados del evento "update", agrupados por ventana (un frame por sala)
+updates = UpdateBroadcaster(
+    instrumented_emit,
+    window=UPDATE_WINDOW_MS / 1000.0,
+    max_latency=UPDATE_MAX_LATENCY_MS / 1000.0,
+    start_task=socketio.start_background_task,
+    sleep=socketio.sleep,
+    sequence=store_backend.sequence,
+    recount=lambda ids: {sid: vote_store.count(sid) for sid in ids},
+)
 
-    vote_counts = count_votes(song_states)
-    socketio.emit("update", vote_counts)
+# Votos: por deviceId (cliente que martillea); por IP solo si se configura (muchos deviceId
+# falsos desde fuera), porque en la sala todos comparten la IP del wifi
+vote_device_limiter = TokenBucketLimiter(config.RATE_VOTE_DEVICE_RATE, config.RATE_VOTE_DEVICE_BURST,
+                                         max_keys=config.RATE_LIMIT_MAX_KEYS, name="vote", scope="device")
+vote_ip_limiter = TokenBucketLimiter(config.RATE_VOTE_IP_RATE, config.RATE_VOTE_IP_BURST,
+                                     max_keys=config.RATE_LIMIT_MAX_KEYS, name="vote",
+                                     scope="ip") if config.RATE_VOTE_IP_RATE > 0 else None
+
+def allow_vote(device_id):
+    """True si el voto entra en los límites (se llama dentro del handler de Socket.IO)."""
+    if vote_ip_limiter is None:
+        return vote_device_limiter.allow(device_id)
+    return allow_all((vote_ip_limiter, client_ip()), (vote_device_limiter, device_id))
+
+@VOTE_SECONDS.time()
+def apply_vote(device_id, song_id):
+    """Registra el voto y difunde solo los recuentos que cambian."""
+    prev = vote_store.set(device_id, song_id)
+    if prev == song_id:
+        VOTES_TOTAL.labels(result="unchanged").inc()
+        return None  # idempotente
+    VOTES_TOTAL.labels(result="changed").inc()
+    counts = {song_id: vote_store.count(song_id)}
+    if prev is not None:
+        counts[prev] = vote_store.count(prev)
+    return updates.publish(counts=counts)
@@ -0,0 +1 @@
+# needed for package discovery
@@ -0,0 +1,324 @@
+# backend/bench/loadtest.py
+"""
+Banco de carga para votación, broadcast y endpoints de catálogo.
+
+Arranca create_app() en un subproceso (eventlet, como en producción con
+`gunicorn -k eventlet -w 1`) sobre un CORE_DIR temporal, simula N clientes
+Socket.IO que emiten `vote` y `update_request`, martillea los endpoints HTTP
+y guarda los resultados en JSON para comparar entre versiones.
+
+Uso:
+    python -m backend.bench.loadtest --clients 200 --votes 5 --out bench_results/
+
+Requiere el cliente de python-socketio: pip install "python-socketio[client]"
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import random
+import socket
+import argparse
+import importlib.util
+import tempfile
+import subprocess
+import threading
+import statistics
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+HTTP_ENDPOINTS = ["/votes/counts.json", "/catalog/catalog.json", "/list-songs", "/proposals"]
+
+
+# ---------- utilidades ----------
+def percentiles(samples):
+    if not samples:
+        return {"n": 0}
+    s = sorted(samples)
+
+    def pick(p):
+        return s[min(len(s) - 1, max(0, int(round(p / 100.0 * len(s))) - 1))]
+    return {
+        "n": len(s),
+        "mean_ms": round(statistics.fmean(s) * 1000, 3),
+        "p50_ms": round(pick(50) * 1000, 3),
+        "p95_ms": round(pick(95) * 1000, 3),
+        "p99_ms": round(pick(99) * 1000, 3),
+        "max_ms": round(s[-1] * 1000, 3),
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def git_rev():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+# ---------- servidor ----------
+def serve(port):
+    import eventlet
+    eventlet.monkey_patch()
+    sys.path.insert(0, PROJECT_ROOT)
+    from backend import main
+    main.socketio.run(main.app, host="127.0.0.1", port=port, log_output=False)
+
+
+def start_server(port, workdir):
+    env = dict(os.environ)
+    env["CORE_DIR"] = workdir
+    csv_copy = os.path.join(workdir, "catalog_postgres.csv")
+    shutil.copy(os.path.join(PROJECT_ROOT, "backend", "core", "catalog_postgres.csv"), csv_copy)
+    env["CATALOG_CSV"] = csv_copy
+    # nada del servidor medido escribe en el checkout: catálogo, propuestas y medios al workdir
+    env["CATALOG_JSON"] = os.path.join(workdir, "catalog", "catalog.json")
+    env["PROPOSALS_FILE"] = os.path.join(workdir, "proposals", "proposals.json")
+    env["MEDIA_DIR"] = workdir
+    # todos los clientes simulados salen de 127.0.0.1: se mide el servidor, no el limitador
+    for k in ("RATE_VOTE_IP_RATE", "RATE_VOTE_IP_BURST", "RATE_VOTE_DEVICE_RATE", "RATE_VOTE_DEVICE_BURST"):
+        env.setdefault(k, "1000000")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "backend.bench.loadtest", "--serve", "--port", str(port)],
+        cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/votes/counts.json", timeout=1).read()
+            return proc
+        except Exception:
+            if proc.poll() is not None:
+                raise RuntimeError("el servidor terminó al arrancar")
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("el servidor no respondió a tiempo")
+
+
+# ---------- fases ----------
+def connect_clients(base, n, song_ids):
+    import socketio
+
+    clients = []
+    connect_lat = []
+    probes = {}            # probe_song -> [t_llegada,...]
+    lock = threading.Lock()
+
+    def make():
+        c = socketio.Client(reconnection=False)
+
+        @c.on("update")
+        def _update(data):
+            now = time.perf_counter()
+            with lock:
+                for sid in (data.get("counts") or {}):
+                    if sid in probes:
+                        probes[sid].append(now)
+        t0 = time.perf_counter()
+        c.connect(base, transports=["websocket"], wait_timeout=20)
+        connect_lat.append(time.perf_counter() - t0)
+        return c
+
+    with ThreadPoolExecutor(max_workers=min(64, n)) as ex:
+        clients = list(ex.map(lambda _: make(), range(n)))
+    return clients, connect_lat, probes, lock
+
+
+def vote_phase(clients, votes_per_client, song_ids):
+    lat = []
+    lock = threading.Lock()
+
+    def run(c):
+        device = "bench_" + uuid.uuid4().hex[:10]
+        out = []
+        for _ in range(votes_per_client):
+            t0 = time.perf_counter()
+            c.call("vote", {"deviceId": device, "songId": random.choice(song_ids)}, timeout=30)
+            out.append(time.perf_counter() - t0)
+        with lock:
+            lat.extend(out)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(clients)) as ex:
+        list(ex.map(run, clients))
+    elapsed = time.perf_counter() - t0
+    return lat, elapsed
+
+
+def update_request_phase(clients, rounds):
+    lat = []
+    for _ in range(rounds):
+        for c in clients:
+            t0 = time.perf_counter()
+            c.call("update_request", {"deviceId": "bench"}, timeout=30)
+            lat.append(time.perf_counter() - t0)
+    return lat
+
+
+def fanout_phase(clients, probes, lock, rounds):
+    """Retardo desde que un cliente vota hasta que cada cliente recibe el update con ese voto."""
+    delays = []
+    complete = 0
+    for k in range(rounds):
+        probe = f"__bench_probe_{k}_{uuid.uuid4().hex[:6]}"
+        with lock:
+            probes[probe] = []
+        t0 = time.perf_counter()
+        clients[0].emit("vote", {"deviceId": f"bench_probe_{k}", "songId": probe})
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            with lock:
+                if len(probes[probe]) >= len(clients):
+                    break
+            time.sleep(0.005)
+        with lock:
+            arrivals = list(probes.pop(probe))
+        if len(arrivals) >= len(clients):
+            complete += 1
+        delays.extend(t - t0 for t in arrivals)
+    return delays, complete
+
+
+def http_phase(base, requests_per_endpoint, concurrency):
+    results = {}
+    for path in HTTP_ENDPOINTS:
+        url = base + path
+        lat = []
+        errors = 0
+
+        def hit(_):
+            t0 = time.perf_counter()
+            try:
+                req = urllib.request.Request(url, headers={"Accept-Encoding": "gzip"})
+                with urllib.request.urlopen(req, timeout=30) as r:
+                    r.read()
+                return time.perf_counter() - t0
+            except Exception:
+                return None
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as ex:
+            for v in ex.map(hit, range(requests_per_endpoint)):
+                if v is None:
+                    errors += 1
+                else:
+                    lat.append(v)
+        elapsed = time.perf_counter() - t0
+        results[path] = {**percentiles(lat), "errors": errors,
+                         "throughput_rps": round(len(lat) / elapsed, 1) if elapsed else None}
+    return results
+
+
+# ---------- main ----------
+def run(args):
+    if importlib.util.find_spec("socketio") is None:
+        sys.exit('Benchmark omitido: falta el cliente Socket.IO (pip install "python-socketio[client]")')
+
+    with open(os.path.join(PROJECT_ROOT, "frontend", "public", "catalog", "catalog.json"), encoding="utf-8") as f:
+        song_ids = [s["id"] for s in json.load(f)] or ["imagine"]
+
+    workdir = tempfile.mkdtemp(prefix="pto_bench_")
+    port = args.port or free_port()
+    base = f"http://127.0.0.1:{port}"
+    proc = start_server(port, workdir)
+    try:
+        rss_start = rss_kb(proc.pid)
+        clients, connect_lat, probes, lock = connect_clients(base, args.clients, song_ids)
+        vote_lat, vote_elapsed = vote_phase(clients, args.votes, song_ids)
+        time.sleep(1.0)  # deja vaciar la ventana de agrupación
+        fanout, complete = fanout_phase(clients, probes, lock, args.probes)
+        upd_lat = update_request_phase(clients, 1)
+        http = http_phase(base, args.requests, args.concurrency)
+        try:
+            bstats = json.loads(urllib.request.urlopen(base + "/votes/broadcast_stats.json", timeout=5).read())
+        except Exception:
+            bstats = None
+        rss_end = rss_kb(proc.pid)
+        for c in clients:
+            try:
+                c.disconnect()
+            except Exception:
+                pass
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except Exception:
+            proc.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    total_votes = len(vote_lat)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_rev": git_rev(),
+            "python": sys.version.split()[0],
+            "clients": args.clients,
+            "votes_per_client": args.votes,
+            "probes": args.probes,
+            "http_requests_per_endpoint": args.requests,
+            "http_concurrency": args.concurrency,
+        },
+        "socket": {
+            "connect": percentiles(connect_lat),
+            "vote": {**percentiles(vote_lat),
+                     "throughput_vps": round(total_votes / vote_elapsed, 1) if vote_elapsed else None},
+            "update_request": percentiles(upd_lat),
+            "broadcast_fanout": {**percentiles(fanout), "probes_complete": complete},
+            "broadcast_stats": bstats,
+        },
+        "http": http,
+        "server_rss_kb": {"start": rss_start, "end": rss_end},
+    }
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    out = args.out
+    if out:
+        if out.endswith(os.sep) or os.path.isdir(out):
+            os.makedirs(out, exist_ok=True)
+            out = os.path.join(out, f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"✅ resultados guardados en {out}")
+    return report
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Banco de carga PTO (votos, broadcast, catálogo)")
+    ap.add_argument("--clients", type=int, default=100, help="clientes Socket.IO simultáneos")
+    ap.add_argument("--votes", type=int, default=5, help="votos por cliente")
+    ap.add_argument("--probes", type=int, default=10, help="sondas para medir el retardo de fan-out")
+    ap.add_argument("--requests", type=int, default=200, help="peticiones HTTP por endpoint")
+    ap.add_argument("--concurrency", type=int, default=20, help="concurrencia HTTP")
+    ap.add_argument("--out", default="bench_results/", help="fichero o carpeta para el JSON de resultados")
+    ap.add_argument("--port", type=int, default=0)
+    ap.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    if args.serve:
+        serve(args.port)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
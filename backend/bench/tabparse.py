@@ -0,0 +1,133 @@
+# backend/bench/tabparse.py
+"""
+Banco del parser de tabs sobre el corpus songs/tabs.
+
+Compara el limpiador de letra anterior (regex por línea, incluida
+ONLY_CHORDS_LINE) con backend.services.tab_parser, en frío (caché del
+clasificador vacía) y en caliente, y mide el escalado con líneas patológicas
+("A-A-A-...!") que disparan el backtracking exponencial de la regex antigua.
+
+Uso:
+    python -m backend.bench.tabparse --rounds 20 --out bench_results/
+"""
+import os
+import re
+import sys
+import glob
+import json
+import time
+import argparse
+import statistics
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.services import tab_parser  # noqa: E402
+
+# ---------- implementación anterior (backend/api/ingest.py) ----------
+CHORD_TOKEN = r"(?:[A-G][#b]?m?(?:aj|sus|add|dim|aug|°|\+|-)?\d{0,2})"
+CHORD_IN_BRACKETS = re.compile(r"\[([A-G][#b]?[^]]{0,6})\]")
+ONLY_CHORDS_LINE = re.compile(rf"^\s*(?:{CHORD_TOKEN}|\||/|–|-|\.)+(?:\s+{CHORD_TOKEN}|\s*[-/|.])*?\s*$")
+TIME_SIG_LINE = re.compile(r"\b\d+/\d+\b")
+TEMPO_HINTS = re.compile(r"(?:tempo|bpm|half|double|intro|verse|chorus|bridge)", re.I)
+
+
+def legacy_lyrics(text):
+    t = CHORD_IN_BRACKETS.sub("", text)
+    out = []
+    for raw in t.splitlines():
+        ln = raw.rstrip()
+        if ONLY_CHORDS_LINE.match(ln): continue
+        if TIME_SIG_LINE.search(ln) and len(ln) < 40: continue
+        if TEMPO_HINTS.search(ln) and len(ln) < 80: continue
+        out.append(ln)
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(out)).strip()
+
+
+def new_parse(text):
+    tab_parser.parse_song(text)
+    return tab_parser.lyrics_only(text)
+
+
+# ---------- medición ----------
+def timed(fn, arg, rounds, cold=False):
+    samples = []
+    for _ in range(rounds):
+        if cold:
+            tab_parser.classify_line.cache_clear()
+        t0 = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def summary(samples):
+    s = sorted(samples)
+    return {"n": len(s), "median_ms": round(statistics.median(s) * 1000, 3),
+            "min_ms": round(s[0] * 1000, 3), "max_ms": round(s[-1] * 1000, 3)}
+
+
+def load_corpus(pattern):
+    files = sorted(glob.glob(pattern))
+    texts = []
+    for p in files:
+        with open(p, encoding="utf-8", errors="ignore") as f:
+            texts.append(f.read())
+    return files, texts
+
+
+def run(args):
+    files, texts = load_corpus(os.path.join(PROJECT_ROOT, "songs", "tabs", "*.txt"))
+    corpus = "\n".join(texts)
+    lines = corpus.count("\n") + 1
+
+    report = {
+        "meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "files": len(files),
+                 "lines": lines, "bytes": len(corpus.encode("utf-8")), "rounds": args.rounds},
+        "corpus": {
+            "legacy": summary(timed(lambda _: [legacy_lyrics(t) for t in texts], None, args.rounds)),
+            "new_cold": summary(timed(lambda _: [new_parse(t) for t in texts], None, args.rounds, cold=True)),
+            "new_warm": summary(timed(lambda _: [new_parse(t) for t in texts], None, args.rounds)),
+        },
+        "classifier_cache": tab_parser.classify_line.cache_info()._asdict(),
+        "pathological": [],
+    }
+
+    # Línea "A-A-A-...!": la regex antigua crece ~x2 por cada 2 caracteres
+    for n in args.sizes:
+        line = "A-" * n + "!"
+        row = {"tokens": n, "chars": len(line),
+               "new_ms": summary(timed(new_parse, line, 5, cold=True))["median_ms"]}
+        if n <= args.legacy_max:
+            row["legacy_ms"] = summary(timed(legacy_lyrics, line, 1))["median_ms"]
+        report["pathological"].append(row)
+    # Letra enorme (lineal en tamaño)
+    for k in (1, 4, 16):
+        big = corpus * k
+        report["pathological"].append({"corpus_x": k, "chars": len(big),
+                                       "new_ms": summary(timed(new_parse, big, 3, cold=True))["median_ms"]})
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.out:
+        out = args.out
+        if out.endswith(os.sep) or os.path.isdir(out):
+            os.makedirs(out, exist_ok=True)
+            out = os.path.join(out, f"tabparse_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"✅ resultados guardados en {out}")
+    return report
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Banco del parser de tabs")
+    ap.add_argument("--rounds", type=int, default=20)
+    ap.add_argument("--sizes", type=int, nargs="*", default=[8, 12, 16, 18, 1000, 10000, 100000])
+    ap.add_argument("--legacy-max", type=int, default=18, help="tamaño máximo a probar con la regex antigua")
+    ap.add_argument("--out", default="bench_results/")
+    run(ap.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
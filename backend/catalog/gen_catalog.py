@@ -1,42 +1,91 @@
+import os
 import csv
+import sys
 import json
+import time
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))  # para `backend.*` al ejecutarlo como script
 INPUT_CSV = PROJECT_ROOT / 'backend/core/catalog_postgres.csv'
-OUTPUT_JSON = PROJECT_ROOT / 'frontend/public/catalog/catalog.json'
+try:
+    from backend.core.config import CATALOG_JSON
+    OUTPUT_JSON = Path(CATALOG_JSON)
+except Exception:
+    OUTPUT_JSON = PROJECT_ROOT / 'frontend/public/catalog/catalog.json'  # script suelto
+
+try:
+    from backend.services.metrics import FILE_IO_SECONDS
+except Exception:
+    FILE_IO_SECONDS = None  # script suelto sin el paquete backend
 
 REQUIRED_FIELDS = {'id', 'name'}
-OPTIONAL_FIELDS = {'artist', 'state', 'year', 'language', 'genre'}
+# tupla, no set: el orden de las claves debe ser estable entre procesos (mismo catalog.json byte a byte)
+OPTIONAL_FIELDS = ('artist', 'year', 'language', 'genre', 'state')
 
-def generate_catalog():
-    catalog = []
+def _read_rows():
+    """Filas del catálogo: repositorio SQLite si está disponible, si no el CSV."""
+    try:
+        from backend.services.catalog_store import get_catalog
+        return get_catalog().all()
+    except Exception:
+        with INPUT_CSV.open(newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f, delimiter=';'))  # Delimitador correcto
+
+def song_entry(row):
+    """Entrada de catalog.json para una fila del catálogo (None si no se publica)."""
+    if (row.get('enabled') or 'Y').strip().upper() == 'N':
+        return None
+    if not all(row.get(field) for field in REQUIRED_FIELDS):
+        return None
 
-    with INPUT_CSV.open(newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f, delimiter=';')  # Delimitador correcto
-        for row in reader:
-            if (row.get('enabled') or 'Y').strip().upper() == 'N':
-                continue
-            if not all(row.get(field) for field in REQUIRED_FIELDS):
-                continue
+    song = {
+        'id': row['id'].strip(),
+        'title': row['name'].strip()  # 'name' viene del CSV, 'title' es para el JSON
+    }
 
-            song = {
-                'id': row['id'].strip(),
-                'title': row['name'].strip()  # 'name' viene del CSV, 'title' es para el JSON
-            }
+    for field in OPTIONAL_FIELDS:
+        value = row.get(field)
+        if value:
+            song[field] = value.strip()
+    return song
 
-            for field in OPTIONAL_FIELDS:
-                value = row.get(field)
-                if value:
-                    song[field] = value.strip()
+def write_catalog(catalog, output=OUTPUT_JSON):
+    """
+    Escritura atómica de catalog.json (tmp + os.replace). Si el contenido es
+    idéntico al del disco no se toca (el fichero está versionado en git).
+    Devuelve True si se escribió.
+    """
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
+    body = json.dumps(catalog, ensure_ascii=False, separators=(',', ':')).encode('utf-8')  # compacto: lo descargan todos los móviles
+    try:
+        if output.stat().st_size == len(body) and output.read_bytes() == body:
+            return False
+    except OSError:
+        pass
+    tmp = output.with_name(f'{output.name}.{os.getpid()}.tmp')
+    tmp.write_bytes(body)
+    os.replace(tmp, output)
+    if FILE_IO_SECONDS is not None:
+        FILE_IO_SECONDS.labels(file=output.name, op='save').observe(time.perf_counter() - t0)
+    return True
+
+def generate_catalog(rows=None, output=OUTPUT_JSON):
+    """Reconstrucción completa de catalog.json. Devuelve la lista generada."""
+    catalog = []
 
+    for row in (_read_rows() if rows is None else rows):
+        song = song_entry(row)
+        if song:
             catalog.append(song)
 
-    OUTPUT_JSON.parent.mkdir(parents=True, exist_ok=True)
-    with OUTPUT_JSON.open('w', encoding='utf-8') as f:
-        json.dump(catalog, f, indent=2, ensure_ascii=False)
+    write_catalog(catalog, output)
 
     print(f'✅ catalog.json generated with {len(catalog)} songs.')
+    return catalog
 
 if __name__ == '__main__':
     generate_catalog()
\ No newline at end of file
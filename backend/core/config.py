@@ -11,6 +11,88 @@ os.makedirs(CORE_DIR, exist_ok=True)
 # Rutas usadas por el resto del código
 VOTES_FILE = os.path.join(CORE_DIR, "votes.json")
 SONG_STATES_FILE = os.path.join(CORE_DIR, "song_states.json")
+# Catálogo: SQLite en el Disk; el CSV del repo es solo importación/exportación
+CATALOG_CSV = os.environ.get("CATALOG_CSV", os.path.join(os.path.dirname(__file__), "catalog_postgres.csv"))
+CATALOG_DB = os.environ.get("CATALOG_DB", os.path.join(CORE_DIR, "catalog.sqlite3"))
+# Cambios de catálogo que se conservan para /catalog/changes?since= (más antiguos: recarga completa)
+CATALOG_CHANGELOG_KEEP = int(os.environ.get("CATALOG_CHANGELOG_KEEP", "1000"))
+PROPOSALS_FILE = os.environ.get(
+    "PROPOSALS_FILE", os.path.join(os.path.dirname(os.path.dirname(__file__)), "proposals", "proposals.json"))
+os.makedirs(os.path.dirname(PROPOSALS_FILE), exist_ok=True)
+# catalog.json publicado (versionado en el repo) y carpeta de letras/tabs/imágenes (backend/core);
+# configurables para que el benchmark no escriba en el checkout que mide
+CATALOG_JSON = os.environ.get(
+    "CATALOG_JSON", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+                                 "frontend", "public", "catalog", "catalog.json"))
+MEDIA_DIR = os.environ.get("MEDIA_DIR", os.path.dirname(__file__))
+
+# Backend de estado compartido: "memory" (1 worker, JSON en disco) o "sqlite" (N workers)
+STORE_BACKEND = os.environ.get("PTO_STORE_BACKEND", "memory").strip().lower()
+SQLITE_STORE_PATH = os.environ.get("PTO_SQLITE_STORE", os.path.join(CORE_DIR, "pto_state.sqlite3"))
+# Cola de mensajes de Socket.IO: URL redis://, kafka://, amqp://... (opcional).
+# Con el backend sqlite y sin URL se usa la propia base SQLite como cola.
+MESSAGE_QUEUE_URL = os.environ.get("PTO_MESSAGE_QUEUE", "").strip()
+
+# Volcado diferido de votos: cada N segundos o al acumular N cambios
+VOTES_FLUSH_INTERVAL = float(os.environ.get("VOTES_FLUSH_INTERVAL", "1.0"))
+VOTES_FLUSH_THRESHOLD = int(os.environ.get("VOTES_FLUSH_THRESHOLD", "500"))
+
+# Caché de metadatos (iTunes/MusicBrainz): LRU en memoria, TTL en segundos
+META_CACHE_FILE = os.environ.get("META_CACHE_FILE", os.path.join(CORE_DIR, "metadata_cache.json"))
+META_CACHE_MAX_ENTRIES = int(os.environ.get("META_CACHE_MAX_ENTRIES", "5000"))
+META_CACHE_HIT_TTL = float(os.environ.get("META_CACHE_HIT_TTL", str(30 * 86400)))
+META_CACHE_NEGATIVE_TTL = float(os.environ.get("META_CACHE_NEGATIVE_TTL", "86400"))
+
+# Enriquecimiento masivo de metadatos: concurrencia, ritmo por proveedor (req/s) y,
+# para pruebas, URL base de un servidor falso que sustituye a iTunes/MusicBrainz
+ENRICH_CONCURRENCY = int(os.environ.get("ENRICH_CONCURRENCY", "8"))
+ENRICH_ITUNES_RATE = float(os.environ.get("ENRICH_ITUNES_RATE", str(20 / 60)))
+ENRICH_MUSICBRAINZ_RATE = float(os.environ.get("ENRICH_MUSICBRAINZ_RATE", "1"))
+ENRICH_PROVIDER_BASE = os.environ.get("ENRICH_PROVIDER_BASE", "").strip()
+
+# Miniaturas de artistas: cajas "ancho x alto", formatos (los que soporte Pillow) y procesos del pool
+THUMB_SIZES = [tuple(int(n) for n in box.split("x")) for box in
+               os.environ.get("THUMB_SIZES", "200x150,400x300,800x600").split(",") if box.strip()]
+THUMB_FORMATS = [f.strip().lower() for f in os.environ.get("THUMB_FORMATS", "webp,avif,jpeg").split(",") if f.strip()]
+THUMB_WORKERS = int(os.environ.get("THUMB_WORKERS", "2"))
+
+# Variantes transpuestas de los tabs (?transpose=&capo=&notation=)
+CHART_CACHE_ENTRIES = int(os.environ.get("CHART_CACHE_ENTRIES", "256"))
+
+# Letras/tabs/imágenes por capas (Disk → ingest → repo): cada cuánto se comprueba el mtime de las carpetas
+ASSET_POLL_SECONDS = float(os.environ.get("ASSET_POLL_SECONDS", "2"))
+# Letras/tabs en memoria (texto + gzip/br): presupuesto total y tamaño máximo por fichero
+# (los mayores se sirven con sendfile); SONG_TEXT_PRELOAD=0 para cargarlas al primer uso
+SONG_TEXT_CACHE_MB = float(os.environ.get("SONG_TEXT_CACHE_MB", "32"))
+SONG_TEXT_MAX_FILE_KB = int(os.environ.get("SONG_TEXT_MAX_FILE_KB", "256"))
+SONG_TEXT_PRELOAD = os.environ.get("SONG_TEXT_PRELOAD", "1") == "1"
+
+# Precarga para inter.html: tabs de las K canciones más votadas aún sin tocar; los de más
+# de PREFETCH_MAX_KB solo viajan como URL con hash
+PREFETCH_TOP_K = int(os.environ.get("PREFETCH_TOP_K", "3"))
+PREFETCH_MAX_KB = int(os.environ.get("PREFETCH_MAX_KB", "32"))
+
+# Propuestas: journal append-only compactado en proposals.json cada N segundos o N registros
+PROPOSALS_COMPACT_INTERVAL = float(os.environ.get("PROPOSALS_COMPACT_INTERVAL", "60"))
+PROPOSALS_COMPACT_THRESHOLD = int(os.environ.get("PROPOSALS_COMPACT_THRESHOLD", "1000"))
+
+# Límites por token bucket (fichas/segundo y ráfaga). Por IP más holgado: en la sala
+# muchos móviles comparten la IP pública del wifi
+RATE_PROPOSAL_DEVICE_RATE = float(os.environ.get("RATE_PROPOSAL_DEVICE_RATE", str(1 / 30)))
+RATE_PROPOSAL_DEVICE_BURST = float(os.environ.get("RATE_PROPOSAL_DEVICE_BURST", "1"))
+RATE_PROPOSAL_IP_RATE = float(os.environ.get("RATE_PROPOSAL_IP_RATE", "0.2"))
+RATE_PROPOSAL_IP_BURST = float(os.environ.get("RATE_PROPOSAL_IP_BURST", "10"))
+RATE_VOTE_DEVICE_RATE = float(os.environ.get("RATE_VOTE_DEVICE_RATE", "2"))
+RATE_VOTE_DEVICE_BURST = float(os.environ.get("RATE_VOTE_DEVICE_BURST", "5"))
+# Votos por IP desactivados por defecto (RATE_VOTE_IP_RATE=0): todo el público de la sala
+# sale por la misma IP del wifi y el cubo frenaría justo la ráfaga de votos
+RATE_VOTE_IP_RATE = float(os.environ.get("RATE_VOTE_IP_RATE", "0"))
+RATE_VOTE_IP_BURST = float(os.environ.get("RATE_VOTE_IP_BURST", "2000"))
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "20000"))
+
+# Agrupación de eventos "update": ventana de fusión y latencia máxima (ms). 0 = sin agrupar
+UPDATE_WINDOW_MS = int(os.environ.get("UPDATE_WINDOW_MS", "150"))
+UPDATE_MAX_LATENCY_MS = int(os.environ.get("UPDATE_MAX_LATENCY_MS", "500"))
 
 # Inicializa si no existen (seguro para re-deploys)
 def _init(path, default):
@@ -3,7 +3,7 @@ print(">> main.py iniciado")
 import sys
 import os
 import json
-import csv
+import zlib
 from pathlib import Path
 from backend.api.ingest import ingest_bp
 
@@ -16,10 +16,26 @@ eventlet.monkey_patch()
 from flask import Flask, send_from_directory, jsonify, request, Blueprint, session
 print(">> Flask importado")
 
-from backend.api.websockets import socketio
+from backend.api.websockets import socketio, updates, apply_vote, allow_vote, instrumented_emit
+from backend.services.broadcast import diff_states
+from backend.services.catalog_store import get_catalog, CATALOG_FIELDS
+from backend.services.catalog_pipeline import get_catalog_pipeline, catalog_delta, delta_entries
+from backend.services.static_assets import assets
+from backend.services import enrichment
+from backend.services import thumbnails
+from backend.services.image_store import ArtistImageStore
+from backend.services.asset_resolver import LayeredResolver, refresh_for
+from backend.services.song_text_cache import song_texts
+from backend.services.prefetch import PerformerPrefetch
+from backend.services.chart_render import RenderCache, parse_transform
+from backend.services.search_index import get_search_index
+from backend.services.facet_index import get_facet_index, FACETS
+from backend.services import metrics
+from backend.services.rate_limit import TokenBucketLimiter, allow_all, client_ip
+from backend.core import config
 print(">> socketio importado")
 
-from backend.services.vote_logic import load_votes, count_votes, save_votes, load_states
+from backend.services.vote_logic import save_votes, load_states, vote_store, store_backend
 
 # --- import robusto de rutas de persistencia ---
 try:
@@ -37,20 +53,21 @@ except Exception:
 # Ruta absoluta a frontend/public
 PROJECT_ROOT = Path(__file__).resolve().parents[1]      # .../src
 PUBLIC_DIR   = PROJECT_ROOT / "frontend" / "public"
+CATALOG_JSON = Path(config.CATALOG_JSON)   # frontend/public/catalog/catalog.json salvo CATALOG_JSON
 print(f">> PUBLIC_DIR={PUBLIC_DIR}")
 # =========================
 # Proposals (suggested songs)
 # =========================
 import time, re
-from collections import defaultdict
 
-# Carpeta backend/proposals
-BASE_DIR = os.path.dirname(__file__)
-PROPOSALS_DIR = os.path.join(BASE_DIR, "proposals")
-os.makedirs(PROPOSALS_DIR, exist_ok=True)
-PROPOSALS_PATH = os.path.join(PROPOSALS_DIR, "proposals.json")
+# Índice por slug + ranking (journal compactado en un worker, tabla SQLite con varios)
+proposals_store = store_backend.proposals
 
-_ip_last_ts = defaultdict(lambda: 0)
+# 1 propuesta / 30s por dispositivo (o por IP si no llega deviceId) y un tope por IP
+proposal_device_limiter = TokenBucketLimiter(config.RATE_PROPOSAL_DEVICE_RATE, config.RATE_PROPOSAL_DEVICE_BURST,
+                                             max_keys=config.RATE_LIMIT_MAX_KEYS, name="proposals", scope="device")
+proposal_ip_limiter = TokenBucketLimiter(config.RATE_PROPOSAL_IP_RATE, config.RATE_PROPOSAL_IP_BURST,
+                                         max_keys=config.RATE_LIMIT_MAX_KEYS, name="proposals", scope="ip")
 
 def _slug_title(s: str) -> str:
     s = (s or "").strip().lower()
@@ -59,19 +76,6 @@ def _slug_title(s: str) -> str:
     s = re.sub(r"-+", "-", s).strip("-")
     return s[:80] or "untitled"
 
-def _load_proposals():
-    if not os.path.exists(PROPOSALS_PATH):
-        return []
-    try:
-        with open(PROPOSALS_PATH, "r", encoding="utf-8") as f:
-            return json.load(f) or []
-    except Exception:
-        return []
-
-def _save_proposals(data):
-    with open(PROPOSALS_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
 # --- Blueprint ---
 proposals_bp = Blueprint("proposals_bp", __name__)
 
@@ -82,96 +86,37 @@ def post_proposal():
     if not title:
         return jsonify({"ok": False, "error": "empty_title"}), 400
 
-    ip = request.headers.get("X-Forwarded-For", request.remote_addr) or "?"
-    now = time.time()
-    if now - _ip_last_ts[ip] < 30:  # 1 propuesta / 30s por IP
+    ip = client_ip()
+    device = (payload.get("deviceId") or "").strip() or "ip:" + ip
+    if not allow_all((proposal_ip_limiter, ip), (proposal_device_limiter, device)):
         return jsonify({"ok": False, "error": "rate_limited"}), 429
-    _ip_last_ts[ip] = now
+    now = time.time()
 
     slug = _slug_title(title)
-    data = _load_proposals()
-    for p in data:
-        if p["slug"] == slug:
-            p["count"] += 1
-            p["last_ts"] = int(now)
-            _save_proposals(data)
-            try:
-                socketio.emit("proposal_added", p, broadcast=True)
-            except Exception:
-                pass
-            return jsonify({"ok": True, "dedup": True, "proposal": p})
-
-    item = {
-        "slug": slug,
-        "title": title,
-        "count": 1,
-        "first_ts": int(now),
-        "last_ts": int(now),
-    }
-    data.append(item)
-    _save_proposals(data)
+    # O(1) por slug; el ranking se mantiene al vuelo y el disco solo recibe una línea de journal
+    item, dedup = proposals_store.submit(slug, title, now)
     try:
         socketio.emit("proposal_added", item, broadcast=True)
     except Exception:
         pass
+    if dedup:
+        return jsonify({"ok": True, "dedup": True, "proposal": item})
     return jsonify({"ok": True, "proposal": item})
 
 @proposals_bp.route("/proposals", methods=["GET"])
 def get_proposals():
-    data = _load_proposals()
-    data.sort(key=lambda p: (-p["count"], p["first_ts"]))
-    return jsonify({"ok": True, "proposals": data})
+    # ya ordenadas por (-count, first_ts)
+    return jsonify({"ok": True, "proposals": proposals_store.ranked()})
 
 @proposals_bp.route("/proposals/<slug>", methods=["DELETE"])
 def delete_proposal(slug):
-    data = _load_proposals()
-    new_data = [p for p in data if p["slug"] != slug]
-    _save_proposals(new_data)
+    proposals_store.remove(slug)
     try:
         socketio.emit("proposal_removed", {"slug": slug}, broadcast=True)
     except Exception:
         pass
     return jsonify({"ok": True})
     
-# =========================
-# Fetch metadata (year, genre) from public APIs
-# =========================
-import urllib.parse, urllib.request
-
-META_CACHE_PATH = os.path.join(os.path.dirname(__file__), "core", "metadata_cache.json")
-os.makedirs(os.path.dirname(META_CACHE_PATH), exist_ok=True)
-if not os.path.exists(META_CACHE_PATH):
-    with open(META_CACHE_PATH, "w", encoding="utf-8") as f:
-        f.write("{}")
-
-def _load_meta_cache():
-    try:
-        with open(META_CACHE_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
-
-def _save_meta_cache(d):
-    with open(META_CACHE_PATH, "w", encoding="utf-8") as f:
-        json.dump(d, f, ensure_ascii=False, indent=2)
-
-def _http_json(url, headers=None, timeout=7):
-    req = urllib.request.Request(url, headers=headers or {})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        return json.loads(resp.read().decode("utf-8", errors="ignore"))
-
-def _score_match(qt, qa, it_title, it_artist):
-    # coincidencias sencillas sin librerías extra
-    t = it_title.lower()
-    a = (it_artist or "").lower()
-    s = 0
-    if qt in t: s += 3
-    if qa and qa in a: s += 2
-    # bonus por igualdad (muy aproximado)
-    if t == qt: s += 2
-    if qa and a == qa: s += 1
-    return s
-
 def create_app():
     print(">> creando app")
 
@@ -192,7 +137,8 @@ def create_app():
     idx = PUBLIC_DIR / "index.html"
     print(f">> index.html existe? {idx.exists()}  ({idx})")
 
-    socketio.init_app(app, cors_allowed_origins="*")
+    # Con varios workers, la cola de mensajes reparte los emits entre procesos
+    socketio.init_app(app, cors_allowed_origins="*", **store_backend.socketio_options())
 
     @app.route("/debug-files")
     def debug_files():
@@ -223,7 +169,7 @@ def create_app():
     print(">> socketio registrado")
 
     # --- Asegurar CSV de catálogo en el Disk ---
-    CORE_DIR = Path(__file__).resolve().parent / "core"  # backend/core (Disk)
+    CORE_DIR = Path(config.MEDIA_DIR).resolve()  # backend/core (Disk) salvo MEDIA_DIR
     CATALOG_CSV = CORE_DIR / "catalog_postgres.csv"
     if not CATALOG_CSV.exists():
         CATALOG_CSV.parent.mkdir(parents=True, exist_ok=True)
@@ -232,6 +178,10 @@ def create_app():
         print(f">> creado {CATALOG_CSV}")
     else:
         print(f">> encontrado {CATALOG_CSV}")
+    # Repositorio SQLite del catálogo (importa el CSV si la base está vacía; si cambió, solo añade ids nuevos)
+    catalog_repo = get_catalog()
+    # catalog.json se regenera solo (e incrementalmente) con cada mutación del repositorio
+    catalog_pipeline = get_catalog_pipeline(catalog_repo)
 
     # --- Carpetas PERSISTENTES en el Disk para letras/tabs/imagenes ---
     LYRICS_DIR     = CORE_DIR / "songs" / "lyrics"
@@ -239,30 +189,72 @@ def create_app():
     IMAGES_DIR     = CORE_DIR / "images"
     ARTIST_IMG_DIR = IMAGES_DIR / "artist"
     THUMBS_DIR = IMAGES_DIR / "artist_thumbs"
-    # === Manifest de imágenes de artistas (clave: nombre artista; valor: filename con extensión) ===
-    import json as _json, urllib.parse as _urlp
-
-    ARTIST_MANIFEST = ARTIST_IMG_DIR / "manifest.json"
-
-    def _load_artist_manifest():
-        try:
-            with open(ARTIST_MANIFEST, "r", encoding="utf-8") as f:
-                return _json.load(f)
-        except Exception:
-            return {}
-
-    def _save_artist_manifest(d):
-        ARTIST_MANIFEST.parent.mkdir(parents=True, exist_ok=True)
-        with open(ARTIST_MANIFEST, "w", encoding="utf-8") as f:
-            _json.dump(d, f, ensure_ascii=False, indent=2)
 
     for d in [LYRICS_DIR, TABS_DIR, IMAGES_DIR, ARTIST_IMG_DIR, THUMBS_DIR]:
         d.mkdir(parents=True, exist_ok=True)
+    # Cada mutación del catálogo se difunde como parche (catalog_changed); un cliente
+    # que detecte un hueco pide /catalog/changes?since=<su versión>
+    def _emit_catalog_changed(change):
+        if change["op"] == "reset":
+            delta = {"version": change["version"], "since": change["version"] - 1, "reset": True}
+        else:
+            upsert, delete = delta_entries(catalog_repo, change["ids"])
+            delta = {"version": change["version"], "since": change["version"] - 1, "reset": False,
+                     "upsert": upsert, "delete": delete}
+        instrumented_emit("catalog_changed", delta)
+    catalog_repo.subscribe(_emit_catalog_changed)
+
+    # Facetas (artist/genre/language/decade/enabled) para /catalog/facets y /catalog/query
+    facet_index = get_facet_index(catalog_repo)
+    # Índice de búsqueda (título/artista/género/letra), incremental con el repositorio
+    search_index = get_search_index(catalog_repo, lyrics_dirs=[
+        LYRICS_DIR, PUBLIC_DIR / "songs" / "lyrics", PROJECT_ROOT / "songs" / "lyrics"])
+    # Letras/tabs/imágenes: índice en memoria por capas (Disk → carpeta de ingest → backend/songs → repo)
+    INGEST_SONGS_DIR = PROJECT_ROOT / "backend" / "songs"
+    lyrics_resolver = LayeredResolver(
+        [LYRICS_DIR, PUBLIC_DIR / "songs" / "lyrics", INGEST_SONGS_DIR / "lyrics", PROJECT_ROOT / "songs" / "lyrics"],
+        exts=[".txt"], poll_interval=config.ASSET_POLL_SECONDS)
+    tab_resolver = LayeredResolver(
+        [TABS_DIR, PUBLIC_DIR / "songs" / "tabs", INGEST_SONGS_DIR / "tabs", PROJECT_ROOT / "songs" / "tabs"],
+        exts=[".txt"], poll_interval=config.ASSET_POLL_SECONDS)
+    LOGO_EXTS = (".png", ".jpg", ".jpeg")   # event-logo.<ext> (index.html las prueba en este orden)
+    images_resolver = LayeredResolver(
+        [IMAGES_DIR, PROJECT_ROOT / "songs" / "images"], recursive=True, poll_interval=config.ASSET_POLL_SECONDS)
+    if config.SONG_TEXT_PRELOAD:
+        # letras y tabs en memoria desde el arranque (si no, al primer uso)
+        t0 = time.perf_counter()
+        n = song_texts.preload(hit[1] for r in (tab_resolver, lyrics_resolver)
+                               for hit in map(r.resolve, r.names()) if hit)
+        print(f">> {n} letras/tabs en memoria ({song_texts.stats()['bytes'] // 1024} KB) en {time.perf_counter() - t0:.3f}s")
+
+    # Tabs de las próximas canciones (ranking de votos) empujados a la sala del intérprete
+    def _prefetch_tab(song_id):
+        hit = tab_resolver.resolve(f"TAB{song_id}.txt")
+        if hit is None:
+            return None
+        entry = song_texts.get(hit[1])
+        digest = entry["digest"] if entry else assets.digest(hit[1])
+        small = entry is not None and entry["size"] <= config.PREFETCH_MAX_KB * 1024
+        return {"digest": digest, "url": f"/songs/tabs/TAB{song_id}.txt?v={digest}",
+                "text": entry["raw"].decode("utf-8", errors="ignore") if small else None}
+    performer_prefetch = PerformerPrefetch(_prefetch_tab, instrumented_emit, k=config.PREFETCH_TOP_K)
+    performer_prefetch.reset(vote_store.counts(), load_states())
+
+    def _prefetch_on_update(payload):
+        # Una vez por frame agrupado, no por voto. Con memory el espejo se mantiene con
+        # los deltas; con sqlite los votos de otros workers no pasan por aquí: se relee
+        # el estado compartido (una consulta por ventana)
+        if store_backend.name == "memory":
+            performer_prefetch.apply(payload)
+        else:
+            performer_prefetch.reset(vote_store.counts(), load_states())
+        performer_prefetch.refresh()
+    updates.subscribe(_prefetch_on_update)
     print(f">> LYRICS_DIR={LYRICS_DIR}")
     print(f">> TABS_DIR={TABS_DIR}")
     print(f">> IMAGES_DIR={IMAGES_DIR}")
-    # === Thumbs manifest (artist -> filename en artist_thumbs) ===
-    import json as _json, urllib.parse as _urlp, shutil as _shutil
+    # === Thumbs manifest (artist -> filename en artist_thumbs; lo escribe thumb_pipeline) ===
+    import json as _json
 
     THUMBS_MANIFEST = THUMBS_DIR / "manifest.json"
 
@@ -273,50 +265,20 @@ def create_app():
         except Exception:
             return {}
 
-    def _save_thumbs_manifest(d):
-        THUMBS_DIR.mkdir(parents=True, exist_ok=True)
-        with open(THUMBS_MANIFEST, "w", encoding="utf-8") as f:
-            _json.dump(d, f, ensure_ascii=False, indent=2)
+    # === Fotos de artista: almacén por contenido con un único índice (artista -> hash, variantes) ===
+    REPO_ARTIST_DIR = PROJECT_ROOT / "songs" / "images" / "artist"
+    image_store = ArtistImageStore(IMAGES_DIR / "artist_store")
+    if not len(image_store):
+        # primera vez: migra las carpetas antiguas (Disk manda sobre repo)
+        print(">> importadas %d fotos de artista (%d duplicadas)" % image_store.import_dirs([ARTIST_IMG_DIR, REPO_ARTIST_DIR]))
 
-    def _make_thumb(src_path: Path, dst_path: Path, max_w=400, max_h=300):
-        """
-        Crea una miniatura en THUMBS_DIR con extensión correcta.
-        - Si Pillow está instalado: intenta .webp (quality=80). Si falla, usa la misma extensión del original.
-        - Si Pillow NO está: copia el original con la MISMA extensión.
-        Devuelve SIEMPRE el nombre de archivo final (con extensión).
-        """
-        import shutil as _shutil
-        ext = src_path.suffix.lower() or ".jpg"  # extensión original (fallback jpg)
+    # Miniaturas en segundo plano (pool de procesos, varias medidas y formatos)
+    thumb_pipeline = thumbnails.ThumbnailPipeline(
+        THUMBS_DIR, sizes=config.THUMB_SIZES, formats=config.THUMB_FORMATS, workers=config.THUMB_WORKERS,
+        on_record=image_store.set_variants)
 
-        # 1) Si no hay Pillow, copiar con extensión original
-        try:
-            from PIL import Image  # noqa
-        except Exception:
-            dst = dst_path.with_suffix(ext)
-            dst.parent.mkdir(parents=True, exist_ok=True)
-            _shutil.copyfile(src_path, dst)
-            return dst.name
-
-        # 2) Con Pillow: intentar WEBP primero
-        from PIL import Image
-        img = Image.open(src_path)
-        if img.mode not in ("RGB", "L", "P"):
-            img = img.convert("RGB")
-        img.thumbnail((max_w, max_h))
-        dst_path.parent.mkdir(parents=True, exist_ok=True)
-
-        try:
-            dst_webp = dst_path.with_suffix(".webp")
-            img.save(dst_webp, "WEBP", quality=80, method=6)
-            return dst_webp.name
-        except Exception:
-            # Fallback: misma extensión que el original
-            dst_ext = dst_path.with_suffix(ext)
-            try:
-                img.save(dst_ext, quality=85)
-            except Exception:
-                _shutil.copyfile(src_path, dst_ext)
-            return dst_ext.name
+    # Variantes transpuestas de los tabs (LRU por hash de contenido + transformación)
+    chart_cache = RenderCache(max_entries=config.CHART_CACHE_ENTRIES)
 
     # ===== RUTAS ESTÁTICAS =====
     @app.route("/")
@@ -325,7 +287,22 @@ def create_app():
 
     @app.route("/catalog/<path:filename>")
     def catalog(filename):
-        return send_from_directory(str(PUBLIC_DIR / "catalog"), filename)
+        # ETag por contenido, 304, .gz/.br y ?v=<hash> inmutable
+        base = CATALOG_JSON.parent if filename == "catalog.json" else PUBLIC_DIR / "catalog"
+        resp = assets.send(base, filename)
+        if filename == "catalog.json":
+            catalog_pipeline.sync()  # cambios hechos en otro worker
+            resp.headers["X-Catalog-Version"] = str(catalog_pipeline.version)
+        return resp
+
+    @app.route("/catalog/version.json")
+    def catalog_version():
+        catalog_pipeline.sync()
+        return jsonify({
+            "version": catalog_pipeline.version,
+            "etag": catalog_pipeline.etag,
+            "url": assets.url("/catalog/catalog.json", str(CATALOG_JSON)) if CATALOG_JSON.exists() else None,
+        })
 
     @app.route("/inter.html")
     def inter():
@@ -351,32 +328,9 @@ def create_app():
             if not song_id or field not in allowed:
                 return "Parámetros inválidos (id/field). Campos válidos: " + ", ".join(allowed), 400
 
-            # leer CSV actual
-            with open(CATALOG_CSV, newline="", encoding="utf-8") as f:
-                reader = csv.DictReader(f, delimiter=";")
-                fieldnames = reader.fieldnames or (["id"] + allowed)
-                rows = list(reader)
-
-            # aplicar cambio
-            found = False
-            for row in rows:
-                if (row.get("id") or "").strip() == song_id:
-                    row[field] = "" if value is None else str(value)
-                    found = True
-                    break
-
-            if not found:
+            # UPDATE de una fila (O(log n)), sin reescribir el catálogo
+            if not catalog_repo.update_field(song_id, field, value):
                 return f"ID no encontrado: {song_id}", 404
-
-            # escribir CSV
-            tmp = Path(str(CATALOG_CSV) + ".tmp")
-            with open(tmp, "w", newline="", encoding="utf-8") as f:
-                w = csv.DictWriter(f, fieldnames=fieldnames, delimiter=";")
-                w.writeheader()
-                for r in rows:
-                    w.writerow(r)
-
-            os.replace(tmp, CATALOG_CSV)
             return f"✅ Actualizado '{field}' de '{song_id}'.", 200
 
         except Exception as e:
@@ -386,81 +340,50 @@ def create_app():
     def ran():
         return send_from_directory(str(PUBLIC_DIR), "ran.html")
 
-    # ===== RUTAS SONGS (primero Disk, luego repo como fallback) =====
+    # ===== RUTAS SONGS (resueltas por capas: Disk → ingest → repo) =====
     @app.route("/songs/lyrics/<filename>")
     def serve_lyrics(filename):
-        p = LYRICS_DIR / filename
-        if p.exists():
-            return send_from_directory(str(LYRICS_DIR), filename)
-        # fallback a repo
-        repo_dir = PROJECT_ROOT / "songs" / "lyrics"
-        return send_from_directory(str(repo_dir), filename)
+        hit = lyrics_resolver.resolve(filename)
+        if hit is None:
+            return jsonify({"ok": False, "error": "not_found"}), 404
+        return song_texts.send(hit[0], filename, hit[1])
 
     @app.route("/songs/tabs/<filename>")
     def serve_tab(filename):
-        p = TABS_DIR / filename
-        if p.exists():
-            return send_from_directory(str(TABS_DIR), filename)
-        # fallback a repo
-        repo_dir = PROJECT_ROOT / "songs" / "tabs"
-        return send_from_directory(str(repo_dir), filename)
-
-    # ==== Manifest JSON siempre disponible (aunque no exista archivo físico) ====
+        # /songs/tabs/crazy?transpose=+2&capo=3&notation=latin == TABcrazy.txt transpuesto
+        if not filename.endswith(".txt"):
+            filename = f"TAB{filename}.txt"
+        try:
+            transform = parse_transform(request.args)
+        except ValueError as e:
+            return jsonify({"ok": False, "error": f"bad_{e}"}), 400
+        hit = tab_resolver.resolve(filename)
+        if hit is None:
+            return jsonify({"ok": False, "error": "not_found"}), 404
+        base, path = hit
+        if transform is None:
+            return song_texts.send(base, filename, path)
+        cached = song_texts.get(path)
+        if cached is not None:
+            digest, load = cached["digest"], lambda: cached["raw"].decode("utf-8", errors="ignore")
+        else:  # demasiado grande para la caché en memoria
+            digest, load = assets.digest(path), lambda: Path(path).read_text(encoding="utf-8", errors="ignore")
+        body = chart_cache.get_or_render(digest, transform, load)
+        t, capo, notation, acc = transform
+        return assets.send_body(body, f"{digest}-t{t}c{capo}{notation or ''}{acc or ''}")
+
+    # ==== Manifest JSON siempre disponible (sale del índice del almacén) ====
     @app.route("/songs/images/artist/manifest.json")
     def artist_manifest_json():
-        try:
-            data = _load_artist_manifest()   # devuelve {} si no hay archivo
-            return jsonify(data)
-        except Exception:
-            return jsonify({}), 200
+        return jsonify(image_store.manifest())
 
-    # ==== Reconstruir manifest escaneando imágenes existentes (Disk + Repo) ====
+    # ==== Reimportar al almacén las imágenes sueltas (Disk + Repo) ====
     @app.get("/admin/rebuild-artist-manifest")
     def rebuild_artist_manifest():
-        import os
-        from collections import defaultdict
-        import urllib.parse as _u
-
-        # prioridad de extensiones (mejor → peor)
-        ext_priority = {".webp": 5, ".jpg": 4, ".jpeg": 3, ".png": 2, ".bmp": 1}
-        allow = set(ext_priority.keys())
-
-        def scan_dir(base):
-            found = defaultdict(lambda: ("", -1))  # artista -> (filename, score)
-            if not os.path.isdir(base):
-                return found
-            for name in os.listdir(base):
-                p = os.path.join(base, name)
-                if not os.path.isfile(p):
-                    continue
-                root, ext = os.path.splitext(name)
-                ext = ext.lower()
-                if ext not in allow:
-                    continue
-                # clave “bonita”: decodifica %20 si existiera
-                artist_key = _u.unquote(root)
-                score = ext_priority.get(ext, 0)
-                # si hay colisión, nos quedamos con el de mayor prioridad
-                if score > found[artist_key][1]:
-                    found[artist_key] = (name, score)
-            return found
-
-        # 1) Escanea disco persistente
-        disk_map = scan_dir(str(ARTIST_IMG_DIR))
-        # 2) Escanea repo (fallback)
-        repo_artist_dir = PROJECT_ROOT / "songs" / "images" / "artist"
-        repo_map = scan_dir(str(repo_artist_dir))
-
-        # Fusiona: primero repo, luego sobrescribe disco (o al revés si prefieres)
-        merged = dict(repo_map)
-        merged.update(disk_map)
-
-        manifest = {}
-        for artist_key, (filename, _) in merged.items():
-            manifest[artist_key] = _u.quote(filename)  # guardamos filename ya URL-encoded
-
-        _save_artist_manifest(manifest)
-        return jsonify({"ok": True, "count": len(manifest)})
+        # solo artistas que aún no están en el almacén; ?force=1 reimporta (pisa las subidas)
+        imported, dedup = image_store.import_dirs([ARTIST_IMG_DIR, REPO_ARTIST_DIR],
+                                                  force=request.args.get("force") == "1")
+        return jsonify({"ok": True, "count": len(image_store), "imported": imported, "deduplicated": dedup})
 
     # ==== Manifest de thumbs (JSON) ====
     @app.route("/songs/images/artist_thumbs/manifest.json")
@@ -471,67 +394,68 @@ def create_app():
         except Exception:
             return jsonify({}), 200
 
+    @app.route("/songs/images/artist_thumbs/srcset.json")
+    def artist_thumbs_srcset_json():
+        # artista -> {"src", "srcset": {formato: "a-200.webp 200w, ..."}}
+        return jsonify(thumb_pipeline.srcset())
+
     # ==== Construir/Reconstruir thumbs + manifest a partir de imágenes existentes ====
     @app.get("/tools/build-artist-thumbs")
     def build_artist_thumbs():
-        # Origen: imágenes de artista en disco y repo
-        sources = []
-        sources.append(ARTIST_IMG_DIR)  # backend/core/images/artist
-        repo_artist_dir = PROJECT_ROOT / "songs" / "images" / "artist"
-        sources.append(repo_artist_dir)
-
-        allow = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
-        manifest = {}
-
-        for base in sources:
-            if not base.exists():
-                continue
-            for name in os.listdir(base):
-                p = base / name
-                if not p.is_file():
-                    continue
-                root, ext = os.path.splitext(name)
-                if ext.lower() not in allow:
-                    continue
-                # Clave = nombre "bonito" del artista (des-encode si venía %20)
-                artist_key = _urlp.unquote(root)
-                safe_artist = artist_key.strip().replace("/", "_").replace("\\", "_")
-                # Destino thumb (queremos .webp si es posible)
-                thumb_base = THUMBS_DIR / safe_artist
-                out_name = _make_thumb(p, thumb_base)  # devuelve nombre final
-                # Guardar en manifest (nombre ya URL-encoded para usar en URL)
-                final_name = out_name or (thumb_base.name + ext.lower())
-                manifest[artist_key] = _urlp.quote(final_name)
-
-        _save_thumbs_manifest(manifest)
-        return jsonify({"ok": True, "count": len(manifest)})
+        # Origen: imágenes de artista en disco (manda) y repo; solo se procesan las que cambiaron
+        items = image_store.items()
+        job = thumbnails.start_job(thumb_pipeline, items, socketio.start_background_task,
+                                   sleep=socketio.sleep, force=request.args.get("force") == "1")
+        return jsonify({"ok": True, **job.status()}), 202
+
+    @app.get("/tools/build-artist-thumbs/<job_id>")
+    def build_artist_thumbs_status(job_id):
+        job = thumbnails.get_job(job_id)
+        if job is None:
+            return jsonify({"ok": False, "error": "not_found"}), 404
+        return jsonify(job.status())
 
     @app.route("/songs/images/<path:filename>")
     def serve_images(filename):
-        p = IMAGES_DIR / filename
-        if p.exists():
-            return send_from_directory(str(IMAGES_DIR), filename)
-        # fallback a repo
-        repo_dir = PROJECT_ROOT / "songs" / "images"
-        return send_from_directory(str(repo_dir), filename)
+        if filename.startswith("artist/"):
+            # /songs/images/artist/<artista>.<ext>: resuelto por el índice, cualquier extensión
+            entry = image_store.entry(os.path.splitext(filename[len("artist/"):])[0])
+            if entry:
+                return assets.send(image_store.objects_dir, entry["file"])
+        hit = images_resolver.resolve(filename)
+        if hit is not None and filename.startswith("event-logo.") and images_resolver.layer_of(filename) != 0 \
+                and any(images_resolver.layer_of("event-logo" + e) == 0 for e in LOGO_EXTS):
+            hit = None  # hay un logo subido (otra extensión): el de serie del repo no debe taparlo
+        if hit is None:
+            return jsonify({"ok": False, "error": "not_found"}), 404
+        return assets.send(hit[0], filename)
 
     # ===== API =====
     @app.route("/core/votes.json")
     def votes():
-        return send_from_directory(str(CORE_DIR), "votes.json")
+        # el estado autoritativo vive en memoria; el fichero puede ir unos ms por detrás
+        return jsonify(vote_store.snapshot())
 
     @app.route("/votes/counts.json")
     def vote_counts():
-        raw_votes = load_votes()
-        counts = count_votes(raw_votes)
-        return jsonify(counts)
+        return jsonify(vote_store.counts())
+
+    @app.route("/votes/broadcast_stats.json")
+    def broadcast_stats():
+        # events = cambios recibidos, frames = emits reales, merged = cambios fusionados
+        return jsonify(updates.scheduler.stats())
+
+    @app.route("/metrics")
+    def metrics_endpoint():
+        # Formato de texto de Prometheus (instrumentos de backend/services/metrics.py)
+        return metrics.render(), 200, {"Content-Type": metrics.CONTENT_TYPE}
 
     @app.route("/votes/reset")
     def reset_votes():
         from backend.services.vote_logic import save_states
         save_votes({})
         save_states({})
-        socketio.emit("update", {})
+        updates.publish_snapshot({}, {})
         socketio.emit("session_reset")
         return jsonify({"status": "ok", "message": "Votes reset"})
 
@@ -552,17 +476,8 @@ def create_app():
             if not song_id:
                 return "ID de canción no especificado", 400
 
-            catalog_csv = CATALOG_CSV
-
             # ¿Existe ya este ID?
-            existing = None
-            if catalog_csv.exists():
-                with open(catalog_csv, newline="", encoding="utf-8") as f:
-                    reader = csv.DictReader(f, delimiter=";")
-                    for row in reader:
-                        if (row.get("id") or "").strip() == song_id:
-                            existing = row
-                            break
+            existing = catalog_repo.get(song_id)
 
             # Si existe y NO viene 'overwrite', devolvemos conflicto con info (409)
             if existing and not data.get("overwrite"):
@@ -577,47 +492,22 @@ def create_app():
                     }
                 }), 409
 
-            fieldnames = ["id","name","artist","year","language","genre","duration","mood","key","tempo","enabled"]
-
             if existing and data.get("overwrite"):
-                # Sobrescribir: reescribir el CSV sustituyendo la fila del ID
-                with open(catalog_csv, newline="", encoding="utf-8") as f:
-                    rows = list(csv.DictReader(f, delimiter=";"))
-
-                # Fila nueva (si algún campo viene vacío, lo dejamos vacío)
-                newrow = {k: (data.get(k) if data.get(k) not in [None, ""] else "") for k in fieldnames}
+                # Sobrescribir la fila del ID (si algún campo viene vacío, lo dejamos vacío)
+                newrow = {k: (data.get(k) if data.get(k) not in [None, ""] else "") for k in CATALOG_FIELDS}
                 newrow["id"] = song_id
                 if not newrow.get("enabled"):
                     newrow["enabled"] = (existing.get("enabled") or "Y")
-
-                with open(catalog_csv, "w", newline="", encoding="utf-8") as f:
-                    w = csv.DictWriter(f, fieldnames=fieldnames, delimiter=";")
-                    w.writeheader()
-                    for row in rows:
-                        if (row.get("id") or "").strip() == song_id:
-                            w.writerow({k: newrow.get(k, "") for k in fieldnames})
-                        else:
-                            w.writerow({k: row.get(k, "") for k in fieldnames})
+                catalog_repo.upsert(newrow)
 
                 status_msg = "✅ Canción actualizada (sobrescrita)."
 
             elif not existing:
                 # Añadir nueva fila
-                with open(catalog_csv, "a", newline="", encoding="utf-8") as csvfile:
-                    writer = csv.writer(csvfile, delimiter=";")
-                    writer.writerow([
-                        data.get("id", ""),
-                        data.get("name", ""),
-                        data.get("artist", ""),
-                        data.get("year", ""),
-                        data.get("language", ""),
-                        data.get("genre", ""),
-                        data.get("duration", ""),
-                        data.get("mood", ""),
-                        data.get("key", ""),
-                        data.get("tempo", ""),
-                        "Y",
-                    ])
+                newrow = {k: data.get(k, "") for k in CATALOG_FIELDS}
+                newrow["id"] = song_id
+                newrow["enabled"] = "Y"
+                catalog_repo.insert(newrow)
                 status_msg = "✅ Canción añadida correctamente."
 
             else:
@@ -630,10 +520,19 @@ def create_app():
                     (LYRICS_DIR / f"{song_id}.txt").parent.mkdir(parents=True, exist_ok=True)
                     with open(LYRICS_DIR / f"{song_id}.txt", "w", encoding="utf-8") as f:
                         f.write((data.get("lyrics") or "").strip())
+                    assets.precompress(LYRICS_DIR / f"{song_id}.txt")
+                    song_texts.invalidate(LYRICS_DIR / f"{song_id}.txt")
                 if "tab" in data:
                     (TABS_DIR / f"TAB{song_id}.txt").parent.mkdir(parents=True, exist_ok=True)
                     with open(TABS_DIR / f"TAB{song_id}.txt", "w", encoding="utf-8") as f:
                         f.write((data.get("tab") or "").strip())
+                    assets.precompress(TABS_DIR / f"TAB{song_id}.txt")
+                    song_texts.invalidate(TABS_DIR / f"TAB{song_id}.txt")
+                if "lyrics" in data:
+                    search_index.refresh(song_id)  # la fila se indexó antes de escribir la letra
+                    lyrics_resolver.refresh()
+                if "tab" in data:
+                    tab_resolver.refresh()
 
             return status_msg, 200
 
@@ -643,30 +542,22 @@ def create_app():
     # ===== VOTING / SOCKETS =====
     @app.route("/votes/now_playing", methods=["POST"])
     def set_now_playing():
-        from backend.services.vote_logic import save_states
         data = request.get_json()
         new_id = data.get("songId")
         if not new_id:
             return jsonify({"status": "error", "message": "Missing songId"}), 400
 
-        states = load_states()
-        for sid in list(states):
-            if states[sid] == "now_playing":
-                states[sid] = "played"
-        states[new_id] = "now_playing"
-        save_states(states)
-
-        votes = load_votes()
-        counts = count_votes(votes)
-        by_device = {}
-        for dev, song_id in votes.items():
-            by_device.setdefault(song_id, []).append(dev)
-
-        socketio.emit("update", {
-            "counts": counts,
-            "byDevice": by_device,
-            "states": states
-        })
+        def promote(states):
+            before = dict(states)
+            for sid in list(states):
+                if states[sid] == "now_playing":
+                    states[sid] = "played"
+            states[new_id] = "now_playing"
+            return states, diff_states(before, states)
+
+        # atómico frente a otros workers
+        delta = store_backend.states.update(promote)
+        updates.publish(states=delta)
         return jsonify({"status": "ok", "now_playing": new_id})
 
     @socketio.on("vote")
@@ -675,60 +566,79 @@ def create_app():
         song = data.get("songId")
         if not device or not song:
             return
-        votes = load_votes()
-        votes[device] = song
-        save_votes(votes)
-
-        counts = count_votes(votes)
-        by_device = {}
-        for dev, song_id in votes.items():
-            by_device.setdefault(song_id, []).append(dev)
-        states = load_states()
-
-        print(">> update:", {"counts": counts, "byDevice": by_device, "states": states})
-        socketio.emit("update", {"counts": counts, "byDevice": by_device, "states": states})
+        if not allow_vote(device):
+            return {"ok": False, "error": "rate_limited"}
+        # O(1): voto en memoria, recuento incremental y delta solo con lo que cambia
+        apply_vote(device, song)
+        return {"ok": True}  # ack para index.html
+
+    @socketio.on("join_performer")
+    def handle_join_performer(data=None):
+        # inter.html: entra en la sala y recibe ya los tabs de las próximas canciones
+        from flask_socketio import join_room, emit
+        join_room(performer_prefetch.room)
+        emit(performer_prefetch.event, performer_prefetch.snapshot())
 
     @socketio.on("update_request")
-    def handle_update_request():
-        votes = load_votes()
-        counts = count_votes(votes)
-        states = load_states()
-        socketio.emit("update", {"counts": counts, "byDevice": votes, "states": states})
+    def handle_update_request(data=None):
+        # Snapshot completo SOLO para quien lo pide (al conectar o al detectar un hueco en seq)
+        from flask_socketio import emit
+        device = (data or {}).get("deviceId")
+        emit("update", updates.snapshot(
+            vote_store.counts(),
+            load_states(),
+            vote=vote_store.get(device) if device else None,
+        ))
 
     # ===== CATALOGO =====
+    @app.route("/catalog/enrich", methods=["POST"])
+    def enrich_catalog():
+        # Job en segundo plano: año/género para las filas que no los tienen
+        def progress(status):
+            socketio.emit("enrich_progress", status, to="enrich")
+
+        http = enrichment.rebase_http(config.ENRICH_PROVIDER_BASE) if config.ENRICH_PROVIDER_BASE else enrichment.http_json
+        job, created = enrichment.start_job(
+            catalog_repo,
+            socketio.start_background_task,
+            http=http,
+            concurrency=config.ENRICH_CONCURRENCY,
+            provider_rates={"itunes": config.ENRICH_ITUNES_RATE, "musicbrainz": config.ENRICH_MUSICBRAINZ_RATE},
+            progress=progress,
+        )
+        return jsonify({"ok": True, "created": created, **job.status()}), 202 if created else 200
+
+    @app.route("/catalog/enrich", methods=["GET"])
+    @app.route("/catalog/enrich/<job_id>", methods=["GET"])
+    def enrich_status(job_id=None):
+        job = enrichment.get_job(job_id)
+        if job is None:
+            return jsonify({"ok": False, "error": "not_found"}), 404
+        return jsonify({"ok": True, **job.status()})
+
+    @socketio.on("enrich_subscribe")
+    def handle_enrich_subscribe(data=None):
+        from flask_socketio import join_room, emit
+        join_room("enrich")
+        job = enrichment.get_job()
+        if job is not None:
+            emit("enrich_progress", job.status())
+
     @app.route("/refresh-catalog", methods=["POST"])
     def refresh_catalog():
-        import subprocess
+        # Reconstrucción completa en proceso (sin subprocess); normalmente ya no
+        # hace falta porque cada mutación del catálogo regenera catalog.json
         try:
-            script_path = Path(__file__).resolve().parent / "catalog" / "gen_catalog.py"
-            result = subprocess.run(["python", str(script_path)], capture_output=True, text=True)
-            if result.returncode == 0:
-                return "✅ Catálogo actualizado correctamente."
-            else:
-                return f"❌ Error al actualizar catálogo:\n{result.stderr}", 500
+            catalog_pipeline.rebuild()
+            return "✅ Catálogo actualizado correctamente."
         except Exception as e:
             return f"❌ Excepción al actualizar catálogo: {str(e)}", 500
 
     @app.route("/missing-artist-photos")
     def missing_artist_photos():
         try:
-            catalog_path = PUBLIC_DIR / "catalog" / "catalog.json"
-
-            with open(catalog_path, "r", encoding="utf-8") as f:
-                catalog = json.load(f)
-
-            missing = []
-            for song in catalog:
-                artist = (song.get("artist") or "").strip()
-                if not artist:
-                    continue
-                # Busca primero en Disk, luego en repo
-                has_image = any((ARTIST_IMG_DIR / f"{artist}{ext}").exists() for ext in [".jpg", ".jpeg", ".png"]) \
-                            or any((PROJECT_ROOT / "songs" / "images" / "artist" / f"{artist}{ext}").exists()
-                                   for ext in [".jpg", ".jpeg", ".png"])
-                if not has_image and artist not in missing:
-                    missing.append(artist)
-
+            # del índice del almacén: sin stat por extensión ni leer catalog.json
+            missing = image_store.missing(song.get("artist") for song in catalog_pipeline.catalog())
             return jsonify(missing)
         except Exception as e:
             return jsonify({"error": str(e)}), 500
@@ -736,7 +646,7 @@ def create_app():
     @app.route("/edit-catalog")
     def edit_catalog():
         from flask import send_file
-        catalog_csv = CATALOG_CSV
+        catalog_csv = catalog_repo.export_csv()  # el CSV se genera bajo demanda
         return send_file(str(catalog_csv), as_attachment=False)
 
     @app.route("/upload-catalog", methods=["POST"])
@@ -748,6 +658,7 @@ def create_app():
             # (Ahora mismo: sobrescribe archivo. Si quieres fusión, te paso el bloque cuando me digas)
             save_path = CATALOG_CSV
             file.save(str(save_path))
+            catalog_repo.import_csv(str(save_path))
             return "✅ Catálogo actualizado correctamente."
         except Exception as e:
             return f"❌ Error al subir catálogo: {str(e)}", 500
@@ -755,23 +666,29 @@ def create_app():
     @app.route("/download-catalog")
     def download_catalog():
         from flask import send_file
-        catalog_csv = CATALOG_CSV
+        catalog_csv = catalog_repo.export_csv()
         return send_file(str(catalog_csv), as_attachment=True)
 
     @app.route("/list-songs")
     def list_songs():
         try:
-            catalog_csv = CATALOG_CSV
-            songs = []
-            with open(catalog_csv, newline="", encoding="utf-8") as f:
-                reader = csv.DictReader(f, delimiter=";")
-                for row in reader:
-                    songs.append({"id": row["id"], "title": row["name"], "artist": row["artist"]})
+            songs = [{"id": row["id"], "title": row["name"], "artist": row["artist"]}
+                     for row in catalog_repo.all()]
             songs.sort(key=lambda x: x["title"].lower())
             return jsonify(songs)
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
+    @app.route("/search")
+    def search():
+        q = (request.args.get("q") or "").strip()
+        try:
+            limit = max(1, min(int(request.args.get("limit", 20)), 100))
+        except ValueError:
+            limit = 20
+        include_disabled = request.args.get("all") in ("1", "true")
+        return jsonify({"q": q, "results": search_index.search(q, limit, include_disabled)})
+
     @app.route("/delete-songs", methods=["POST"])
     def delete_songs():
         try:
@@ -780,33 +697,10 @@ def create_app():
             if not ids:
                 return "No has pasado IDs", 400
 
-            # Rutas base
             BASE_DIR = os.path.dirname(__file__)
-            CORE_DIR = os.path.join(BASE_DIR, "core")
-            catalog_path = os.path.join(CORE_DIR, "catalog_postgres.csv")
-
-            # 1) Detectar separador y cabecera reales
-            with open(catalog_path, "r", encoding="utf-8", newline="") as f:
-                header_line = f.readline().strip()
-                delim = ";" if header_line.count(";") >= header_line.count(",") else ","
-                header = [h.strip() for h in header_line.split(delim)]
-                f.seek(0)
-                reader = csv.DictReader(f, delimiter=delim)
-                rows = []
-                for r in reader:
-                    # Quitar la clave None (campos extra) si aparece
-                    if None in r:
-                        r.pop(None, None)
-                    # Mantener las filas cuyo id NO esté en la lista a borrar
-                    if (r.get("id") or "").strip() not in ids:
-                        rows.append(r)
-
-            # 2) Reescribir CSV limpio (ignorando cualquier campo extra)
-            with open(catalog_path, "w", encoding="utf-8", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=header, delimiter=delim, extrasaction="ignore")
-                writer.writeheader()
-                for r in rows:
-                    writer.writerow(r)
+
+            # 1-2) Borrar filas del catálogo
+            catalog_repo.delete(ids)
 
             # 3) Borrar archivos públicos TAB/Lyrics
             FRONTEND_DIR = os.path.join(os.path.dirname(BASE_DIR), "frontend")
@@ -821,6 +715,8 @@ def create_app():
                     try:
                         if os.path.exists(p):
                             os.remove(p)
+                            song_texts.invalidate(p)
+                            refresh_for(p)
                             removed_files.append(os.path.basename(p))
                     except Exception:
                         pass
@@ -834,17 +730,12 @@ def create_app():
     @app.route("/get-song-status")
     def get_song_status():
         try:
-            catalog_csv = CATALOG_CSV
-            songs = []
-            with open(catalog_csv, newline="", encoding="utf-8") as f:
-                reader = csv.DictReader(f, delimiter=";")
-                for row in reader:
-                    songs.append({
-                        "id": row["id"],
-                        "title": row["name"],
-                        "artist": row["artist"],
-                        "enabled": (row.get("enabled") or "Y").strip().upper()
-                    })
+            songs = [{
+                "id": row["id"],
+                "title": row["name"],
+                "artist": row["artist"],
+                "enabled": (row.get("enabled") or "Y").strip().upper()
+            } for row in catalog_repo.all()]
             return jsonify(songs)
         except Exception as e:
             return jsonify({"error": str(e)}), 500
@@ -857,40 +748,85 @@ def create_app():
             if not updates:
                 return "No se recibieron datos para actualizar.", 400
 
-            catalog_csv = CATALOG_CSV
-            temp_file = Path(str(catalog_csv) + ".tmp")
-
-            with open(catalog_csv, newline="", encoding="utf-8") as infile, open(temp_file, "w", newline="", encoding="utf-8") as outfile:
-                reader = csv.DictReader(infile, delimiter=";")
-                fieldnames = reader.fieldnames
-                writer = csv.DictWriter(outfile, fieldnames=fieldnames, delimiter=";")
-                writer.writeheader()
-                for row in reader:
-                    if row["id"] in updates:
-                        row["enabled"] = "Y" if updates[row["id"]] else "N"
-                    writer.writerow(row)
-
-            os.replace(temp_file, catalog_csv)
+            catalog_repo.set_enabled(updates)  # una transacción, solo las filas afectadas
             return "✅ Estado actualizado correctamente."
         except Exception as e:
             return f"❌ Error al actualizar estado: {str(e)}", 500
 
+    def _facet_filters():
+        return {f: [v.strip() for v in request.args.getlist(f) if v.strip()] for f in FACETS}
+
+    def _versioned_json(payload):
+        # ETag = versión del catálogo + consulta: el navegador revalida con 304
+        resp = jsonify(payload)
+        resp.set_etag(f"{facet_index.version}-{zlib.crc32(request.query_string):x}")
+        resp.cache_control.no_cache = True
+        return resp.make_conditional(request)
+
+    @app.route("/catalog/changes")
+    def catalog_changes():
+        try:
+            since = int(request.args.get("since", ""))
+        except ValueError:
+            return jsonify({"ok": False, "error": "bad_since"}), 400
+        return jsonify(catalog_delta(catalog_repo, since))
+
+    # Campos públicos de /catalog/songs (title == columna name)
+    PAGE_FIELDS = {"title": "name", **{f: f for f in CATALOG_FIELDS if f != "name"}}
+    PAGE_DEFAULT_FIELDS = ["id", "title", "artist", "year", "language", "genre"]
+
+    @app.route("/catalog/songs")
+    def catalog_songs():
+        """
+        Catálogo paginado: ?cursor=&limit=&fields=id,title,artist&enabled=all
+        Cada página lleva la versión del catálogo y el cursor de la siguiente.
+        """
+        fields = [f.strip() for f in (request.args.get("fields") or "").split(",") if f.strip()] or PAGE_DEFAULT_FIELDS
+        bad = [f for f in fields if f not in PAGE_FIELDS]
+        if bad:
+            return jsonify({"ok": False, "error": "bad_fields", "fields": bad}), 400
+        if "id" not in fields:
+            fields = ["id"] + fields
+        try:
+            after = int(request.args.get("cursor") or 0)
+            limit = max(1, min(int(request.args.get("limit") or 200), 1000))
+        except ValueError:
+            return jsonify({"ok": False, "error": "bad_cursor"}), 400
+        version, rows, cursor = catalog_repo.page(after, limit, enabled_only=request.args.get("enabled") != "all")
+        # como catalog.json: los campos vacíos se omiten
+        songs = [{f: row[PAGE_FIELDS[f]] for f in fields if row[PAGE_FIELDS[f]]} for row in rows]
+        songs_json = json.dumps(songs, ensure_ascii=False, separators=(",", ":"))
+        next_json = json.dumps(str(cursor) if cursor else None)
+        resp = app.response_class(f'{{"version":{version},"next":{next_json},"songs":{songs_json}}}',
+                                  mimetype="application/json")
+        # ETag sobre el contenido de la página (sin la versión): una página que no cambió da 304
+        page_hash = zlib.crc32(f"{request.query_string!r}{next_json}{songs_json}".encode("utf-8"))
+        resp.set_etag(f"{page_hash:x}", weak=True)
+        resp.headers["X-Catalog-Version"] = str(version)
+        resp.cache_control.no_cache = True
+        return resp.make_conditional(request)
+
+    @app.route("/catalog/facets")
+    def catalog_facets():
+        return _versioned_json({"version": facet_index.version, "facets": facet_index.counts(_facet_filters())})
+
+    @app.route("/catalog/query")
+    def catalog_query():
+        group = (request.args.get("group") or "").strip() or None
+        if group and group not in FACETS + ("year",):
+            return jsonify({"ok": False, "error": "bad_group"}), 400
+        filters = _facet_filters()
+        songs = facet_index.query(filters, group=group)
+        payload = {"version": facet_index.version, "groups" if group else "songs": songs}
+        if request.args.get("facets") in ("1", "true"):
+            payload["facets"] = facet_index.counts(filters)
+        return _versioned_json(payload)
+
     @app.route("/catalog/fields.json")
     def catalog_fields():
         try:
-            from collections import defaultdict
-            csv_path = CATALOG_CSV
-
             fields = ["artist", "year", "language", "genre", "mood", "key"]
-            values = defaultdict(set)
-            with open(csv_path, newline="", encoding="utf-8") as f:
-                reader = csv.DictReader(f, delimiter=";")
-                for row in reader:
-                    for field in fields:
-                        val = row.get(field, "").strip()
-                        if val:
-                            values[field].add(val)
-            sorted_fields = {k: sorted(values[k]) for k in fields}
+            sorted_fields = {k: sorted(catalog_repo.distinct(k)) for k in fields}
             return jsonify(sorted_fields)
         except Exception as e:
             return jsonify({"error": str(e)}), 500
@@ -902,10 +838,15 @@ def create_app():
             if not file:
                 return "No se recibió ningún archivo", 400
             ext = os.path.splitext(file.filename)[1].lower()
-            if ext not in [".png", ".jpg", ".jpeg"]:
+            if ext not in LOGO_EXTS:
                 return "Formato no permitido. Usa PNG o JPG.", 400
             save_path = IMAGES_DIR / ("event-logo" + ext)
             file.save(str(save_path))
+            for other in LOGO_EXTS:   # que no quede un logo anterior con otra extensión
+                stale = IMAGES_DIR / ("event-logo" + other)
+                if other != ext and stale.exists():
+                    os.remove(stale)
+            refresh_for(str(save_path))                # el resolutor de imágenes lo ve ya
             return "✅ Logo actualizado correctamente."
         except Exception as e:
             return f"❌ Error al subir logo: {str(e)}", 500
@@ -923,21 +864,14 @@ def create_app():
             if ext not in [".jpg", ".jpeg", ".png", ".bmp", ".webp"]:
                 return "Formato no permitido", 400
 
-            safe_artist = artist.strip().replace("/", "_").replace("\\", "_")
-            original_name = safe_artist + ext
-            save_path = ARTIST_IMG_DIR / original_name
-            ARTIST_IMG_DIR.mkdir(parents=True, exist_ok=True)
-            file.save(str(save_path))
-
-            # Crear thumb y actualizar manifest de thumbs
-            created = _make_thumb(save_path, THUMBS_DIR / safe_artist)  # intenta .webp
-            final_name = created or original_name  # fallback
-
-            manifest = _load_thumbs_manifest()
-            manifest[artist] = _urlp.quote(final_name)
-            _save_thumbs_manifest(manifest)
+            entry, dedup = image_store.put_bytes(artist, file.read(), ext)
 
-            return "✅ Imagen subida, miniatura creada y manifest actualizado.", 200
+            # Miniaturas en segundo plano; el manifest de thumbs se actualiza al terminar
+            thumbnails.start_job(thumb_pipeline, [(entry["artist"], image_store.path(entry))],
+                                 socketio.start_background_task, sleep=socketio.sleep)
+            if dedup:
+                return "✅ Imagen ya existente en el almacén (no se duplica); miniaturas en proceso.", 200
+            return "✅ Imagen subida; miniaturas en proceso.", 200
         except Exception as e:
             return f"❌ Error al subir imagen: {str(e)}", 500
 
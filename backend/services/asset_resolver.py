@@ -0,0 +1,135 @@
+# backend/services/asset_resolver.py
+"""
+Resolución por capas de los ficheros de canciones e imágenes.
+
+Una petición a /songs/tabs/TABx.txt buscaba en el Disk persistente y, si no
+estaba, en el repo: uno o dos stat por petición y, con las rutas del
+blueprint de ingest compitiendo, un resultado que dependía del orden de
+registro. Aquí cada familia de ficheros tiene una pila de capas
+(Disk → carpeta de ingest → repo; la primera que tenga el fichero gana) y
+un índice en memoria nombre -> (capa, ruta).
+
+El índice se mantiene por sondeo de mtime de los directorios (crear, borrar
+o renombrar un fichero cambia el mtime de su carpeta): como mucho cada
+`poll_interval` segundos se hace un stat por carpeta y solo se reescanea la
+capa que cambió. Un fallo adelanta esa comprobación, pero como mucho una vez
+cada `miss_interval` segundos (una ráfaga de 404 inventados no puede costar
+un stat por carpeta y petición); las rutas que escriben ficheros llaman a
+`refresh` / `refresh_for(ruta)` y lo nuevo se ve al momento.
+"""
+import os
+import time
+import weakref
+import threading
+
+_resolvers = weakref.WeakSet()   # todos los resolutores vivos (para refresh_for)
+
+
+class LayeredResolver:
+    def __init__(self, layers, exts=None, poll_interval=2.0, miss_interval=1.0, recursive=False,
+                 clock=time.monotonic):
+        self.layers = [str(d) for d in layers]
+        self.exts = tuple(e.lower() for e in exts) if exts else None
+        self.poll_interval = poll_interval
+        self.miss_interval = miss_interval
+        self.recursive = recursive
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._dir_mtimes = [{} for _ in self.layers]   # por capa: carpeta -> mtime_ns
+        self._files = [{} for _ in self.layers]        # por capa: nombre relativo -> ruta
+        self._index = {}                               # nombre -> (capa, directorio de la capa, ruta)
+        self._checked = 0.0
+        self.scans = 0
+        self.refresh(force=True)
+        _resolvers.add(self)
+
+    def __len__(self):
+        return len(self._index)
+
+    # ---------- índice ----------
+    def _scan_layer(self, i):
+        files, mtimes = {}, {}
+        root = self.layers[i]
+        stack = [root]
+        while stack:
+            d = stack.pop()
+            try:
+                mtimes[d] = os.stat(d).st_mtime_ns
+                entries = list(os.scandir(d))
+            except OSError:
+                continue
+            for e in entries:
+                if e.is_dir(follow_symlinks=False):
+                    if self.recursive:
+                        stack.append(e.path)
+                    continue
+                if self.exts and not e.name.lower().endswith(self.exts):
+                    continue
+                rel = os.path.relpath(e.path, root).replace(os.sep, "/")
+                files[rel] = e.path
+        self._files[i] = files
+        self._dir_mtimes[i] = mtimes
+        self.scans += 1
+
+    def _layer_changed(self, i):
+        mtimes = self._dir_mtimes[i]
+        if not mtimes:
+            return os.path.isdir(self.layers[i])  # la capa no existía: ¿ya sí?
+        for d, m in mtimes.items():
+            try:
+                if os.stat(d).st_mtime_ns != m:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def refresh(self, force=False):
+        """Reescanea las capas cuyo directorio cambió (todas con `force`). Devuelve si cambió algo."""
+        with self._lock:
+            changed = False
+            for i in range(len(self.layers)):
+                if force or self._layer_changed(i):
+                    self._scan_layer(i)
+                    changed = True
+            if changed:
+                index = {}
+                for i in reversed(range(len(self.layers))):   # las primeras capas pisan a las últimas
+                    for rel, path in self._files[i].items():
+                        index[rel] = (i, self.layers[i], path)
+                self._index = index
+            self._checked = self._clock()
+            return changed
+
+    def _maybe_poll(self):
+        if self._clock() - self._checked >= self.poll_interval:
+            self.refresh()
+
+    # ---------- consulta ----------
+    def resolve(self, name):
+        """(directorio de la capa, ruta absoluta) del fichero `name`, o None."""
+        self._maybe_poll()
+        hit = self._index.get(name)
+        if hit is None and self._clock() - self._checked >= self.miss_interval and self.refresh():
+            hit = self._index.get(name)  # recién creado fuera de la app: el fallo adelanta el sondeo
+        return (hit[1], hit[2]) if hit else None
+
+    def covers(self, path):
+        path = os.path.abspath(str(path))
+        return any(path.startswith(os.path.abspath(d) + os.sep) for d in self.layers)
+
+    def layer_of(self, name):
+        hit = self._index.get(name)
+        return hit[0] if hit else None
+
+    def names(self):
+        return list(self._index)
+
+    def stats(self):
+        return {"files": len(self._index), "layers": self.layers, "scans": self.scans}
+
+
+def refresh_for(path):
+    """Refresca los resolutores con una capa que contiene `path` (tras escribirlo o borrarlo)."""
+    for resolver in list(_resolvers):
+        if resolver.covers(path):
+            resolver.refresh()
@@ -0,0 +1,82 @@
+# backend/services/backends.py
+"""
+Selección del backend de estado (votos, estados, propuestas, secuencia de
+`update`) y de la cola de mensajes de Socket.IO.
+
+- memory: todo en el proceso (JSON en disco con write-behind). Un solo worker.
+- sqlite: estado y cola pub/sub en un fichero SQLite compartido; permite
+  `gunicorn -w N` en una misma máquina sin perder votos ni broadcasts.
+"""
+try:
+    from backend.core import config
+except Exception:
+    from ..core import config  # type: ignore
+
+from backend.services.persist import JsonDocStore, LocalSequence, read_json
+from backend.services.vote_store import VoteStore
+from backend.services.proposal_store import ProposalStore
+
+DEFAULT_STATES = {"now_playing": None, "played": []}
+
+
+class StoreBackend:
+    def __init__(self, name, votes, states, proposals, sequence, socketio_options=None):
+        self.name = name
+        self.votes = votes
+        self.states = states
+        self.proposals = proposals
+        self.sequence = sequence
+        self._socketio_options = socketio_options or {}
+
+    def socketio_options(self):
+        """kwargs para socketio.init_app (cola de mensajes entre workers)."""
+        return dict(self._socketio_options)
+
+
+def _queue_options():
+    return {"message_queue": config.MESSAGE_QUEUE_URL} if config.MESSAGE_QUEUE_URL else {}
+
+
+def _memory_backend():
+    return StoreBackend(
+        "memory",
+        votes=VoteStore(config.VOTES_FILE, config.VOTES_FLUSH_INTERVAL, config.VOTES_FLUSH_THRESHOLD),
+        states=JsonDocStore(config.SONG_STATES_FILE, DEFAULT_STATES),
+        proposals=ProposalStore(
+            config.PROPOSALS_FILE,
+            compact_interval=config.PROPOSALS_COMPACT_INTERVAL,
+            compact_threshold=config.PROPOSALS_COMPACT_THRESHOLD,
+        ),
+        sequence=LocalSequence(),
+        socketio_options=_queue_options(),
+    )
+
+
+def _sqlite_backend():
+    from backend.services import sqlite_backend as sb
+
+    db = sb.open_db(config.SQLITE_STORE_PATH)
+    # La primera vez se siembra con los JSON existentes
+    options = _queue_options() or {"client_manager": sb.SqlitePubSubManager(config.SQLITE_STORE_PATH)}
+    return StoreBackend(
+        "sqlite",
+        votes=sb.SqliteVoteStore(db, seed=read_json(config.VOTES_FILE, {})),
+        states=sb.SqliteDocStore(db, "song_states", DEFAULT_STATES, seed=read_json(config.SONG_STATES_FILE, None)),
+        proposals=sb.SqliteProposalStore(db, seed=read_json(config.PROPOSALS_FILE, None)),
+        sequence=sb.SqliteSequence(db),
+        socketio_options=options,
+    )
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if config.STORE_BACKEND == "sqlite":
+            _backend = _sqlite_backend()
+        else:
+            _backend = _memory_backend()
+        print(f"[backends] store={_backend.name}", flush=True)
+    return _backend
@@ -0,0 +1,192 @@
+# backend/services/broadcast.py
+import time
+import threading
+
+
+class BroadcastScheduler:
+    """
+    Agrupa ráfagas de cambios en un único emit por sala.
+    - Los cambios que llegan dentro de `window` segundos se fusionan (por clave,
+      gana el último valor) y se emiten en un solo frame cuando la sala lleva
+      `window` segundos sin cambios...
+    - ...pero nunca más tarde de `max_latency` segundos desde el primer cambio
+      pendiente (garantía de latencia máxima aunque los votos no paren).
+    - `window <= 0` desactiva la agrupación: cada cambio se emite al momento.
+    """
+
+    def __init__(self, flush, window=0.15, max_latency=0.5, start_task=None, sleep=None, clock=time.monotonic):
+        self._flush_cb = flush            # flush(room, merged_sections)
+        self.window = window
+        self.max_latency = max(max_latency, window)
+        self._start_task = start_task or (lambda fn, *a: threading.Thread(target=fn, args=a, daemon=True).start())
+        self._sleep = sleep or time.sleep
+        self._clock = clock
+        self._pending = {}                # room -> {"sections": {...}, "events", "first", "last"}
+        self._lock = threading.Lock()
+        # métricas
+        self.events = 0                   # cambios recibidos
+        self.frames = 0                   # emits realizados
+
+    def submit(self, room=None, **sections):
+        """Encola un cambio. Cada sección es un dict que se fusiona por clave."""
+        self.events += 1
+        if self.window <= 0:
+            self.frames += 1
+            self._flush_cb(room, sections)
+            return
+        now = self._clock()
+        with self._lock:
+            pending = self._pending.get(room)
+            start = pending is None
+            if start:
+                pending = {"sections": {}, "events": 0, "first": now, "last": now}
+                self._pending[room] = pending
+            for name, values in sections.items():
+                if values:
+                    pending["sections"].setdefault(name, {}).update(values)
+            pending["events"] += 1
+            pending["last"] = now
+        if start:
+            self._start_task(self._drain, room)
+
+    def discard(self, room=None):
+        """Descarta lo pendiente de una sala (p. ej. tras un snapshot difundido)."""
+        with self._lock:
+            pending = self._pending.pop(room, None)
+        if pending:
+            self.events -= pending["events"]
+
+    def flush(self, room=None):
+        with self._lock:
+            pending = self._pending.pop(room, None)
+        if pending is None:
+            return False
+        self.frames += 1
+        self._flush_cb(room, pending["sections"])
+        return True
+
+    def _drain(self, room):
+        delay = self.window
+        while True:
+            self._sleep(delay)
+            with self._lock:
+                pending = self._pending.get(room)
+                if pending is None:
+                    return
+                now = self._clock()
+                quiet = now - pending["last"]
+                age = now - pending["first"]
+                if quiet < self.window and age < self.max_latency:
+                    delay = min(self.window - quiet, self.max_latency - age)
+                    continue
+            self.flush(room)
+            return
+
+    def stats(self):
+        return {
+            "events": self.events,
+            "frames": self.frames,
+            "merged": self.events - self.frames,
+            "pending_rooms": len(self._pending),
+            "window_ms": int(self.window * 1000),
+            "max_latency_ms": int(self.max_latency * 1000),
+        }
+
+
+class UpdateBroadcaster:
+    """
+    Protocolo de `update` versionado por deltas.
+    - Cada delta lleva un `seq` creciente y SOLO las canciones cuyo recuento
+      (`counts`) o estado (`states`) ha cambiado. Un recuento 0 o un estado
+      None significan "eliminar".
+    - Un snapshot (`full: true`) lleva el estado completo; los clientes lo
+      piden con `update_request` al conectar o al detectar un hueco en `seq`.
+    - Los deltas pasan por un BroadcastScheduler: una ráfaga de votos se
+      traduce en un solo frame por sala. Como los recuentos son absolutos,
+      fusionar deltas es seguro.
+    - `recount(ids)`: con varios workers el `seq` se reserva al emitir, no al
+      votar, así que un recuento leído al votar podría salir con un `seq`
+      mayor que otro más reciente de otro worker. Si se pasa, los recuentos
+      del frame se vuelven a leer del store justo DESPUÉS de reservar el
+      `seq`: cualquier voto posterior a esa lectura saldrá con un `seq` mayor.
+    - `subscribe(fn)`: fn(payload) tras cada frame emitido (delta o snapshot),
+      para trabajo derivado que no debe ir en el camino de cada voto.
+    """
+
+    def __init__(self, emit, event="update", window=0, max_latency=0, start_task=None, sleep=None, sequence=None,
+                 recount=None):
+        self._emit = emit
+        self.event = event
+        # Con varios workers la secuencia es global (ver backends.py)
+        self._sequence = sequence
+        self._recount = recount           # recount(ids) -> {id: n} (0 = eliminar)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.scheduler = BroadcastScheduler(
+            self._emit_delta, window=window, max_latency=max_latency,
+            start_task=start_task, sleep=sleep,
+        )
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _notify(self, payload):
+        for listener in self._listeners:
+            try:
+                listener(payload)
+            except Exception as e:
+                print(f"[broadcast] listener error: {e}", flush=True)
+
+    @property
+    def seq(self):
+        return self._sequence.current() if self._sequence else self._seq
+
+    def _next_seq(self):
+        if self._sequence:
+            return self._sequence.next()
+        with self._lock:
+            self._seq += 1
+            return self._seq
+
+    def _emit_delta(self, room, sections):
+        seq = self._next_seq()
+        counts = sections.get("counts") or {}
+        if counts and self._recount:
+            counts = self._recount(list(counts))  # leídos tras reservar el seq
+        payload = {"seq": seq, "counts": counts, "states": sections.get("states") or {}}
+        self._emit(self.event, payload, to=room)
+        self._notify(payload)
+
+    def publish(self, counts=None, states=None, to=None):
+        """Encola un delta (se emite agrupado). No hace nada si no hay cambios."""
+        if not counts and not states:
+            return False
+        self.scheduler.submit(to, counts=counts, states=states)
+        return True
+
+    def snapshot(self, counts, states, **extra):
+        """Estado completo con el `seq` actual (no avanza la secuencia)."""
+        payload = {"seq": self.seq, "full": True, "counts": counts, "states": states}
+        payload.update(extra)
+        return payload
+
+    def publish_snapshot(self, counts, states, to=None):
+        """Snapshot difundido (p. ej. tras un reset): anula lo pendiente y avanza `seq`."""
+        self.scheduler.discard(to)
+        payload = {"seq": self._next_seq(), "full": True, "counts": counts, "states": states}
+        self._emit(self.event, payload, to=to)
+        self._notify(payload)
+        return payload
+
+
+def diff_states(old, new):
+    """Delta entre dos dicts de estados: claves cambiadas -> nuevo valor (None si se quitó)."""
+    delta = {}
+    for k, v in new.items():
+        if old.get(k) != v:
+            delta[k] = v
+    for k in old:
+        if k not in new:
+            delta[k] = None
+    return delta
@@ -0,0 +1,52 @@
+# backend/services/catalog_follower.py
+"""
+Seguimiento de versiones del repositorio del catálogo para las vistas en
+memoria (catalog_pipeline, search_index, facet_index).
+
+Cada vista implementa `_reload(version)` (reconstrucción completa) y
+`_apply(ids, version)` (solo esos ids, releídos del repositorio); aquí va lo
+común:
+- `attach(repo)`: construye y se suscribe a las mutaciones del repositorio.
+- `on_change`: un import completo ("reset") o un salto de versión (cambios de
+  otro worker que no llegaron por `subscribe`) recargan todo; si no, solo los
+  ids del cambio.
+- `sync()`: antes de consultar, alcanza la versión del repositorio con su log
+  de cambios (una consulta si ya está al día); si el log no llega, recarga.
+"""
+
+
+class CatalogFollower:
+    repo = None
+    version = 0
+
+    def _reload(self, version):
+        raise NotImplementedError
+
+    def _apply(self, ids, version):
+        raise NotImplementedError
+
+    def attach(self, repo):
+        self.repo = repo
+        self._reload(repo.version())
+        repo.subscribe(self.on_change)
+        return self
+
+    def on_change(self, change):
+        if change["op"] == "reset" or change["version"] != self.version + 1:
+            self._reload(change["version"])
+            return
+        self._apply(change["ids"], change["version"])
+
+    def sync(self):
+        repo = self.repo
+        if repo is None:
+            return
+        version, changes = repo.changes_since(self.version)
+        if version == self.version:
+            return
+        if not changes:
+            self._reload(version)
+            return
+        for change in changes:
+            if change["version"] > self.version:
+                self.on_change(change)
@@ -0,0 +1,109 @@
+# backend/services/catalog_pipeline.py
+"""
+Regeneración incremental de catalog.json dentro del proceso.
+Se suscribe a las mutaciones del repositorio del catálogo y solo recalcula
+las entradas de los ids cambiados; el fichero se escribe de forma atómica y
+cada escritura sube la versión/ETag; `sync()` (CatalogFollower) recoge los
+cambios hechos por otros workers. generate_catalog() en
+backend/catalog/gen_catalog.py sigue siendo la reconstrucción completa.
+catalog_delta()/delta_entries() construyen los parches para los clientes a
+partir del log de cambios del repositorio.
+"""
+import json
+import hashlib
+import threading
+
+from backend.catalog.gen_catalog import song_entry, write_catalog, generate_catalog, OUTPUT_JSON
+from backend.services.static_assets import assets
+from backend.services.catalog_follower import CatalogFollower
+
+
+class CatalogJsonPipeline(CatalogFollower):
+    def __init__(self, repo, output=OUTPUT_JSON):
+        self.output = output
+        self.version = 0
+        self.etag = None
+        self._order = []       # ids en orden del catálogo (incluye deshabilitados)
+        self._entries = {}     # id -> entrada publicada (None si no se publica)
+        self._lock = threading.Lock()
+        self.attach(repo)
+
+    def rebuild(self):
+        """Reconstrucción completa (misma salida que gen_catalog.py)."""
+        with self._lock:
+            version = self.repo.version()
+            rows = self.repo.all()
+            catalog = generate_catalog(rows, self.output)  # no reescribe si no cambió
+            assets.precompress_if_stale(self.output)
+            self._order = [r["id"] for r in rows]
+            self._entries = {r["id"]: song_entry(r) for r in rows}
+            self._set_version(version, catalog)
+            return catalog
+
+    # ---------- CatalogFollower ----------
+    def _reload(self, version):
+        self.rebuild()  # toma la versión del repositorio al leer las filas
+
+    def _apply(self, ids, version):
+        with self._lock:
+            for sid in ids:
+                row = self.repo.get(sid)
+                if row is None:
+                    if sid in self._entries:
+                        del self._entries[sid]
+                        self._order.remove(sid)
+                    continue
+                if sid not in self._entries:
+                    self._order.append(sid)
+                self._entries[sid] = song_entry(row)
+            catalog = self.catalog()
+            if write_catalog(catalog, self.output):
+                assets.precompress(self.output)
+            self._set_version(version, catalog)
+
+    def entry(self, song_id):
+        return self._entries.get(song_id)
+
+    def catalog(self):
+        return [e for e in (self._entries[sid] for sid in self._order) if e]
+
+    def _set_version(self, version, catalog):
+        self.version = version
+        digest = hashlib.sha1(json.dumps(catalog, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+        self.etag = f"{version}-{digest[:12]}"
+
+
+def delta_entries(repo, ids):
+    """Parche de catalog.json para `ids`: (entradas a añadir/sustituir, ids a quitar)."""
+    upsert, delete = [], []
+    for sid in dict.fromkeys(ids):
+        row = repo.get(sid)
+        entry = song_entry(row) if row else None
+        if entry:
+            upsert.append(entry)
+        else:
+            delete.append(sid)  # borrada o deshabilitada: ya no se publica
+    return upsert, delete
+
+
+def catalog_delta(repo, since):
+    """
+    Delta acumulado desde la versión `since` para /catalog/changes. Con
+    "reset" el cliente debe recargar catalog.json entero.
+    """
+    version, changes = repo.changes_since(since)
+    if changes is None:
+        return {"version": version, "since": since, "reset": True}
+    upsert, delete = delta_entries(repo, [sid for ch in changes for sid in ch["ids"]])
+    return {"version": version, "since": since, "reset": False, "upsert": upsert, "delete": delete}
+
+
+_pipeline = None
+
+
+def get_catalog_pipeline(repo=None):
+    global _pipeline
+    if _pipeline is None:
+        from backend.services.catalog_store import get_catalog
+        _pipeline = CatalogJsonPipeline(repo or get_catalog())
+    return _pipeline
@@ -0,0 +1,367 @@
+# backend/services/catalog_store.py
+"""
+Catálogo de canciones sobre SQLite (WAL) con índices en id, artist, genre,
+language y year. Las búsquedas por id y las ediciones de una fila son
+O(log n); el CSV (catalog_postgres.csv) queda solo como formato de
+importación/exportación.
+
+Las ediciones de la app viven solo en la base de datos. Al arrancar, el CSV
+se importa entero únicamente si la base está vacía; si el CSV cambió
+(deploy, checkout, edición a mano) solo se añaden los ids que son nuevos en
+el CSV desde la última sincronización, sin tocar ni borrar lo que ya hay (ni
+resucitar lo borrado desde la app). Sustituir el catálogo por el CSV es una
+acción explícita: /upload-catalog o
+
+    python -m backend.services.catalog_store import [ruta.csv]
+"""
+import os
+import csv
+import json
+import time
+import sqlite3
+import threading
+
+try:
+    from backend.core.config import CATALOG_DB, CATALOG_CSV, CATALOG_CHANGELOG_KEEP
+    from backend.services.metrics import FILE_IO_SECONDS
+except Exception:
+    from ..core.config import CATALOG_DB, CATALOG_CSV, CATALOG_CHANGELOG_KEEP  # type: ignore
+    from .metrics import FILE_IO_SECONDS  # type: ignore
+
+# Cabecera PTO de 12 columnas (mismo orden que el CSV)
+CATALOG_FIELDS = ["id", "name", "artist", "year", "language", "genre",
+                  "popularity", "duration", "mood", "key", "tempo", "enabled"]
+EDITABLE_FIELDS = [f for f in CATALOG_FIELDS if f != "id"]
+INDEXED_FIELDS = ["artist", "genre", "language", "year"]
+
+_COLS = ", ".join(f'"{f}"' for f in CATALOG_FIELDS)
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS songs (
+    {", ".join(f'"{f}" TEXT NOT NULL DEFAULT ' + ("'Y'" if f == "enabled" else "''") for f in CATALOG_FIELDS)},
+    PRIMARY KEY ("id")
+);
+{"".join(f'CREATE INDEX IF NOT EXISTS idx_songs_{f} ON songs("{f}");' for f in INDEXED_FIELDS)}
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS changes (
+    version INTEGER PRIMARY KEY, op TEXT NOT NULL, ids TEXT NOT NULL, ts REAL NOT NULL
+);
+"""
+
+
+def _clean(row):
+    """Fila normalizada con las 12 columnas (strings, sin None)."""
+    out = {}
+    for f in CATALOG_FIELDS:
+        v = row.get(f)
+        out[f] = "" if v is None else str(v).strip()
+    if not out["enabled"]:
+        out["enabled"] = "Y"
+    return out
+
+
+class CatalogRepository:
+    def __init__(self, db_path, csv_path=None, changelog_keep=CATALOG_CHANGELOG_KEEP):
+        self.db_path = db_path
+        self.csv_path = csv_path
+        self.changelog_keep = changelog_keep
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.RLock()
+        self._listeners = []
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+        if csv_path:
+            self.sync_from_csv()
+
+    # ---------- cambios ----------
+    def subscribe(self, listener):
+        """
+        listener(change) se llama tras cada mutación confirmada con
+        {"version": int, "op": "upsert"|"delete"|"reset", "ids": [...]}.
+        """
+        self._listeners.append(listener)
+        return listener
+
+    def version(self):
+        rows = self._read("SELECT value FROM meta WHERE key = 'version'")
+        return int(rows[0][0]) if rows else 0
+
+    def _notify(self, change):
+        for fn in list(self._listeners):
+            try:
+                fn(change)
+            except Exception as e:
+                print(f"[catalog_store] listener {getattr(fn, '__name__', fn)} falló: {e}", flush=True)
+
+    # ---------- transacciones ----------
+    def _write(self, fn, op=None, ids=None):
+        """
+        Ejecuta `fn(conn)` en una transacción. Con `op`, si algo cambió
+        (resultado verdadero) sube la versión del catálogo en la misma
+        transacción y avisa a los suscriptores tras el COMMIT.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+                version = None
+                if op and result:
+                    self._conn.execute(
+                        "INSERT INTO meta(key, value) VALUES('version', '1') "
+                        "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+                    version = int(self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0])
+                    # log de cambios en la misma transacción: /catalog/changes?since=
+                    self._conn.execute("INSERT OR REPLACE INTO changes(version, op, ids, ts) VALUES(?, ?, ?, ?)",
+                                       (version, op, json.dumps(list(ids or [])), time.time()))
+                    self._conn.execute("DELETE FROM changes WHERE version <= ?", (version - self.changelog_keep,))
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        if version is not None:
+            self._notify({"version": version, "op": op, "ids": list(ids or [])})
+        return result
+
+    def changes_since(self, since):
+        """
+        (versión actual, [{"version", "op", "ids"}, ...]) con los cambios
+        posteriores a `since`; la lista es None si el log ya no llega hasta
+        `since` o entre medias hubo un import completo (hay que recargar todo).
+        """
+        since = int(since)
+        with self._lock:
+            version = self.version()
+            if since >= version:
+                return version, []
+            rows = self._conn.execute(
+                "SELECT version, op, ids FROM changes WHERE version > ? ORDER BY version", (since,)).fetchall()
+        if not rows or rows[0][0] != since + 1 or any(op == "reset" for _, op, _ in rows):
+            return version, None
+        return version, [{"version": v, "op": op, "ids": json.loads(ids)} for v, op, ids in rows]
+
+    def _read(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # ---------- lectura ----------
+    def get(self, song_id):
+        rows = self._read(f"SELECT {_COLS} FROM songs WHERE id = ?", (song_id,))
+        return dict(rows[0]) if rows else None
+
+    def exists(self, song_id):
+        return bool(self._read("SELECT 1 FROM songs WHERE id = ?", (song_id,)))
+
+    def all(self):
+        """Todas las filas en orden de inserción (el mismo que tenía el CSV)."""
+        return [dict(r) for r in self._read(f"SELECT {_COLS} FROM songs ORDER BY rowid")]
+
+    def page(self, after=0, limit=100, enabled_only=False):
+        """
+        Paginación por cursor (keyset sobre rowid, el orden del catálogo).
+        Devuelve (versión, filas, cursor siguiente o None) leídos a la vez.
+        """
+        where = "rowid > ?" + (" AND enabled != 'N'" if enabled_only else "")
+        with self._lock:
+            version = self.version()
+            rows = self._conn.execute(
+                f"SELECT rowid AS _pos, {_COLS} FROM songs WHERE {where} ORDER BY rowid LIMIT ?",
+                (int(after), int(limit) + 1)).fetchall()
+        more = len(rows) > limit
+        rows = [dict(r) for r in rows[:limit]]
+        cursor = rows[-1].pop("_pos") if more else None
+        for r in rows:
+            r.pop("_pos", None)
+        return version, rows, cursor
+
+    def count(self):
+        return self._read("SELECT COUNT(*) FROM songs")[0][0]
+
+    def distinct(self, field):
+        if field not in CATALOG_FIELDS:
+            raise ValueError(f"Campo no válido: {field}")
+        return [r[0] for r in self._read(f'SELECT DISTINCT "{field}" FROM songs WHERE "{field}" != \'\'')]
+
+    # ---------- escritura ----------
+    def insert(self, row):
+        """Añade una canción nueva. Devuelve False si el id ya existe."""
+        row = _clean(row)
+
+        def tx(c):
+            cur = c.execute(f"INSERT OR IGNORE INTO songs ({_COLS}) VALUES ({', '.join('?' * len(CATALOG_FIELDS))})",
+                            [row[f] for f in CATALOG_FIELDS])
+            return cur.rowcount == 1
+        return self._write(tx, "upsert", [row["id"]])
+
+    def upsert(self, row):
+        """Inserta o sustituye la fila completa (mantiene su posición si ya existía)."""
+        row = _clean(row)
+        sets = ", ".join(f'"{f}" = excluded."{f}"' for f in EDITABLE_FIELDS)
+        self._write(lambda c: c.execute(
+            f"INSERT INTO songs ({_COLS}) VALUES ({', '.join('?' * len(CATALOG_FIELDS))}) "
+            f"ON CONFLICT(id) DO UPDATE SET {sets}",
+            [row[f] for f in CATALOG_FIELDS],
+        ).rowcount, "upsert", [row["id"]])
+
+    def update_field(self, song_id, field, value):
+        """Actualiza un campo de una canción. Devuelve False si el id no existe."""
+        if field not in EDITABLE_FIELDS:
+            raise ValueError(f"Campo no válido: {field}")
+        value = "" if value is None else str(value)
+        return self._write(lambda c: c.execute(
+            f'UPDATE songs SET "{field}" = ? WHERE id = ?', (value, song_id)).rowcount == 1, "upsert", [song_id])
+
+    def update_many(self, changes):
+        """changes: {song_id: {campo: valor}} en una sola transacción. Devuelve nº de filas tocadas."""
+        def tx(c):
+            n = 0
+            for song_id, fields in changes.items():
+                fields = {f: ("" if v is None else str(v)) for f, v in fields.items() if f in EDITABLE_FIELDS}
+                if not fields:
+                    continue
+                sets = ", ".join(f'"{f}" = ?' for f in fields)
+                n += c.execute(f"UPDATE songs SET {sets} WHERE id = ?", [*fields.values(), song_id]).rowcount
+            return n
+        return self._write(tx, "upsert", list(changes))
+
+    def set_enabled(self, updates):
+        """updates: {song_id: bool}"""
+        return self.update_many({sid: {"enabled": "Y" if on else "N"} for sid, on in updates.items()})
+
+    def delete(self, ids):
+        ids = list(ids)
+        return self._write(lambda c: sum(
+            c.execute("DELETE FROM songs WHERE id = ?", (sid,)).rowcount for sid in ids), "delete", ids)
+
+    # ---------- CSV (importación/exportación) ----------
+    def _csv_signature(self, path):
+        st = os.stat(path)
+        return f"{st.st_mtime_ns}:{st.st_size}"
+
+    @staticmethod
+    def _mark_synced(c, sig, ids):
+        """Firma e ids del CSV con el que la base está sincronizada (en la transacción `c`)."""
+        c.execute("INSERT OR REPLACE INTO meta(key, value) VALUES('csv_signature', ?)", (sig,))
+        c.execute("INSERT OR REPLACE INTO meta(key, value) VALUES('csv_ids', ?)", (json.dumps(list(ids)),))
+
+    def _read_csv(self, path):
+        """Filas normalizadas del CSV (detecta ';' o ','), sin ids vacíos ni repetidos."""
+        with FILE_IO_SECONDS.labels(file=os.path.basename(path), op="load").time(), \
+                open(path, "r", encoding="utf-8", newline="") as f:
+            header_line = f.readline()
+            delim = ";" if header_line.count(";") >= header_line.count(",") else ","
+            f.seek(0)
+            rows = []
+            seen = set()
+            for r in csv.DictReader(f, delimiter=delim):
+                r.pop(None, None)
+                r = _clean({(k or "").strip().lower(): v for k, v in r.items()})
+                if not r["id"] or r["id"] in seen:
+                    continue
+                seen.add(r["id"])
+                rows.append(r)
+        return rows
+
+    def import_csv(self, path=None):
+        """Sustituye el catálogo por el contenido del CSV (acción explícita: borra lo que no esté en él)."""
+        path = path or self.csv_path
+        rows = self._read_csv(path)
+        sig = self._csv_signature(path)
+
+        def tx(c):
+            c.execute("DELETE FROM songs")
+            c.executemany(f"INSERT INTO songs ({_COLS}) VALUES ({', '.join('?' * len(CATALOG_FIELDS))})",
+                          [[r[f] for f in CATALOG_FIELDS] for r in rows])
+            self._mark_synced(c, sig, [r["id"] for r in rows])
+            return True
+        self._write(tx, "reset")
+        return len(rows)
+
+    def merge_csv(self, path=None):
+        """
+        Añade las canciones nuevas en el CSV desde la última sincronización
+        (y que no estén ya en la base); no modifica ni borra filas. Devuelve
+        cuántas añadió.
+        """
+        path = path or self.csv_path
+        rows = self._read_csv(path)
+        sig = self._csv_signature(path)
+        added = []
+
+        def tx(c):
+            known = c.execute("SELECT value FROM meta WHERE key = 'csv_ids'").fetchone()
+            known = set(json.loads(known[0])) if known else set()
+            for r in rows:
+                if r["id"] in known:
+                    continue  # ya estaba en el CSV: si falta en la base es que se borró desde la app
+                if c.execute(f"INSERT OR IGNORE INTO songs ({_COLS}) VALUES ({', '.join('?' * len(CATALOG_FIELDS))})",
+                             [r[f] for f in CATALOG_FIELDS]).rowcount == 1:
+                    added.append(r["id"])
+            self._mark_synced(c, sig, [r["id"] for r in rows])
+            return len(added)
+        self._write(tx, "upsert", added)
+        return len(added)
+
+    def export_csv(self, path=None):
+        """Escribe el catálogo en CSV (';', cabecera PTO) de forma atómica."""
+        path = path or self.csv_path
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with FILE_IO_SECONDS.labels(file=os.path.basename(path), op="save").time():
+            with open(tmp, "w", encoding="utf-8", newline="") as f:
+                w = csv.writer(f, delimiter=";")
+                w.writerow(CATALOG_FIELDS)
+                rows = self.all()
+                for r in rows:
+                    w.writerow([r[k] for k in CATALOG_FIELDS])
+            os.replace(tmp, path)
+        self._write(lambda c: self._mark_synced(c, self._csv_signature(path), [r["id"] for r in rows]))
+        return path
+
+    def sync_from_csv(self):
+        """
+        Arranque: importa el CSV si la base está vacía; si el CSV cambió fuera
+        de la app solo añade los ids nuevos (nunca pisa ni borra ediciones).
+        """
+        if not self.csv_path or not os.path.exists(self.csv_path):
+            return False
+        if not self.count():
+            n = self.import_csv(self.csv_path)
+            print(f"[catalog_store] importadas {n} canciones desde {self.csv_path}", flush=True)
+            return True
+        rows = self._read("SELECT value FROM meta WHERE key = 'csv_signature'")
+        if rows and rows[0][0] == self._csv_signature(self.csv_path):
+            return False
+        n = self.merge_csv(self.csv_path)
+        print(f"[catalog_store] {self.csv_path} cambió: {n} canciones nuevas añadidas "
+              f"(para sustituir el catálogo: /upload-catalog o `python -m backend.services.catalog_store import`)",
+              flush=True)
+        return n > 0
+
+
+_repo = None
+
+
+def get_catalog():
+    global _repo
+    if _repo is None:
+        _repo = CatalogRepository(CATALOG_DB, CATALOG_CSV)
+    return _repo
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ("import", "merge", "export"):
+        print("uso: python -m backend.services.catalog_store import|merge|export [ruta.csv]")
+        sys.exit(2)
+    cmd, path = sys.argv[1], (sys.argv[2] if len(sys.argv) > 2 else CATALOG_CSV)
+    repo = CatalogRepository(CATALOG_DB)   # sin sync automático: solo lo que se pide
+    if cmd == "import":
+        print(f"{repo.import_csv(path)} canciones importadas desde {path} (catálogo sustituido)")
+    elif cmd == "merge":
+        print(f"{repo.merge_csv(path)} canciones nuevas añadidas desde {path}")
+    else:
+        print(f"catálogo exportado a {repo.export_csv(path)}")
@@ -0,0 +1,202 @@
+# backend/services/chart_render.py
+"""
+Transposición, capo y notación de tabs en el servidor.
+
+Trabaja sobre los acordes posicionados de tab_parser: solo se reescriben los
+tokens que el clasificador reconoce como acordes (líneas de acordes, acordes
+de un marcador de sección y acordes en línea "[G]"), y cada acorde se vuelve
+a colocar en su columna original comiéndose o añadiendo espacios, así que la
+alineación con la letra de debajo se conserva.
+
+Las variantes renderizadas se guardan en un LRU acotado con clave
+(hash del contenido, transformación): cambiar de tono en la tablet del
+escenario no vuelve a leer ni a parsear el fichero.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+try:
+    from backend.services.tab_parser import classify_line, is_chord
+except Exception:
+    from .tab_parser import classify_line, is_chord  # type: ignore
+
+SHARP_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+FLAT_NAMES = ["C", "Db", "D", "Eb", "E", "F", "Gb", "G", "Ab", "A", "Bb", "B"]
+LATIN_NAMES = {"C": "Do", "D": "Re", "E": "Mi", "F": "Fa", "G": "Sol", "A": "La", "B": "Si"}
+_NATURAL = {"C": 0, "D": 2, "E": 4, "F": 5, "G": 7, "A": 9, "B": 11,
+            "Do": 0, "Re": 2, "Ré": 2, "Mi": 4, "Fa": 5, "Sol": 7, "La": 9, "Si": 11}
+_ROOT_RE = re.compile(r"^(Do|Re|Ré|Mi|Fa|Sol|La|Si|[A-G])(#|b|♯|♭)?")
+NOTATIONS = ("english", "latin")
+
+
+def _split_root(s):
+    m = _ROOT_RE.match(s)
+    if not m:
+        return None
+    root, acc = m.group(1), m.group(2) or ""
+    semi = _NATURAL[root] + (1 if acc in ("#", "♯") else -1 if acc in ("b", "♭") else 0)
+    return semi % 12, acc in ("b", "♭"), len(root) > 1, m.end()
+
+
+def _name(semi, flat, latin):
+    name = (FLAT_NAMES if flat else SHARP_NAMES)[semi % 12]
+    if latin:
+        name = LATIN_NAMES[name[0]] + name[1:]
+    return name
+
+
+def transpose_chord(chord, semitones, notation=None, accidentals=None):
+    """
+    'C#m7/G#' +2 -> 'D#m7/A#'. `notation`: None (la del original), 'english'
+    o 'latin'. `accidentals`: None (la del original), 'sharps' o 'flats'.
+    """
+    parsed = _split_root(chord)
+    if parsed is None:
+        return chord
+    semi, flat, latin, end = parsed
+    if accidentals:
+        flat = accidentals == "flats"
+    if notation:
+        latin = notation == "latin"
+    rest = chord[end:]
+    bass = ""
+    slash = rest.rfind("/")
+    if slash != -1 and _split_root(rest[slash + 1:]):
+        rest, bass = rest[:slash], rest[slash + 1:]
+    # digitación "(079900)" se deja tal cual; un acorde alternativo "(CM7)" se transpone
+    if "(" in rest and rest.endswith(")"):
+        i = rest.index("(")
+        inner = rest[i + 1:-1]
+        if _split_root(inner) and is_chord(inner):
+            rest = rest[:i] + "(" + transpose_chord(inner, semitones, notation, accidentals) + ")"
+    out = _name(semi + semitones, flat, latin) + rest
+    if bass:
+        out += "/" + transpose_chord(bass, semitones, notation, accidentals)
+    return out
+
+
+def _realign(line, chords, fn):
+    """Sustituye cada (col, acorde) por fn(acorde) manteniendo las columnas originales."""
+    out = []
+    width = 0
+    cursor = 0
+    for col, old in chords:
+        gap = line[cursor:col]
+        late = width + len(gap) - col
+        if late > 0:
+            # el acorde anterior creció: se come espacios del hueco (deja al menos uno)
+            lead = len(gap) - len(gap.lstrip(" "))
+            keep = 1 if (width and lead) else 0
+            gap = gap[min(late, max(0, lead - keep)):]
+        elif late < 0:
+            gap = " " * (-late) + gap  # el anterior encogió: rellena
+        new = fn(old)
+        out.append(gap)
+        out.append(new)
+        width += len(gap) + len(new)
+        cursor = col + len(old)
+    out.append(line[cursor:])
+    return "".join(out).rstrip()
+
+
+def _inline(line, fn):
+    """'[G]palabra' -> '[A]palabra' sin tocar el resto de corchetes."""
+    out = []
+    i, n = 0, len(line)
+    while i < n:
+        j = line.find("[", i)
+        if j == -1:
+            out.append(line[i:])
+            break
+        k = line.find("]", j + 1)
+        if k == -1:
+            out.append(line[i:])
+            break
+        inner = line[j + 1:k]
+        out.append(line[i:j])
+        out.append("[" + fn(inner) + "]" if is_chord(inner) else line[j:k + 1])
+        i = k + 1
+    return "".join(out)
+
+
+def render_chart(text, transpose=0, capo=0, notation=None, accidentals=None):
+    """
+    Texto del tab con los acordes transpuestos. Con capo N los acordes se
+    escriben N semitonos por debajo (formas a tocar con cejilla) y se añade
+    una línea "Capo N" al principio.
+    """
+    shift = int(transpose) - int(capo)
+    if shift % 12 == 0 and not notation and not accidentals and not capo:
+        return text
+
+    def fn(chord):
+        return transpose_chord(chord, shift, notation, accidentals)
+
+    out = []
+    for raw in text.splitlines():
+        kind, _, chords, _ = classify_line(raw)
+        if kind in ("chords", "section") and chords:
+            out.append(_realign(raw.rstrip(), chords, fn))
+        elif kind == "lyric" and "[" in raw:
+            out.append(_inline(raw, fn))
+        else:
+            out.append(raw)
+    if capo:
+        out.insert(0, f"Capo {int(capo)}")
+    return "\n".join(out) + ("\n" if text.endswith("\n") else "")
+
+
+class RenderCache:
+    """LRU acotado de variantes renderizadas: clave (hash de contenido, transformación)."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get_or_render(self, content_hash, transform, load_text):
+        key = (content_hash, transform)
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return hit
+        self.misses += 1
+        rendered = render_chart(load_text(), *transform)
+        with self._lock:
+            self._items[key] = rendered
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return rendered
+
+    def stats(self):
+        return {"entries": len(self._items), "max_entries": self.max_entries,
+                "hits": self.hits, "misses": self.misses}
+
+
+def parse_transform(args):
+    """(transpose, capo, notation, accidentals) normalizado desde los query args; None si no hay transformación."""
+    keys = ("transpose", "capo", "notation", "accidentals")
+    if not any(args.get(k) for k in keys):
+        return None
+    values = {}
+    for key in ("transpose", "capo"):
+        try:
+            values[key] = int((args.get(key) or "0").strip() or 0)
+        except ValueError:
+            raise ValueError(key) from None  # la ruta responde bad_<key>
+    transpose, capo = values["transpose"], values["capo"]
+    if not 0 <= capo <= 11:
+        raise ValueError("capo")
+    notation = (args.get("notation") or "").strip().lower() or None
+    if notation not in (None,) + NOTATIONS:
+        raise ValueError("notation")
+    accidentals = (args.get("accidentals") or "").strip().lower() or None
+    if accidentals not in (None, "sharps", "flats"):
+        raise ValueError("accidentals")
+    # transpose módulo 12 (+14 == +2) para compartir entradas de caché
+    return (transpose % 12, capo, notation, accidentals)
@@ -0,0 +1,188 @@
+# backend/services/enrichment.py
+"""
+Enriquecimiento masivo del catálogo: año y género para todas las filas a las
+que les falte alguno.
+
+- Pool acotado de green threads (eventlet.GreenPool; hilos si no hay eventlet).
+- Ritmo por proveedor (MusicBrainz pide 1 req/s): cada llamada reserva su
+  hueco en un `RatePacer` compartido, así que la concurrencia no lo rebasa.
+- Pasa por la caché de metadatos compartida (aciertos y negativos con TTL).
+- Un único update_many al final (una transacción, un evento de catálogo).
+- Progreso vía callback (la ruta lo reenvía como `enrich_progress`).
+- El HTTP de los proveedores es inyectable; `rebase_http(url)` redirige todas
+  las consultas a un servidor falso local para pruebas.
+"""
+import time
+import uuid
+import threading
+import urllib.parse
+
+try:
+    import eventlet
+except Exception:  # pragma: no cover
+    eventlet = None
+
+try:
+    from backend.services.meta_cache import (
+        PROVIDERS, http_json, fetch_metadata, cache_key, get_meta_cache,
+    )
+except Exception:
+    from .meta_cache import PROVIDERS, http_json, fetch_metadata, cache_key, get_meta_cache  # type: ignore
+
+# peticiones/segundo por proveedor (iTunes documenta ~20/min)
+DEFAULT_PROVIDER_RATES = {"itunes": 20 / 60.0, "musicbrainz": 1.0}
+
+
+class RatePacer:
+    """Espacia las llamadas a `rate`/s reservando huecos; no rechaza, espera."""
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = self._clock()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            self._sleep(slot - now)
+
+
+def rebase_http(base_url, http=http_json):
+    """HTTP que sustituye esquema y host de cada URL por `base_url` (servidor falso)."""
+    base = urllib.parse.urlsplit(base_url)
+
+    def _http(url, headers=None, timeout=7):
+        u = urllib.parse.urlsplit(url)
+        return http(urllib.parse.urlunsplit((base.scheme, base.netloc, u.path, u.query, "")),
+                    headers=headers, timeout=timeout)
+    return _http
+
+
+def needs_enrichment(row):
+    return not (row.get("year") or "").strip() or not (row.get("genre") or "").strip()
+
+
+class EnrichmentJob:
+    def __init__(self, repo, cache=None, http=http_json, concurrency=8, provider_rates=None,
+                 progress=None, sleep=None, progress_every=0.5):
+        self.id = uuid.uuid4().hex[:12]
+        self.repo = repo
+        self.cache = cache or get_meta_cache()
+        self.http = http
+        self.concurrency = max(1, int(concurrency))
+        self._sleep = sleep or (eventlet.sleep if eventlet else time.sleep)
+        rates = dict(DEFAULT_PROVIDER_RATES, **(provider_rates or {}))
+        self.pacers = {name: RatePacer(rates.get(name, 0), sleep=self._sleep) for name, _ in PROVIDERS}
+        self.providers = [(name, self._paced(name, fn)) for name, fn in PROVIDERS]
+        self._progress = progress
+        self._progress_every = progress_every
+        self._last_progress = 0.0
+        self.state = "pending"
+        self.total = self.done = self.updated = self.errors = 0
+        self.started = self.finished = None
+        self.error = None
+
+    def _paced(self, name, fn):
+        def call(title, artist, http):
+            self.pacers[name].wait()
+            return fn(title, artist, http=http)
+        return call
+
+    def status(self):
+        return {
+            "job": self.id, "state": self.state, "total": self.total, "done": self.done,
+            "updated": self.updated, "errors": self.errors,
+            "started": self.started, "finished": self.finished, "error": self.error,
+        }
+
+    def _emit(self, force=False):
+        now = time.monotonic()
+        if self._progress and (force or now - self._last_progress >= self._progress_every):
+            self._last_progress = now
+            try:
+                self._progress(self.status())
+            except Exception:
+                pass
+
+    def _resolve(self, row):
+        title, artist = row.get("name") or "", row.get("artist") or ""
+        try:
+            entry, _ = self.cache.lookup(
+                cache_key(title, artist),
+                lambda: fetch_metadata(title, artist, http=self.http, providers=self.providers),
+            )
+        except Exception:
+            self.errors += 1
+            entry = None
+        self.done += 1
+        self._emit()
+        return row["id"], entry
+
+    def run(self):
+        self.state = "running"
+        self.started = time.time()
+        try:
+            rows = [r for r in self.repo.all() if needs_enrichment(r) and (r.get("name") or "").strip()]
+            self.total = len(rows)
+            self._emit(force=True)
+            if eventlet is not None:
+                results = list(eventlet.GreenPool(self.concurrency).imap(self._resolve, rows))
+            else:
+                from concurrent.futures import ThreadPoolExecutor
+                with ThreadPoolExecutor(self.concurrency) as ex:
+                    results = list(ex.map(self._resolve, rows))
+            self.updated = self.apply(results)
+            self.state = "done"
+        except Exception as e:
+            self.state = "error"
+            self.error = str(e)
+        self.finished = time.time()
+        self._emit(force=True)
+        return self.status()
+
+    def apply(self, results):
+        """Rellena solo los campos que siguen vacíos, en un único update_many."""
+        changes = {}
+        for song_id, entry in results:
+            if not entry:
+                continue
+            row = self.repo.get(song_id)  # releído: no pisa ediciones hechas durante el job
+            if not row:
+                continue
+            fields = {f: entry[f] for f in ("year", "genre")
+                      if entry.get(f) and not (row.get(f) or "").strip()}
+            if fields:
+                changes[song_id] = fields
+        return self.repo.update_many(changes) if changes else 0
+
+
+# ---------- job único por proceso ----------
+_current = None
+_jobs = {}
+_lock = threading.Lock()
+
+
+def start_job(repo, start_task, **kwargs):
+    """Lanza un job en segundo plano (si no hay otro en marcha). Devuelve (job, creado)."""
+    global _current
+    with _lock:
+        if _current is not None and _current.state in ("pending", "running"):
+            return _current, False
+        job = EnrichmentJob(repo, **kwargs)
+        _current = job
+        _jobs[job.id] = job
+        while len(_jobs) > 20:
+            _jobs.pop(next(iter(_jobs)))
+    start_task(job.run)
+    return job, True
+
+
+def get_job(job_id=None):
+    if job_id is None:
+        return _current
+    return _jobs.get(job_id)
@@ -0,0 +1,183 @@
+# backend/services/facet_index.py
+"""
+Índices de facetas en memoria para /catalog/facets y /catalog/query.
+
+Por cada faceta (artist, genre, language, decade, enabled) un índice
+invertido valor -> conjunto de ids. Una consulta intersecta los conjuntos
+empezando por el más pequeño; los recuentos de cada faceta se calculan con
+los filtros de las *demás* facetas (facetado disyuntivo), así que la UI puede
+mostrar "Rock (12)" aunque ya haya un género elegido.
+
+Se mantiene al día suscrito al repositorio del catálogo: solo se tocan los
+ids de cada cambio (reconstrucción completa solo en imports o huecos de
+versión) y antes de cada consulta `sync` recoge los cambios hechos por otros
+workers (CatalogFollower, como catalog_pipeline y search_index).
+"""
+import threading
+from collections import defaultdict
+
+try:
+    from backend.services.catalog_follower import CatalogFollower
+except Exception:
+    from .catalog_follower import CatalogFollower  # type: ignore
+
+FACETS = ("artist", "genre", "language", "decade", "enabled")
+ENTRY_FIELDS = ("artist", "year", "language", "genre")
+UNKNOWN = "[Unknown]"
+
+
+def decade(year):
+    y = (year or "").strip()[:4]
+    return f"{y[:3]}0s" if len(y) == 4 and y.isdigit() else ""
+
+
+def facet_values(row):
+    return {
+        "artist": (row.get("artist") or "").strip(),
+        "genre": (row.get("genre") or "").strip(),
+        "language": (row.get("language") or "").strip(),
+        "decade": decade(row.get("year")),
+        "enabled": "N" if (row.get("enabled") or "Y").strip().upper() == "N" else "Y",
+    }
+
+
+def entry(row):
+    """Misma forma que catalog.json (id, title y los campos no vacíos) más `enabled`."""
+    out = {"id": row["id"], "title": (row.get("name") or "").strip()}
+    for f in ENTRY_FIELDS:
+        v = (row.get(f) or "").strip()
+        if v:
+            out[f] = v
+    out["enabled"] = facet_values(row)["enabled"]
+    return out
+
+
+class FacetIndex(CatalogFollower):
+    def __init__(self):
+        self.version = 0
+        self._index = {f: defaultdict(set) for f in FACETS}
+        self._values = {}     # id -> {faceta: valor}
+        self._entries = {}    # id -> entrada publicada
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ---------- mantenimiento ----------
+    def remove(self, song_id):
+        with self._lock:
+            self._entries.pop(song_id, None)
+            for f, v in self._values.pop(song_id, {}).items():
+                ids = self._index[f].get(v)
+                if ids is not None:
+                    ids.discard(song_id)
+                    if not ids:
+                        del self._index[f][v]
+
+    def index(self, row):
+        with self._lock:
+            self.remove(row["id"])
+            values = facet_values(row)
+            self._values[row["id"]] = values
+            self._entries[row["id"]] = entry(row)
+            for f, v in values.items():
+                self._index[f][v].add(row["id"])
+
+    def rebuild(self, rows, version=0):
+        with self._lock:
+            for f in FACETS:
+                self._index[f].clear()
+            self._values.clear()
+            self._entries.clear()
+            for row in rows:
+                self.index(row)
+            self.version = version
+
+    # ---------- CatalogFollower ----------
+    def _reload(self, version):
+        self.rebuild(self.repo.all(), version)
+
+    def _apply(self, ids, version):
+        with self._lock:
+            for sid in ids:
+                row = self.repo.get(sid)
+                if row is None:
+                    self.remove(sid)
+                else:
+                    self.index(row)
+            self.version = version
+
+    # ---------- consulta ----------
+    @staticmethod
+    def _filters(filters):
+        """{faceta: [valores]} sin facetas desconocidas ni listas vacías; "[Unknown]" == vacío."""
+        return {f: ["" if v == UNKNOWN else v for v in vs]
+                for f, vs in (filters or {}).items() if f in FACETS and vs}
+
+    def _match(self, filters, skip=None):
+        """Ids que cumplen todos los filtros (OR dentro de una faceta), salvo la faceta `skip`."""
+        sets = []
+        for f, wanted in filters.items():
+            if f == skip:
+                continue
+            idx = self._index[f]
+            if len(wanted) == 1:
+                sets.append(idx.get(wanted[0], set()))
+            else:
+                sets.append(set().union(*(idx.get(v, ()) for v in wanted)))
+        if not sets:
+            return None  # sin filtros: todos
+        sets.sort(key=len)
+        out = set(sets[0])
+        for s in sets[1:]:
+            out &= s
+            if not out:
+                break
+        return out
+
+    def counts(self, filters=None):
+        """{faceta: [[valor, n], ...]} ordenado por n desc y valor."""
+        self.sync()
+        filters = self._filters(filters)
+        out = {}
+        with self._lock:
+            for f in FACETS:
+                allowed = self._match(filters, skip=f)
+                rows = []
+                for v, ids in self._index[f].items():
+                    n = len(ids) if allowed is None else len(ids & allowed)
+                    if n:
+                        rows.append([v or UNKNOWN, n])
+                rows.sort(key=lambda r: (-r[1], r[0].lower()))
+                out[f] = rows
+        return out
+
+    def query(self, filters=None, group=None):
+        """Entradas que cumplen los filtros, por título; con `group`, [[valor, [entradas]], ...]."""
+        self.sync()
+        filters = self._filters(filters)
+        with self._lock:
+            ids = self._match(filters)
+            ids = list(self._entries) if ids is None else ids
+            songs = [self._entries[i] for i in ids]
+            if group in FACETS:
+                keys = {i: self._values[i][group] for i in ids}
+        songs.sort(key=lambda e: e["title"].lower())
+        if not group:
+            return songs
+        grouped = defaultdict(list)
+        for e in songs:
+            v = keys[e["id"]] if group in FACETS else e.get(group, "")
+            grouped[v or UNKNOWN].append(e)
+        return [[k, grouped[k]] for k in sorted(grouped)]
+
+
+_index = None
+
+
+def get_facet_index(repo=None):
+    global _index
+    if _index is None:
+        from backend.services.catalog_store import get_catalog
+        _index = FacetIndex().attach(repo or get_catalog())
+    return _index
@@ -0,0 +1,159 @@
+# backend/services/image_store.py
+"""
+Almacén de fotos de artista direccionado por contenido.
+
+- Cada imagen se guarda una sola vez como `objects/<sha1><ext>`; dos subidas
+  idénticas (o el mismo fichero en disco y en el repo) comparten objeto.
+- Un único índice (index.json) responde "artista -> hash, fichero y
+  variantes" sin tocar el sistema de ficheros: nada de probar extensiones
+  con .exists() ni de reescanear directorios para cada manifest.
+- Los objetos que ya no usa ningún artista se borran al sustituirlos.
+- `import_dirs` migra las carpetas antiguas (Disk y repo) al almacén; los
+  primeros directorios mandan y, dentro de uno, la mejor extensión.
+"""
+import os
+import hashlib
+import threading
+import unicodedata
+import urllib.parse
+
+try:
+    from backend.services.persist import atomic_write_json, read_json
+except Exception:
+    from .persist import atomic_write_json, read_json  # type: ignore
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+# prioridad de extensiones al migrar (mejor → peor), la misma que el antiguo manifest
+EXT_PRIORITY = {".webp": 5, ".jpg": 4, ".jpeg": 3, ".png": 2, ".bmp": 1}
+
+
+def artist_key(name):
+    """Clave tolerante: sin %20, espacios extra, mayúsculas ni tildes."""
+    name = " ".join(urllib.parse.unquote(name or "").split()).casefold()
+    return "".join(ch for ch in unicodedata.normalize("NFKD", name) if not unicodedata.combining(ch))
+
+
+class ArtistImageStore:
+    def __init__(self, root):
+        self.root = str(root)
+        self.objects_dir = os.path.join(self.root, "objects")
+        self.index_path = os.path.join(self.root, "index.json")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        data = read_json(self.index_path, {})
+        self._artists = data.get("artists", {})   # nombre -> {"hash", "file", "size", "variants"}
+        self._keys = {artist_key(a): a for a in self._artists}
+
+    def __len__(self):
+        return len(self._artists)
+
+    # ---------- índice ----------
+    def _save(self):
+        atomic_write_json(self.index_path, {"artists": self._artists})
+
+    def entry(self, artist):
+        with self._lock:
+            name = artist if artist in self._artists else self._keys.get(artist_key(artist))
+            return dict(self._artists[name], artist=name) if name else None
+
+    def has(self, artist):
+        return artist in self._artists or artist_key(artist) in self._keys
+
+    def missing(self, artists):
+        """Artistas (en orden, sin repetir) que no tienen foto."""
+        return [a for a in dict.fromkeys(a.strip() for a in artists if a and a.strip()) if not self.has(a)]
+
+    def path(self, entry):
+        return os.path.join(self.objects_dir, entry["file"])
+
+    def items(self):
+        """[(artista, ruta del objeto)] para el pipeline de miniaturas."""
+        with self._lock:
+            return [(a, os.path.join(self.objects_dir, e["file"])) for a, e in self._artists.items()]
+
+    def manifest(self):
+        """Formato del antiguo manifest: artista -> '<artista><ext>' ya URL-encoded."""
+        with self._lock:
+            return {a: urllib.parse.quote(a + os.path.splitext(e["file"])[1]) for a, e in self._artists.items()}
+
+    def set_variants(self, artist, variants):
+        with self._lock:
+            e = self._artists.get(artist)
+            if e is None:
+                return
+            e["variants"] = variants
+            self._save()
+
+    # ---------- escritura ----------
+    def _gc(self, file):
+        if not any(e["file"] == file for e in self._artists.values()):
+            try:
+                os.remove(os.path.join(self.objects_dir, file))
+            except OSError:
+                pass
+
+    def put_bytes(self, artist, data, ext, save=True):
+        """
+        Guarda la foto de `artist`. Devuelve (entrada, deduplicada): si el
+        contenido ya estaba en el almacén no se escribe de nuevo.
+        """
+        ext = ext.lower()
+        if ext not in IMAGE_EXTS:
+            raise ValueError(f"Formato no permitido: {ext}")
+        digest = hashlib.sha1(data).hexdigest()
+        file = digest + (".jpg" if ext == ".jpeg" else ext)
+        target = os.path.join(self.objects_dir, file)
+        with self._lock:
+            dedup = os.path.exists(target)
+            if not dedup:
+                tmp = f"{target}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, target)
+            old = self._artists.get(artist)
+            if old and old["hash"] == digest:
+                return dict(old, artist=artist), True
+            self._artists[artist] = {"hash": digest, "file": file, "size": len(data), "variants": []}
+            self._keys[artist_key(artist)] = artist
+            if old:
+                self._gc(old["file"])
+            if save:
+                self._save()
+            return dict(self._artists[artist], artist=artist), dedup
+
+    def put_file(self, artist, path, save=True):
+        with open(path, "rb") as f:
+            return self.put_bytes(artist, f.read(), os.path.splitext(str(path))[1], save=save)
+
+    def import_dirs(self, dirs, force=False):
+        """
+        Migra `<artista>.<ext>` de las carpetas antiguas. Devuelve (importadas, deduplicadas).
+        Los artistas que ya están en el índice se saltan (las subidas solo viven en el
+        almacén y no deben pisarse con la copia antigua); `force` los reimporta.
+        """
+        chosen = {}
+        for base in dirs:
+            base = str(base)
+            if not os.path.isdir(base):
+                continue
+            found = {}
+            for name in os.listdir(base):
+                root, ext = os.path.splitext(name)
+                ext = ext.lower()
+                p = os.path.join(base, name)
+                if ext not in EXT_PRIORITY or not os.path.isfile(p):
+                    continue
+                artist = urllib.parse.unquote(root)
+                if EXT_PRIORITY[ext] > found.get(artist, ("", -1))[1]:
+                    found[artist] = (p, EXT_PRIORITY[ext])
+            for artist, (p, _) in found.items():
+                if force or not self.has(artist):
+                    chosen.setdefault(artist, p)
+        imported = dedup = 0
+        with self._lock:
+            for artist, p in chosen.items():
+                _, was_dedup = self.put_file(artist, p, save=False)
+                imported += 1
+                dedup += was_dedup
+            self._save()
+        return imported, dedup
@@ -0,0 +1,226 @@
+# backend/services/meta_cache.py
+"""
+Metadatos (año, género) de canciones desde iTunes / MusicBrainz con caché
+compartida.
+
+- En memoria primero: OrderedDict con expulsión LRU a partir de `max_entries`.
+- TTL distinto para aciertos y para resultados vacíos ("none"), que antes se
+  quedaban cacheados para siempre.
+- Persistencia agrupada (write-behind) en metadata_cache.json.
+- Single-flight: dos peticiones iguales a la vez comparten una sola consulta.
+"""
+import json
+import time
+import threading
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+
+try:
+    from backend.core import config
+    from backend.services.persist import WriteBehind, atomic_write_json, read_json
+    from backend.services.metrics import META_CACHE
+except Exception:
+    from ..core import config  # type: ignore
+    from .persist import WriteBehind, atomic_write_json, read_json  # type: ignore
+    from .metrics import META_CACHE  # type: ignore
+
+USER_AGENT = "PTO/1.0 (playthatone)"
+
+
+def http_json(url, headers=None, timeout=7):
+    req = urllib.request.Request(url, headers=headers or {"User-Agent": USER_AGENT})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return json.loads(resp.read().decode("utf-8", errors="ignore"))
+
+
+def score_match(qt, qa, it_title, it_artist):
+    # coincidencias sencillas sin librerías extra
+    t = (it_title or "").lower()
+    a = (it_artist or "").lower()
+    s = 0
+    if qt in t: s += 3
+    if qa and qa in a: s += 2
+    # bonus por igualdad (muy aproximado)
+    if t == qt: s += 2
+    if qa and a == qa: s += 1
+    return s
+
+
+def cache_key(title, artist):
+    return "|".join([(title or "").strip().lower(), (artist or "").strip().lower()])
+
+
+def is_negative(entry):
+    return entry.get("source") == "none" or not (entry.get("year") or entry.get("genre"))
+
+
+# ---------- proveedores ----------
+def fetch_itunes(title, artist, http=http_json):
+    q = urllib.parse.quote_plus((title + " " + artist).strip())
+    data = http(f"https://itunes.apple.com/search?term={q}&entity=song&limit=5")
+    qt, qa = title.lower(), artist.lower()
+    best = None; best_score = -1
+    for it in data.get("results", []):
+        sc = score_match(qt, qa, it.get("trackName", ""), it.get("artistName", ""))
+        if sc > best_score: best, best_score = it, sc
+    if not best:
+        return None
+    return {"source": "itunes",
+            "year": (best.get("releaseDate", "") or "")[:4],
+            "genre": best.get("primaryGenreName", "") or ""}
+
+
+def fetch_musicbrainz(title, artist, http=http_json):
+    if artist: q = f'recording:"{title}" AND artist:"{artist}"'
+    else:      q = f'recording:"{title}"'
+    url = "https://musicbrainz.org/ws/2/recording/?query=" + urllib.parse.quote(q) + "&fmt=json&limit=5"
+    data = http(url, headers={"User-Agent": USER_AGENT})
+    recs = data.get("recordings", []) or []
+    year = ""; genre = ""
+    if recs:
+        recs.sort(key=lambda r: int(r.get("score", 0)), reverse=True)
+        r0 = recs[0]
+        year = (r0.get("first-release-date", "") or "")[:4]
+        if not year and r0.get("releases"):
+            for rel in r0["releases"]:
+                d = rel.get("date", "")
+                if d and len(d) >= 4: year = d[:4]; break
+        tags = r0.get("tags") or []
+        if tags:
+            tags.sort(key=lambda t: int(t.get("count", 1)), reverse=True)
+            genre = tags[0].get("name", "")
+    return {"source": "musicbrainz", "year": year, "genre": genre}
+
+
+PROVIDERS = [("itunes", fetch_itunes), ("musicbrainz", fetch_musicbrainz)]
+
+
+def fetch_metadata(title, artist, http=http_json, providers=None):
+    """Consulta los proveedores en orden; el primero que responde gana."""
+    for _, fetch in providers or PROVIDERS:
+        try:
+            found = fetch(title, artist, http=http)
+        except Exception:
+            continue
+        if found:
+            return found
+    return {"source": "none", "year": "", "genre": ""}
+
+
+# ---------- caché ----------
+class MetadataCache:
+    def __init__(self, path, max_entries=5000, hit_ttl=30 * 86400, negative_ttl=86400,
+                 flush_interval=5.0, flush_threshold=50, clock=time.time):
+        self.path = path
+        self.max_entries = max_entries
+        self.hit_ttl = hit_ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._inflight = {}  # key -> [Event, resultado]
+        now = clock()
+        data = read_json(path, {})
+        for key, entry in (data.items() if isinstance(data, dict) else []):
+            entry = dict(entry)
+            # entradas antiguas sin ts: los aciertos renuevan TTL, los "none" se reintentan
+            entry.setdefault("ts", 0 if is_negative(entry) else now)
+            self._entries[key] = entry
+        self._entries = OrderedDict(sorted(self._entries.items(), key=lambda kv: kv[1]["ts"]))
+        self._trim()
+        self._persist = WriteBehind(
+            self.snapshot,
+            lambda d: atomic_write_json(self.path, d),
+            interval=flush_interval,
+            threshold=flush_threshold,
+            name="meta-cache-flusher",
+        )
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expired(self, entry, now):
+        ttl = self.negative_ttl if is_negative(entry) else self.hit_ttl
+        return now - entry.get("ts", 0) > ttl
+
+    def _trim(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry, now):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return dict(entry)
+
+    def put(self, key, value):
+        entry = dict(value, ts=self._clock())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._trim()
+        self._persist.touch()
+        return dict(entry)
+
+    def snapshot(self):
+        with self._lock:
+            return {k: dict(v) for k, v in self._entries.items()}
+
+    def flush(self):
+        return self._persist.flush()
+
+    def lookup(self, key, fetch, timeout=30):
+        """
+        Devuelve (entrada, cached). Si falta, llama a `fetch()` una sola vez
+        aunque lleguen varias peticiones iguales a la vez.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            META_CACHE.labels(result="hit").inc()
+            return entry, True
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = [threading.Event(), None]
+        if not leader:
+            META_CACHE.labels(result="coalesced").inc()
+            flight[0].wait(timeout)
+            if flight[1] is not None:
+                return dict(flight[1]), True
+            return self.lookup(key, fetch, timeout)  # el líder falló: reintenta
+        META_CACHE.labels(result="miss").inc()
+        try:
+            flight[1] = self.put(key, fetch())
+            return dict(flight[1]), False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight[0].set()
+
+
+_cache = None
+
+
+def get_meta_cache():
+    global _cache
+    if _cache is None:
+        _cache = MetadataCache(
+            config.META_CACHE_FILE,
+            max_entries=config.META_CACHE_MAX_ENTRIES,
+            hit_ttl=config.META_CACHE_HIT_TTL,
+            negative_ttl=config.META_CACHE_NEGATIVE_TTL,
+        )
+    return _cache
+
+
+def lookup_metadata(title, artist="", http=http_json):
+    """Año/género de (title, artist) pasando por la caché. Devuelve (entrada, cached)."""
+    return get_meta_cache().lookup(cache_key(title, artist), lambda: fetch_metadata(title, artist, http=http))
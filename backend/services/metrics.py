@@ -0,0 +1,231 @@
+# backend/services/metrics.py
+"""
+Instrumentación interna con exposición en formato de texto de Prometheus.
+
+Los instrumentos no usan locks: cada actualización es una suma sobre un
+atributo o una celda de lista, sin llamadas que cedan el control. Bajo
+eventlet (un worker, greenlets cooperativos) eso es exacto; con hilos reales
+una carrera podría perder algún incremento suelto, lo cual es aceptable para
+métricas y mucho más barato que un lock en el camino del voto.
+
+    VOTES_TOTAL.labels(result="changed").inc()
+    with VOTE_SECONDS.time():
+        ...
+    FILE_IO_SECONDS.labels(file="votes.json", op="load").observe(0.002)
+"""
+import time
+from bisect import bisect_left
+from functools import wraps
+
+# Cubos por defecto pensados para el camino caliente (sub-milisegundo a segundos)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+def _fmt(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(v) if isinstance(v, float) else str(v)
+
+
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labelstr(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Timer:
+    __slots__ = ("_observe", "_t0")
+
+    def __init__(self, observe):
+        self._observe = observe
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._observe(time.perf_counter() - self._t0)
+        return False
+
+    def __call__(self, fn):
+        observe = self._observe
+
+        @wraps(fn)
+        def wrapper(*a, **kw):
+            t0 = time.perf_counter()
+            try:
+                return fn(*a, **kw)
+            finally:
+                observe(time.perf_counter() - t0)
+        return wrapper
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+
+    def labels(self, *values, **kw):
+        if kw:
+            values = tuple(kw[n] for n in self.labelnames)
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            # setdefault es atómico: si dos llegan a la vez, gana uno y ambos lo usan
+            child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _samples(self):
+        if not self.labelnames:
+            yield from self._child_samples(self, (), ())
+            return
+        for key, child in list(self._children.items()):
+            yield from self._child_samples(child, self.labelnames, key)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self._samples():
+            lines.append(f"{name}{labels} {_fmt(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.value = 0
+
+    def _new_child(self):
+        return Counter(self.name, self.help)
+
+    def inc(self, n=1):
+        self.value += n
+
+    def _child_samples(self, child, names, values):
+        yield self.name, _labelstr(names, values), child.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), fn=None):
+        super().__init__(name, help, labelnames)
+        self.value = 0
+        self._fn = fn  # si se da, el valor se calcula al exponer
+
+    def _new_child(self):
+        return Gauge(self.name, self.help)
+
+    def set(self, v):
+        self.value = v
+
+    def inc(self, n=1):
+        self.value += n
+
+    def dec(self, n=1):
+        self.value -= n
+
+    def _child_samples(self, child, names, values):
+        v = child.value
+        if child._fn is not None:
+            try:
+                v = child._fn()
+            except Exception:
+                return
+        yield self.name, _labelstr(names, values), v
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # último = +Inf
+        self.sum = 0.0
+
+    def _new_child(self):
+        return Histogram(self.name, self.help, buckets=self.buckets)
+
+    def observe(self, v):
+        self._counts[bisect_left(self.buckets, v)] += 1
+        self.sum += v
+
+    def time(self):
+        """Context manager / decorador que observa la duración en segundos."""
+        return _Timer(self.observe)
+
+    @property
+    def count(self):
+        return sum(self._counts)
+
+    def _child_samples(self, child, names, values):
+        acc = 0
+        counts = list(child._counts)
+        for bound, c in zip(child.buckets + (float("inf"),), counts):
+            acc += c
+            yield self.name + "_bucket", _labelstr(names, values, ("le", _fmt(float(bound)))), acc
+        yield self.name + "_sum", _labelstr(names, values), child.sum
+        yield self.name + "_count", _labelstr(names, values), acc
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        # idempotente por nombre: recargar un módulo no duplica series
+        return self._metrics.setdefault(metric.name, metric)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        return "\n".join(m.render() for m in list(self._metrics.values())) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def counter(name, help, labelnames=()):
+    return REGISTRY.register(Counter(name, help, labelnames))
+
+
+def gauge(name, help, labelnames=(), fn=None):
+    return REGISTRY.register(Gauge(name, help, labelnames, fn=fn))
+
+
+def histogram(name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, help, labelnames, buckets))
+
+
+def render():
+    return REGISTRY.render()
+
+
+# ---------- instrumentos del proyecto ----------
+VOTE_SECONDS = histogram("pto_vote_handle_seconds", "Tiempo de proceso de un voto (store + delta)")
+VOTES_TOTAL = counter("pto_votes_total", "Votos recibidos", ("result",))
+FILE_IO_SECONDS = histogram("pto_file_io_seconds", "Duración de carga/guardado de JSON y CSV", ("file", "op"))
+EMIT_SECONDS = histogram("pto_emit_seconds", "Duración de cada emit de Socket.IO", ("event",))
+EMIT_FANOUT = histogram("pto_emit_fanout_clients", "Clientes destinatarios por emit", ("event",), SIZE_BUCKETS)
+SOCKETS_CONNECTED = gauge("pto_sockets_connected", "Sockets conectados a este worker")
+RATE_LIMITED = counter("pto_rate_limited_total", "Peticiones rechazadas por el limitador", ("endpoint", "scope"))
+META_CACHE = counter("pto_meta_cache_lookups_total", "Búsquedas en la caché de metadatos", ("result",))
+THUMB_SECONDS = histogram("pto_thumbnail_seconds", "Tiempo de generación de miniaturas")
+SEARCH_SECONDS = histogram("pto_search_seconds", "Tiempo de una consulta al índice de búsqueda",
+                           buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01))
@@ -0,0 +1,135 @@
+# backend/services/persist.py
+import os
+import json
+import atexit
+import threading
+
+try:
+    from backend.services.metrics import FILE_IO_SECONDS
+except Exception:
+    from .metrics import FILE_IO_SECONDS  # type: ignore
+
+
+def atomic_write_json(path, data, indent=None):
+    """Escribe JSON de forma segura ante caídas: tmp + fsync + os.replace."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with FILE_IO_SECONDS.labels(file=os.path.basename(path), op="save").time():
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent, separators=None if indent else (",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+
+def read_json(path, default):
+    try:
+        with FILE_IO_SECONDS.labels(file=os.path.basename(path), op="load").time():
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+class WriteBehind:
+    """
+    Volcado diferido a disco de un estado residente en memoria.
+    - touch() marca cambios pendientes (O(1), no toca disco).
+    - Un hilo de fondo vuelca cada `interval` segundos, o antes si se
+      acumulan `threshold` cambios.
+    - `snapshot` devuelve los datos a escribir; `write` los persiste.
+    """
+
+    def __init__(self, snapshot, write, interval=1.0, threshold=500, name="write-behind"):
+        self._snapshot = snapshot
+        self._write = write
+        self.interval = interval
+        self.threshold = threshold
+        self.name = name
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        atexit.register(self.flush)
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def touch(self, n=1):
+        self._pending += n
+        if self._thread is None:
+            self._start()
+        if self._pending >= self.threshold:
+            self._wake.set()
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return False
+            pending = self._pending
+            data = self._snapshot()
+            self._pending = 0
+            try:
+                self._write(data)
+            except Exception as e:
+                # no perdemos los cambios: se reintentan en el siguiente ciclo
+                self._pending += pending
+                print(f"[{self.name}] error al volcar: {e}", flush=True)
+                return False
+            return True
+
+    def _start(self):
+        t = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread = t
+        t.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+
+class JsonDocStore:
+    """Documento JSON pequeño (estados, propuestas) con lectura/escritura atómica en un proceso."""
+
+    def __init__(self, path, default):
+        self.path = path
+        self._default = default
+        self._lock = threading.Lock()
+
+    def _fresh_default(self):
+        return json.loads(json.dumps(self._default))
+
+    def load(self):
+        data = read_json(self.path, None)
+        return self._fresh_default() if data is None else data
+
+    def save(self, value):
+        with self._lock:
+            atomic_write_json(self.path, value, indent=2)
+
+    def update(self, fn):
+        """Lee-modifica-escribe atómico. `fn(value)` muta/devuelve (nuevo_valor, resultado)."""
+        with self._lock:
+            value, result = fn(self.load())
+            atomic_write_json(self.path, value, indent=2)
+            return result
+
+
+class LocalSequence:
+    """Contador monotónico en memoria (un único proceso)."""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def current(self):
+        return self._value
+
+    def next(self):
+        with self._lock:
+            self._value += 1
+            return self._value
@@ -0,0 +1,104 @@
+# backend/services/prefetch.py
+"""
+Precarga de los tabs de las próximas canciones para inter.html.
+
+Cuando el host fija `now_playing`, el tab tenía que pedirse en ese momento y
+se notaba en el escenario. Aquí se usa el ranking de votos en vivo para
+adivinar las K siguientes (más votadas, sin las ya tocadas ni la actual) y
+se empujan por Socket.IO a la sala del intérprete: el texto del tab si es
+pequeño y, siempre, su URL con hash de contenido (?v=<hash>, inmutable).
+
+- Solo se emite cuando cambia la predicción (ids o hash de algún tab), y
+  solo con los tabs que el cliente aún no tiene; un cliente que (re)entra
+  en la sala recibe el snapshot completo.
+- Fuera del camino del voto: recuentos y estados se reflejan en memoria a
+  partir de los frames `update` ya agrupados (UpdateBroadcaster.subscribe),
+  así que la predicción se recalcula una vez por ventana, no por voto, y sin
+  leer song_states.json.
+- Cada worker recuerda lo último que empujó; con varios workers a lo sumo
+  se repite algún tab, el cliente lo reconoce por el hash.
+"""
+import threading
+
+PLAYED_STATES = ("now_playing", "played")
+
+
+def predict_next(counts, states, limit=None):
+    """Ids de las canciones votadas, de más a menos votos, sin la actual ni las tocadas."""
+    skip = {sid for sid, st in (states or {}).items() if st in PLAYED_STATES}
+    ranked = sorted((sid for sid, n in counts.items() if n > 0 and sid not in skip),
+                    key=lambda sid: (-counts[sid], sid))
+    return ranked if limit is None else ranked[:limit]
+
+
+class PerformerPrefetch:
+    def __init__(self, load_tab, emit, k=3, room="performer", event="prefetch"):
+        self.load_tab = load_tab   # load_tab(id) -> {"digest", "url", "text" o None} o None si no hay tab
+        self.emit = emit
+        self.k = k
+        self.room = room
+        self.event = event
+        self._last = ()            # ((id, digest), ...) de la última predicción empujada
+        self.counts = {}           # espejo de los recuentos (id -> n)
+        self.states = {}           # espejo de los estados (id -> now_playing/played)
+        self._lock = threading.Lock()
+        self.pushes = 0
+
+    # ---------- espejo de votos/estados ----------
+    def reset(self, counts, states):
+        with self._lock:
+            self.counts = dict(counts or {})
+            self.states = dict(states or {})
+
+    def apply(self, payload):
+        """Aplica un frame `update` (delta o snapshot) al espejo."""
+        with self._lock:
+            if payload.get("full"):
+                self.counts = dict(payload.get("counts") or {})
+                self.states = dict(payload.get("states") or {})
+                return
+            for sid, n in (payload.get("counts") or {}).items():
+                if n:
+                    self.counts[sid] = n
+                else:
+                    self.counts.pop(sid, None)
+            for sid, st in (payload.get("states") or {}).items():
+                if st is None:
+                    self.states.pop(sid, None)
+                else:
+                    self.states[sid] = st
+
+    # ---------- predicción ----------
+    def plan(self):
+        """[(id, tab)] de las K siguientes que tienen tab (las candidatas sin tab se saltan)."""
+        with self._lock:
+            ranked = predict_next(self.counts, self.states)
+        out = []
+        for sid in ranked:
+            tab = self.load_tab(sid)
+            if tab is not None:
+                out.append((sid, tab))
+                if len(out) == self.k:
+                    break
+        return out
+
+    def snapshot(self):
+        """Payload completo para un intérprete que acaba de entrar en la sala."""
+        plan = self.plan()
+        return {"next": [sid for sid, _ in plan], "tabs": dict(plan), "full": True}
+
+    def refresh(self):
+        """Recalcula y, si la predicción cambió, empuja solo los tabs nuevos. Devuelve el payload o None."""
+        plan = self.plan()
+        sig = tuple((sid, tab["digest"]) for sid, tab in plan)
+        with self._lock:
+            if sig == self._last:
+                return None
+            known = set(self._last)
+            self._last = sig
+        payload = {"next": [sid for sid, _ in plan],
+                   "tabs": {sid: tab for sid, tab in plan if (sid, tab["digest"]) not in known},
+                   "full": False}
+        self.pushes += 1
+        self.emit(self.event, payload, to=self.room)
+        return payload
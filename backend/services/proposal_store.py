@@ -0,0 +1,156 @@
+# backend/services/proposal_store.py
+"""
+Propuestas de canciones en memoria con índice slug -> entrada y ranking
+ordenado por (-count, first_ts) mantenido de forma incremental.
+
+Cada alta o borrado se añade como una línea a un journal (JSON lines) en vez
+de reescribir proposals.json; un compactador en segundo plano vuelca el
+snapshot ordenado a proposals.json y vacía el journal cada `compact_interval`
+segundos o cada `compact_threshold` registros. Los registros llevan el estado
+final de la entrada, así que reaplicar el journal sobre un snapshot ya
+compactado es idempotente.
+"""
+import os
+import json
+import threading
+from bisect import bisect_left, insort
+
+from backend.services.persist import WriteBehind, atomic_write_json, read_json
+
+
+def _rank_key(p):
+    return (-p["count"], p["first_ts"], p["slug"])
+
+
+class ProposalStore:
+    def __init__(self, path, journal_path=None, compact_interval=60.0, compact_threshold=1000):
+        self.path = path
+        self.journal_path = journal_path or os.path.splitext(path)[0] + ".journal"
+        self._lock = threading.RLock()
+        self._by_slug = {}
+        self._rank = []  # claves _rank_key ordenadas
+        self._load()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._persist = WriteBehind(
+            lambda: None,
+            lambda _: self.compact(),
+            interval=compact_interval,
+            threshold=compact_threshold,
+            name="proposals-compactor",
+        )
+
+    # ---------- carga ----------
+    def _load(self):
+        data = read_json(self.path, [])
+        for p in data if isinstance(data, list) else []:
+            if p.get("slug"):
+                self._put(dict(p))
+        replayed = 0
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # última línea a medias tras una caída
+                    self._apply(rec)
+                    replayed += 1
+        except FileNotFoundError:
+            pass
+        return replayed
+
+    def _apply(self, rec):
+        if rec.get("deleted"):
+            self._drop(rec["slug"])
+        else:
+            self._put(rec)
+
+    # ---------- índice + ranking ----------
+    def _put(self, item):
+        old = self._by_slug.get(item["slug"])
+        if old is not None:
+            self._unrank(old)
+        self._by_slug[item["slug"]] = item
+        insort(self._rank, _rank_key(item))
+
+    def _drop(self, slug):
+        old = self._by_slug.pop(slug, None)
+        if old is not None:
+            self._unrank(old)
+        return old
+
+    def _unrank(self, item):
+        key = _rank_key(item)
+        i = bisect_left(self._rank, key)
+        if i < len(self._rank) and self._rank[i] == key:
+            del self._rank[i]
+
+    def _log(self, rec):
+        self._journal.write(json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._journal.flush()
+        self._persist.touch()
+
+    # ---------- API ----------
+    def __len__(self):
+        return len(self._by_slug)
+
+    def get(self, slug):
+        p = self._by_slug.get(slug)
+        return dict(p) if p else None
+
+    def submit(self, slug, title, now):
+        """Alta o +1 de una propuesta. Devuelve (entrada, dedup)."""
+        now = int(now)
+        with self._lock:
+            old = self._by_slug.get(slug)
+            if old is not None:
+                item = dict(old, count=old["count"] + 1, last_ts=now)
+            else:
+                item = {"slug": slug, "title": title, "count": 1, "first_ts": now, "last_ts": now}
+            self._put(item)
+            self._log(item)
+            return dict(item), old is not None
+
+    def remove(self, slug):
+        with self._lock:
+            if self._drop(slug) is None:
+                return False
+            self._log({"slug": slug, "deleted": True})
+            return True
+
+    def ranked(self, limit=None):
+        """Propuestas ya ordenadas por (-count, first_ts), sin reordenar."""
+        keys = self._rank if limit is None else self._rank[:limit]
+        by_slug = self._by_slug
+        return [dict(by_slug[k[2]]) for k in keys if k[2] in by_slug]
+
+    # Compatibilidad con la interfaz de documento (JsonDocStore)
+    def load(self):
+        return self.ranked()
+
+    def save(self, value):
+        with self._lock:
+            self._by_slug = {}
+            self._rank = []
+            for p in value or []:
+                self._put(dict(p))
+            self._compact_locked()
+
+    def update(self, fn):
+        with self._lock:
+            value, result = fn(self.ranked())
+            self.save(value)
+            return result
+
+    # ---------- compactación ----------
+    def _compact_locked(self):
+        atomic_write_json(self.path, self.ranked(), indent=2)
+        self._journal.truncate(0)
+        self._journal.seek(0)
+
+    def compact(self):
+        with self._lock:
+            self._compact_locked()
+
+    def flush(self):
+        return self._persist.flush()
@@ -0,0 +1,115 @@
+# backend/services/rate_limit.py
+"""
+Limitador de peticiones por token bucket con memoria acotada.
+
+Cada clave (IP, deviceId...) tiene un cubo de `burst` fichas que se rellena a
+`rate` fichas/segundo. Los cubos viven en un OrderedDict en orden de último
+uso: los que llevan más de `ttl` segundos sin uso se descartan (por defecto
+el tiempo de rellenar el cubo entero, así que descartarlos no cambia ninguna
+decisión) y, si aun así se supera `max_keys`, se expulsa el menos reciente.
+
+    votes_by_device = TokenBucketLimiter(rate=2, burst=5, name="vote")
+    if not votes_by_device.allow(device_id):
+        ...
+"""
+import time
+import threading
+from collections import OrderedDict
+
+try:
+    from flask import request
+except Exception:  # pragma: no cover
+    request = None
+
+try:
+    from backend.services.metrics import RATE_LIMITED
+except Exception:
+    from .metrics import RATE_LIMITED  # type: ignore
+
+
+class TokenBucketLimiter:
+    def __init__(self, rate, burst, max_keys=10000, ttl=None, name="default", scope="key", clock=time.monotonic):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_keys = int(max_keys)
+        self.ttl = float(ttl) if ttl is not None else (self.burst / self.rate if self.rate > 0 else 3600.0)
+        self.name = name
+        self.scope = scope
+        self._clock = clock
+        self._buckets = OrderedDict()  # key -> [fichas, último uso]
+        self._lock = threading.Lock()
+        self._rejected = RATE_LIMITED.labels(endpoint=name, scope=scope)
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _evict(self, now):
+        buckets = self._buckets
+        # los más antiguos están al principio: se para en el primero aún vivo
+        while buckets:
+            key, (_, last) = next(iter(buckets.items()))
+            if now - last < self.ttl and len(buckets) <= self.max_keys:
+                break
+            buckets.popitem(last=False)
+
+    def allow(self, key, cost=1.0):
+        """Consume `cost` fichas de `key`. False si no quedan (y cuenta el rechazo)."""
+        now = self._clock()
+        with self._lock:
+            b = self._buckets.get(key)
+            if b is None:
+                b = self._buckets[key] = [self.burst, now]
+            else:
+                b[0] = min(self.burst, b[0] + (now - b[1]) * self.rate)
+                b[1] = now
+                self._buckets.move_to_end(key)
+            ok = b[0] >= cost
+            if ok:
+                b[0] -= cost
+            self._evict(now)
+        if not ok:
+            self._rejected.inc()
+        return ok
+
+    def peek(self, key, cost=1.0):
+        """True si `key` tiene `cost` fichas, sin consumirlas."""
+        b = self._buckets.get(key)
+        if b is None:
+            return self.burst >= cost
+        return min(self.burst, b[0] + (self._clock() - b[1]) * self.rate) >= cost
+
+    def retry_after(self, key, cost=1.0):
+        """Segundos hasta que `key` vuelva a tener `cost` fichas."""
+        b = self._buckets.get(key)
+        if b is None or self.rate <= 0:
+            return 0.0
+        tokens = min(self.burst, b[0] + (self._clock() - b[1]) * self.rate)
+        return max(0.0, (cost - tokens) / self.rate)
+
+    def reset(self, key=None):
+        with self._lock:
+            if key is None:
+                self._buckets.clear()
+            else:
+                self._buckets.pop(key, None)
+
+
+def allow_all(*checks, cost=1.0):
+    """
+    checks: (limitador, clave). Consume de todos solo si todos tienen fichas:
+    un rechazo por IP no gasta la ficha del dispositivo (ni al revés).
+    """
+    for limiter, key in checks:
+        if not limiter.peek(key, cost):
+            limiter._rejected.inc()
+            return False
+    for limiter, key in checks:
+        limiter.allow(key, cost)
+    return True
+
+
+def client_ip():
+    """Clave de IP de la petición actual (HTTP o evento Socket.IO)."""
+    if request is None:
+        return "?"
+    return request.headers.get("X-Forwarded-For", request.remote_addr) or "?"
@@ -0,0 +1,264 @@
+# backend/services/search_index.py
+"""
+Índice invertido en memoria para /search sobre título, artista, género y letra.
+
+- Normalización sin acentos para los catálogos en castellano y catalán
+  ("Canción" == "cancion", "l·l" == "ll", "ç" == "c").
+- Prefijo sobre el último término ("bea" -> "beatles") con el vocabulario
+  ordenado y bisect.
+- Tolerancia a erratas (1 edición, términos de 4+ letras) con un índice de
+  borrados tipo SymSpell: solo se comparan los candidatos que comparten un
+  borrado, nunca todo el vocabulario.
+- Incremental: se suscribe al repositorio del catálogo y reindexa solo los ids
+  cambiados; `refresh(id)` reindexa a mano cuando la letra se escribe después
+  de la fila (/add-song). Cada búsqueda compara antes con la versión del
+  repositorio (`sync`, de CatalogFollower) para ver los cambios hechos por
+  otros workers.
+"""
+import os
+import re
+import time
+import bisect
+import threading
+import unicodedata
+from collections import defaultdict
+
+try:
+    from backend.services.metrics import SEARCH_SECONDS
+    from backend.services.catalog_follower import CatalogFollower
+except Exception:
+    from .metrics import SEARCH_SECONDS  # type: ignore
+    from .catalog_follower import CatalogFollower  # type: ignore
+
+# peso de cada campo en la puntuación
+FIELD_WEIGHTS = {"name": 4.0, "artist": 3.0, "genre": 1.5, "lyrics": 1.0}
+LYRICS_TF_CAP = 3          # repeticiones de un término en la letra que cuentan
+EXACT, PREFIX, TYPO = 1.0, 0.7, 0.5
+MIN_PREFIX = 2
+MIN_TYPO = 4
+MAX_EXPANSIONS = 64        # términos como máximo por prefijo/errata
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text):
+    """Minúsculas y sin diacríticos; el punto volado catalán desaparece."""
+    text = (text or "").lower().replace("·", "").replace("ŀ", "l")
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def tokenize(text):
+    return _WORD_RE.findall(normalize(text))
+
+
+def _deletes(term):
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def _within_one(a, b):
+    """Distancia de Damerau-Levenshtein <= 1 (inserción, borrado, cambio o trasposición)."""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diff = [i for i in range(la) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+    if la > lb:
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+def read_lyrics(dirs):
+    """Cargador de letra: el primer `<id>.txt` que exista en `dirs`."""
+    def load(song_id):
+        for d in dirs:
+            p = os.path.join(str(d), f"{song_id}.txt")
+            if os.path.isfile(p):
+                try:
+                    with open(p, encoding="utf-8", errors="ignore") as f:
+                        return f.read()
+                except OSError:
+                    continue
+        return ""
+    return load
+
+
+class SearchIndex(CatalogFollower):
+    def __init__(self, load_lyrics=None):
+        self.load_lyrics = load_lyrics or (lambda song_id: "")
+        self.version = 0
+        self._postings = defaultdict(dict)   # término -> {id: peso}
+        self._doc_terms = {}                 # id -> {término: peso} (para quitarlo sin releer)
+        self._docs = {}                      # id -> {"id", "title", "artist", "enabled"}
+        self._vocab = []                     # términos ordenados (prefijos)
+        self._deletes = defaultdict(set)     # borrado -> términos (erratas)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    # ---------- mantenimiento ----------
+    def _add_term(self, term):
+        bisect.insort(self._vocab, term)
+        if len(term) >= MIN_TYPO:
+            for d in _deletes(term):
+                self._deletes[d].add(term)
+
+    def _drop_term(self, term):
+        i = bisect.bisect_left(self._vocab, term)
+        if i < len(self._vocab) and self._vocab[i] == term:
+            del self._vocab[i]
+        if len(term) >= MIN_TYPO:
+            for d in _deletes(term):
+                bucket = self._deletes.get(d)
+                if bucket is not None:
+                    bucket.discard(term)
+                    if not bucket:
+                        del self._deletes[d]
+
+    def _weights(self, row, lyrics):
+        weights = {}
+        for field in ("name", "artist", "genre"):
+            for t in set(tokenize(row.get(field))):
+                weights[t] = weights.get(t, 0.0) + FIELD_WEIGHTS[field]
+        tf = {}
+        for t in tokenize(lyrics):
+            tf[t] = tf.get(t, 0) + 1
+        for t, n in tf.items():
+            weights[t] = weights.get(t, 0.0) + FIELD_WEIGHTS["lyrics"] * min(n, LYRICS_TF_CAP) / LYRICS_TF_CAP
+        return weights
+
+    def remove(self, song_id):
+        with self._lock:
+            self._docs.pop(song_id, None)
+            for t in self._doc_terms.pop(song_id, {}):
+                posting = self._postings.get(t)
+                if posting is None:
+                    continue
+                posting.pop(song_id, None)
+                if not posting:
+                    del self._postings[t]
+                    self._drop_term(t)
+
+    def index(self, row, lyrics=None):
+        song_id = row["id"]
+        if lyrics is None:
+            lyrics = self.load_lyrics(song_id)
+        weights = self._weights(row, lyrics)  # fuera del lock: la letra puede ser larga
+        with self._lock:
+            self.remove(song_id)
+            self._docs[song_id] = {
+                "id": song_id,
+                "title": row.get("name") or "",
+                "artist": row.get("artist") or "",
+                "enabled": (row.get("enabled") or "Y").strip().upper() != "N",
+            }
+            self._doc_terms[song_id] = weights
+            for t, w in weights.items():
+                posting = self._postings[t]
+                if not posting:
+                    self._add_term(t)
+                posting[song_id] = w
+
+    def rebuild(self, rows, version=0):
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._docs.clear()
+            self._vocab = []
+            self._deletes.clear()
+            for row in rows:
+                self.index(row)
+            self.version = version
+
+    # ---------- CatalogFollower ----------
+    def _reload(self, version):
+        self.rebuild(self.repo.all(), version)
+
+    def _apply(self, ids, version):
+        for sid in ids:
+            self.refresh(sid)
+        self.version = version
+
+    def refresh(self, song_id):
+        """Reindexa un id desde el repositorio (o lo quita si ya no existe)."""
+        row = self.repo.get(song_id)
+        if row is None:
+            self.remove(song_id)
+        else:
+            self.index(row)
+
+    # ---------- consulta ----------
+    def _expand(self, term, last):
+        """[(término del índice, factor)] para un término de la consulta."""
+        out = {}
+        if term in self._postings:
+            out[term] = EXACT
+        if last and len(term) >= MIN_PREFIX:
+            i = bisect.bisect_left(self._vocab, term)
+            for t in self._vocab[i:i + MAX_EXPANSIONS]:
+                if not t.startswith(term):
+                    break
+                out.setdefault(t, PREFIX)
+        if len(term) >= MIN_TYPO and len(out) < MAX_EXPANSIONS:
+            cands = set(self._deletes.get(term, ()))
+            for d in _deletes(term):
+                if d in self._postings:
+                    cands.add(d)
+                cands.update(self._deletes.get(d, ()))
+            for t in cands:
+                if t not in out and _within_one(term, t):
+                    out[t] = TYPO
+        return out
+
+    def search(self, q, limit=20, include_disabled=False):
+        terms = tokenize(q)
+        if not terms:
+            return []
+        self.sync()
+        with SEARCH_SECONDS.time(), self._lock:
+            scores = None
+            for n, term in enumerate(terms):
+                matched = {}
+                for t, factor in self._expand(term, n == len(terms) - 1).items():
+                    for sid, w in self._postings[t].items():
+                        s = w * factor
+                        if s > matched.get(sid, 0.0):
+                            matched[sid] = s
+                if scores is None:
+                    scores = matched
+                else:  # todos los términos deben aparecer (AND)
+                    scores = {sid: s + matched[sid] for sid, s in scores.items() if sid in matched}
+                if not scores:
+                    return []
+            hits = []
+            for sid, s in scores.items():
+                doc = self._docs[sid]
+                if doc["enabled"] or include_disabled:
+                    hits.append((-s, doc["title"].lower(), sid))
+            hits.sort()
+            return [dict(self._docs[sid], score=round(-s, 3)) for s, _, sid in hits[:limit]]
+
+    def stats(self):
+        return {"docs": len(self._docs), "terms": len(self._postings),
+                "deletes": len(self._deletes), "version": self.version}
+
+
+_index = None
+
+
+def get_search_index(repo=None, lyrics_dirs=()):
+    global _index
+    if _index is None:
+        from backend.services.catalog_store import get_catalog
+        t0 = time.perf_counter()
+        _index = SearchIndex(read_lyrics(lyrics_dirs)).attach(repo or get_catalog())
+        print(f"[search] {len(_index)} canciones indexadas en {time.perf_counter() - t0:.3f}s", flush=True)
+    return _index
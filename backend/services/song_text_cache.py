@@ -0,0 +1,156 @@
+# backend/services/song_text_cache.py
+"""
+Letras y tabs residentes en memoria.
+
+Cada vez que alguien toca una canción en index.html se pide su letra, y cada
+cambio de canción en el escenario pide su tab: ficheros pequeños, muy
+leídos y casi nunca escritos. Aquí se guardan ya preparados (texto, .gz y
+.br si hay brotli, ETag y Last-Modified) en una LRU acotada por bytes, así
+que una petición repetida no toca el disco.
+
+- Frescura sin stat por petición: cada entrada se revalida (un stat) como
+  mucho cada `revalidate` segundos, para cambios hechos fuera de la app;
+  las escrituras de la app (/add-song, ingest, borrados) llaman a
+  `invalidate` y el siguiente acceso ya lee el fichero nuevo.
+- Los ficheros de más de `max_file_size` no se cachean: se sirven con
+  assets.send (send_file, que bajo gunicorn va por sendfile).
+- El ETag es el mismo hash de contenido que calcula static_assets, así que
+  las URLs ?v=<hash> y los 304 siguen valiendo.
+"""
+import os
+import time
+import gzip
+import hashlib
+import threading
+import mimetypes
+from collections import OrderedDict
+
+from flask import request, make_response
+
+try:
+    from backend.core import config
+    from backend.services.static_assets import assets, brotli, pick_encoding, MIN_COMPRESS_SIZE
+except Exception:
+    from ..core import config  # type: ignore
+    from .static_assets import assets, brotli, pick_encoding, MIN_COMPRESS_SIZE  # type: ignore
+
+
+class SongTextCache:
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_file_size=256 * 1024, revalidate=2.0,
+                 clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self.revalidate = revalidate
+        self._clock = clock
+        self._entries = OrderedDict()   # ruta -> entrada (orden LRU)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.bypass = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ---------- entradas ----------
+    def _load(self, path, st):
+        with open(path, "rb") as f:
+            raw = f.read()
+        entry = {
+            "mtime_ns": st.st_mtime_ns, "size": st.st_size, "mtime": st.st_mtime,
+            "digest": hashlib.sha256(raw).hexdigest()[:20],
+            "raw": raw, "gzip": None, "br": None, "checked": self._clock(),
+        }
+        if len(raw) >= MIN_COMPRESS_SIZE:
+            entry["gzip"] = gzip.compress(raw, 9, mtime=0)
+            if brotli is not None:
+                entry["br"] = brotli.compress(raw, quality=11)
+        entry["bytes"] = len(raw) + len(entry["gzip"] or b"") + len(entry["br"] or b"")
+        return entry
+
+    def _drop(self, path):
+        old = self._entries.pop(path, None)
+        if old is not None:
+            self._bytes -= old["bytes"]
+
+    def get(self, path):
+        """Entrada de `path` (cargándola si hace falta), o None si no existe o es grande."""
+        path = os.path.abspath(str(path))
+        entry = self._entries.get(path)
+        now = self._clock()
+        if entry is not None and now - entry["checked"] < self.revalidate:
+            with self._lock:
+                if path in self._entries:
+                    self._entries.move_to_end(path)
+            self.hits += 1
+            return entry
+        try:
+            st = os.stat(path)
+        except OSError:
+            with self._lock:
+                self._drop(path)
+            return None
+        if entry is not None and (entry["mtime_ns"], entry["size"]) == (st.st_mtime_ns, st.st_size):
+            entry["checked"] = now
+            self.hits += 1
+            return entry
+        if st.st_size > self.max_file_size:
+            with self._lock:
+                self._drop(path)
+            self.bypass += 1
+            return None
+        try:
+            entry = self._load(path, st)  # fuera del lock: lectura y compresión
+        except OSError:
+            return None
+        self.misses += 1
+        with self._lock:
+            self._drop(path)
+            self._entries[path] = entry
+            self._bytes += entry["bytes"]
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                self._drop(next(iter(self._entries)))
+        return entry
+
+    def invalidate(self, path=None):
+        """Olvida `path` (o todo). Lo llaman las rutas que escriben o borran letras/tabs."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                self._drop(os.path.abspath(str(path)))
+
+    def preload(self, paths):
+        """Carga por adelantado (arranque); se para al llenar el presupuesto."""
+        n = 0
+        for p in paths:
+            if self._bytes >= self.max_bytes:
+                break
+            if self.get(p) is not None:
+                n += 1
+        return n
+
+    # ---------- envío ----------
+    def send(self, directory, filename, path):
+        """Respuesta desde memoria; los ficheros grandes van por assets.send (sendfile)."""
+        entry = self.get(path)
+        if entry is None:
+            return assets.send(directory, filename)
+        encoding = pick_encoding([enc for enc in ("br", "gzip") if entry[enc] is not None])
+        resp = make_response(entry[encoding] if encoding else entry["raw"])
+        resp.headers["Content-Type"] = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        if resp.mimetype.startswith("text/"):
+            resp.headers["Content-Type"] = f"{resp.mimetype}; charset=utf-8"
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+        resp.last_modified = entry["mtime"]
+        resp.set_etag(f"{entry['digest']}-{encoding}" if encoding else entry["digest"])
+        return assets.cache_headers(resp, entry["digest"]).make_conditional(request)
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "bypass": self.bypass}
+
+
+song_texts = SongTextCache(max_bytes=int(config.SONG_TEXT_CACHE_MB * 1024 * 1024),
+                           max_file_size=config.SONG_TEXT_MAX_FILE_KB * 1024,
+                           revalidate=config.ASSET_POLL_SECONDS)
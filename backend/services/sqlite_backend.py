@@ -0,0 +1,297 @@
+# backend/services/sqlite_backend.py
+"""
+Backend compartido entre procesos sobre SQLite (WAL).
+Sustituto local de Redis para ejecutar N workers de gunicorn en una máquina:
+votos, estados, propuestas, secuencia de `update` y cola pub/sub de Socket.IO
+viven en el mismo fichero.
+"""
+import json
+import time
+import sqlite3
+import threading
+
+from socketio import PubSubManager
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class _Db:
+    """Conexión única por proceso; las transacciones de escritura usan BEGIN IMMEDIATE."""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = connect(path)
+        self.lock = threading.RLock()
+
+    def write(self, fn):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self.conn)
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    def read(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS votes (device TEXT PRIMARY KEY, song TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_votes_song ON votes(song);
+CREATE TABLE IF NOT EXISTS vote_counts (song TEXT PRIMARY KEY, n INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS docs (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS proposals (
+    slug TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    first_ts INTEGER NOT NULL,
+    last_ts INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_proposals_rank ON proposals(count DESC, first_ts);
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS pubsub (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+"""
+
+
+def open_db(path):
+    db = _Db(path)
+    with db.lock:
+        db.conn.executescript(_SCHEMA)
+    return db
+
+
+class SqliteVoteStore:
+    """Misma interfaz que VoteStore; el recuento se mantiene en `vote_counts` en la misma transacción."""
+
+    def __init__(self, db, seed=None):
+        self.db = db
+        if seed and not db.read("SELECT 1 FROM votes LIMIT 1"):
+            self.replace(seed)
+
+    def __len__(self):
+        return self.db.read("SELECT COUNT(*) FROM votes")[0][0]
+
+    def get(self, device_id):
+        rows = self.db.read("SELECT song FROM votes WHERE device = ?", (device_id,))
+        return rows[0][0] if rows else None
+
+    def set(self, device_id, song_id):
+        def tx(c):
+            row = c.execute("SELECT song FROM votes WHERE device = ?", (device_id,)).fetchone()
+            prev = row[0] if row else None
+            if prev == song_id:
+                return prev
+            c.execute(
+                "INSERT INTO votes(device, song) VALUES(?, ?) "
+                "ON CONFLICT(device) DO UPDATE SET song = excluded.song",
+                (device_id, song_id),
+            )
+            if prev is not None:
+                c.execute("UPDATE vote_counts SET n = n - 1 WHERE song = ?", (prev,))
+                c.execute("DELETE FROM vote_counts WHERE song = ? AND n <= 0", (prev,))
+            c.execute(
+                "INSERT INTO vote_counts(song, n) VALUES(?, 1) "
+                "ON CONFLICT(song) DO UPDATE SET n = n + 1",
+                (song_id,),
+            )
+            return prev
+        return self.db.write(tx)
+
+    def count(self, song_id):
+        rows = self.db.read("SELECT n FROM vote_counts WHERE song = ?", (song_id,))
+        return rows[0][0] if rows else 0
+
+    def counts(self):
+        return dict(self.db.read("SELECT song, n FROM vote_counts"))
+
+    def by_song(self):
+        out = {}
+        for device, song in self.db.read("SELECT device, song FROM votes"):
+            out.setdefault(song, []).append(device)
+        return out
+
+    def snapshot(self):
+        return dict(self.db.read("SELECT device, song FROM votes"))
+
+    def replace(self, votes):
+        def tx(c):
+            c.execute("DELETE FROM votes")
+            c.execute("DELETE FROM vote_counts")
+            c.executemany("INSERT INTO votes(device, song) VALUES(?, ?)", list((votes or {}).items()))
+            c.execute("INSERT INTO vote_counts(song, n) SELECT song, COUNT(*) FROM votes GROUP BY song")
+        self.db.write(tx)
+
+    def flush(self):
+        return True  # cada escritura ya es durable
+
+
+class SqliteDocStore:
+    """Documento JSON con nombre en la tabla `docs` (interfaz de JsonDocStore)."""
+
+    def __init__(self, db, name, default, seed=None):
+        self.db = db
+        self.name = name
+        self._default = default
+        if seed is not None and not db.read("SELECT 1 FROM docs WHERE name = ?", (name,)):
+            self.save(seed)
+
+    def _decode(self, rows):
+        return json.loads(rows[0][0]) if rows else json.loads(json.dumps(self._default))
+
+    def load(self):
+        return self._decode(self.db.read("SELECT value FROM docs WHERE name = ?", (self.name,)))
+
+    def save(self, value):
+        raw = json.dumps(value, ensure_ascii=False)
+        self.db.write(lambda c: c.execute(
+            "INSERT INTO docs(name, value) VALUES(?, ?) ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+            (self.name, raw),
+        ))
+
+    def update(self, fn):
+        def tx(c):
+            value = self._decode(c.execute("SELECT value FROM docs WHERE name = ?", (self.name,)).fetchall())
+            value, result = fn(value)
+            c.execute(
+                "INSERT INTO docs(name, value) VALUES(?, ?) ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+                (self.name, json.dumps(value, ensure_ascii=False)),
+            )
+            return result
+        return self.db.write(tx)
+
+
+class SqliteProposalStore:
+    """Interfaz de ProposalStore; el ranking sale del índice (count DESC, first_ts)."""
+
+    _COLS = ("slug", "title", "count", "first_ts", "last_ts")
+
+    def __init__(self, db, seed=None):
+        self.db = db
+        if not db.read("SELECT 1 FROM proposals LIMIT 1"):
+            # migra el documento de la versión anterior (tabla docs) o el JSON
+            old = db.read("SELECT value FROM docs WHERE name = 'proposals'")
+            data = json.loads(old[0][0]) if old else seed
+            if data:
+                self.save(data)
+
+    def _row(self, r):
+        return dict(zip(self._COLS, r))
+
+    def __len__(self):
+        return self.db.read("SELECT COUNT(*) FROM proposals")[0][0]
+
+    def get(self, slug):
+        rows = self.db.read("SELECT slug, title, count, first_ts, last_ts FROM proposals WHERE slug = ?", (slug,))
+        return self._row(rows[0]) if rows else None
+
+    def submit(self, slug, title, now):
+        now = int(now)
+
+        def tx(c):
+            dedup = c.execute("SELECT 1 FROM proposals WHERE slug = ?", (slug,)).fetchone() is not None
+            c.execute(
+                "INSERT INTO proposals(slug, title, count, first_ts, last_ts) VALUES(?, ?, 1, ?, ?) "
+                "ON CONFLICT(slug) DO UPDATE SET count = count + 1, last_ts = excluded.last_ts",
+                (slug, title, now, now),
+            )
+            row = c.execute("SELECT slug, title, count, first_ts, last_ts FROM proposals WHERE slug = ?",
+                            (slug,)).fetchone()
+            return self._row(row), dedup
+        return self.db.write(tx)
+
+    def remove(self, slug):
+        return self.db.write(lambda c: c.execute("DELETE FROM proposals WHERE slug = ?", (slug,)).rowcount > 0)
+
+    def ranked(self, limit=None):
+        sql = "SELECT slug, title, count, first_ts, last_ts FROM proposals ORDER BY count DESC, first_ts, slug"
+        if limit is not None:
+            return [self._row(r) for r in self.db.read(sql + " LIMIT ?", (int(limit),))]
+        return [self._row(r) for r in self.db.read(sql)]
+
+    def load(self):
+        return self.ranked()
+
+    def save(self, value):
+        def tx(c):
+            c.execute("DELETE FROM proposals")
+            c.executemany(
+                "INSERT OR REPLACE INTO proposals(slug, title, count, first_ts, last_ts) VALUES(?, ?, ?, ?, ?)",
+                [(p["slug"], p.get("title", ""), int(p.get("count", 1)), int(p.get("first_ts", 0)),
+                  int(p.get("last_ts", p.get("first_ts", 0)))) for p in value or [] if p.get("slug")],
+            )
+        self.db.write(tx)
+
+    def flush(self):
+        return True
+
+
+class SqliteSequence:
+    """Contador global compartido por todos los workers."""
+
+    def __init__(self, db, name="update_seq"):
+        self.db = db
+        self.name = name
+        db.write(lambda c: c.execute("INSERT OR IGNORE INTO counters(name, value) VALUES(?, 0)", (name,)))
+
+    def current(self):
+        return self.db.read("SELECT value FROM counters WHERE name = ?", (self.name,))[0][0]
+
+    def next(self):
+        def tx(c):
+            c.execute("UPDATE counters SET value = value + 1 WHERE name = ?", (self.name,))
+            return c.execute("SELECT value FROM counters WHERE name = ?", (self.name,)).fetchone()[0]
+        return self.db.write(tx)
+
+
+class SqlitePubSubManager(PubSubManager):
+    """
+    Cola de mensajes de Socket.IO sobre una tabla SQLite.
+    Cada worker publica insertando filas y escucha sondeando las nuevas; así un
+    emit hecho en un worker llega a los clientes conectados a cualquier otro.
+    """
+    name = "sqlite"
+
+    def __init__(self, path, channel="flask-socketio", write_only=False, logger=None,
+                 poll_interval=0.02, retention=60.0):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.db = open_db(path)
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._last_prune = 0.0
+
+    def _publish(self, data):
+        now = time.time()
+        payload = json.dumps(data)
+
+        def tx(c):
+            c.execute("INSERT INTO pubsub(channel, payload, ts) VALUES(?, ?, ?)", (self.channel, payload, now))
+            if now - self._last_prune > self.retention:
+                c.execute("DELETE FROM pubsub WHERE ts < ?", (now - self.retention,))
+                self._last_prune = now
+        self.db.write(tx)
+
+    def _listen(self):
+        last = self.db.read("SELECT COALESCE(MAX(id), 0) FROM pubsub")[0][0]
+        while True:
+            rows = self.db.read(
+                "SELECT id, payload FROM pubsub WHERE id > ? AND channel = ? ORDER BY id",
+                (last, self.channel),
+            )
+            for msg_id, payload in rows:
+                last = msg_id
+                yield payload
+            self.server.sleep(self.poll_interval)
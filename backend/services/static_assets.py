@@ -0,0 +1,171 @@
+# backend/services/static_assets.py
+"""
+Capa de estáticos para catálogo, letras, tabs e imágenes.
+- ETag = hash del contenido (cacheado por mtime/tamaño) y Last-Modified;
+  las peticiones condicionales se responden con 304.
+- Variantes precomprimidas .gz/.br generadas al escribir (precompress) o,
+  si faltan, en la primera petición; se elige según Accept-Encoding.
+- URLs con hash de contenido (?v=<hash>) se sirven como inmutables.
+"""
+import os
+import gzip
+import hashlib
+import mimetypes
+import threading
+
+from flask import request, send_file, abort, make_response
+from werkzeug.security import safe_join
+
+try:
+    import brotli  # opcional
+except Exception:
+    brotli = None
+
+COMPRESSIBLE = {".json", ".txt", ".js", ".css", ".html", ".svg", ".csv"}
+MIN_COMPRESS_SIZE = 256            # por debajo no compensa
+IMMUTABLE_MAX_AGE = 31536000       # 1 año para URLs con ?v=<hash>
+
+
+def pick_encoding(available):
+    """
+    De `available` (en orden de preferencia del servidor) la codificación con
+    mayor q > 0 en Accept-Encoding, o None. Respeta q=0 ("br;q=0" la rechaza)
+    y el comodín "*"; a igual q gana la primera de `available`.
+    """
+    accept = request.accept_encodings   # werkzeug lo parsea una vez por petición
+    best, best_q = None, 0
+    for enc in available:
+        q = accept.quality(enc)
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+class StaticAssets:
+    def __init__(self):
+        self._meta = {}            # path -> (mtime_ns, size, digest)
+        self._lock = threading.Lock()
+
+    # ---------- hash de contenido ----------
+    def digest(self, path):
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+        cached = self._meta.get(path)
+        if cached and cached[:2] == key:
+            return cached[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                h.update(chunk)
+        digest = h.hexdigest()[:20]
+        with self._lock:
+            self._meta[path] = (*key, digest)
+        return digest
+
+    def url(self, base_url, path):
+        """URL inmutable con hash de contenido, p. ej. /catalog/catalog.json?v=ab12..."""
+        return f"{base_url}?v={self.digest(path)}"
+
+    # ---------- precompresión ----------
+    def precompress(self, path):
+        """Genera path.gz (y path.br si hay brotli) junto al original. Se llama tras escribir."""
+        path = str(path)
+        if os.path.splitext(path)[1].lower() not in COMPRESSIBLE:
+            return
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        if len(data) < MIN_COMPRESS_SIZE:
+            for ext in (".gz", ".br"):
+                if os.path.exists(path + ext):
+                    os.remove(path + ext)
+            return
+        self._write_variant(path + ".gz", gzip.compress(data, 9, mtime=0))
+        if brotli is not None:
+            self._write_variant(path + ".br", brotli.compress(data, quality=11))
+
+    def precompress_if_stale(self, path):
+        """precompress solo si falta alguna variante o es más vieja que el original."""
+        path = str(path)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        exts = [".gz"] + ([".br"] if brotli is not None else [])
+        if not all(self._fresh_variant(path, ext, mtime) for ext in exts):
+            self.precompress(path)
+
+    def _write_variant(self, dst, body):
+        tmp = f"{dst}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, dst)
+
+    def _fresh_variant(self, path, ext, src_mtime_ns):
+        variant = path + ext
+        try:
+            return os.stat(variant).st_mtime_ns >= src_mtime_ns
+        except FileNotFoundError:
+            return False
+
+    def _pick_encoding(self, path, st):
+        if os.path.splitext(path)[1].lower() not in COMPRESSIBLE or st.st_size < MIN_COMPRESS_SIZE:
+            return None
+        encoding = pick_encoding(("br", "gzip") if brotli is not None else ("gzip",))
+        if encoding is None:
+            return None
+        ext = ".br" if encoding == "br" else ".gz"
+        if not self._fresh_variant(path, ext, st.st_mtime_ns):
+            try:
+                self.precompress(path)  # variante que faltaba (p. ej. ficheros del repo)
+            except OSError:
+                return None
+            if not self._fresh_variant(path, ext, st.st_mtime_ns):
+                return None
+        return encoding
+
+    # ---------- envío ----------
+    def send(self, directory, filename, max_age=0):
+        path = safe_join(str(directory), filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        st = os.stat(path)
+        digest = self.digest(path)
+        encoding = self._pick_encoding(path, st)
+        body_path = path + (".br" if encoding == "br" else ".gz") if encoding else path
+
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        resp = send_file(body_path, mimetype=mimetype, conditional=False, etag=False,
+                         last_modified=st.st_mtime, max_age=None)
+        resp.set_etag(f"{digest}-{encoding}" if encoding else digest)
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+        return self.cache_headers(resp, digest, max_age).make_conditional(request)
+
+    def cache_headers(self, resp, digest, max_age=0):
+        """Vary y Cache-Control: inmutable con ?v=<hash>, max_age o revalidar siempre."""
+        resp.vary.add("Accept-Encoding")
+        resp.cache_control.no_cache = None
+        if request.args.get("v") == digest:
+            resp.cache_control.public = True
+            resp.cache_control.max_age = IMMUTABLE_MAX_AGE
+            resp.cache_control.immutable = True
+        elif max_age:
+            resp.cache_control.public = True
+            resp.cache_control.max_age = max_age
+        else:
+            resp.cache_control.no_cache = True  # siempre revalidar (304 si no cambió)
+        return resp
+
+    def send_body(self, body, etag, mimetype="text/plain; charset=utf-8"):
+        """Respuesta generada en memoria (variantes renderizadas) con ETag y revalidación."""
+        resp = make_response(body)
+        resp.headers["Content-Type"] = mimetype
+        resp.set_etag(etag)
+        resp.cache_control.no_cache = True
+        return resp.make_conditional(request)
+
+
+assets = StaticAssets()
@@ -0,0 +1,307 @@
+# backend/services/tab_parser.py
+"""
+Parser de tabs/letras con acordes en una sola pasada.
+
+Cada línea se recorre una vez, token a token (separados por espacios), y se
+clasifica como:
+    blank    línea vacía
+    section  marcador de sección ("[Chorus]", "Intro x2", "Estribillo: Am G")
+    tempo    compás / tempo ("4/4", "120 bpm", "half time")
+    chords   solo acordes (con barras, repeticiones "x2" y anotaciones "(...)")
+    lyric    letra, con los acordes en línea "[G]palabra" ya extraídos
+
+Nada de regex con alternancias anidadas sobre la línea entera: los únicos
+patrones se aplican a tokens sueltos de longitud acotada (MAX_TOKEN), así que
+el coste por línea es lineal incluso con entradas patológicas. Las líneas se
+repiten mucho (la misma línea de acordes en cada estrofa), por eso
+`classify_line` está cacheada.
+
+Las raíces latinas sueltas ("Si", "La", "Mi", "Re"...) también son palabras
+("Si la vida...", "Si, Mi amor"): fuera de corchetes solo cuentan como
+acordes si el resto de la línea son acordes y la línea no parece letra (hay
+acordes A-G, dos raíces distintas o algún acorde con cifrado: "Lam", "Sol7").
+
+`parse_song(text)` devuelve el modelo estructurado:
+    {"sections": [{"name": "Chorus", "lines": [
+        {"type": "lyric", "text": "...", "chords": [{"chord": "Em", "at": 4}]},
+        ...]}]}
+donde `at` es la columna sobre la letra en la que cae el acorde.
+"""
+import re
+from functools import lru_cache
+
+MAX_TOKEN = 24  # tokens más largos nunca son acordes
+
+_ROOT = r"(?:[A-G]|Do|Re|Ré|Mi|Fa|Sol|La|Si)"
+_ACC = r"(?:#|b|♯|♭)?"
+_QUALITY = r"(?:maj|min|dim|aug|sus|add|m|M|\+|-|°|ø|\d|#|b){0,8}"
+CHORD_RE = re.compile(rf"^{_ROOT}{_ACC}{_QUALITY}(?:\([^()\s]{{1,12}}\))?(?:/{_ROOT}{_ACC})?$")
+LETTER_CHORD_RE = re.compile(rf"^[A-G]{_ACC}{_QUALITY}(?:\([^()\s]{{1,12}}\))?(?:/{_ROOT}{_ACC})?$")
+LATIN_ROOT_RE = re.compile(r"^(?:Do|Re|Ré|Mi|Fa|Sol|La|Si)")
+REPEAT_RE = re.compile(r"^(?:[xX]\d{1,3}|\d{1,3}[xX])$")
+TIME_SIG_RE = re.compile(r"^\d{1,2}/\d{1,2}$")
+BAR_CHARS = set("|/-–—.…:,%")
+
+SECTION_WORDS = {
+    "intro", "verse", "verso", "estrofa", "chorus", "coro", "estribillo", "refrain", "bridge",
+    "puente", "solo", "outro", "interlude", "interludio", "instrumental", "ending", "final",
+    "pre-chorus", "prechorus", "precoro", "break", "couplet",
+}
+TEMPO_WORDS = {"tempo", "bpm", "half", "double", "half-time", "double-time"}
+_SECTION_MAX_WORDS = 6
+
+
+def is_chord(token):
+    return len(token) <= MAX_TOKEN and CHORD_RE.match(token) is not None
+
+
+def _latin_chords_ok(latin, chords, words):
+    """¿Las raíces latinas sueltas de la línea son acordes? Solo si no hay letra alrededor y no parecen palabras."""
+    if any(w.lower().rstrip(":,.") not in SECTION_WORDS for w in words):
+        return False
+    if chords:
+        return True  # junto a acordes con letra (A-G): la línea ya es de acordes
+    roots = {LATIN_ROOT_RE.match(c).group() for _, c in latin}
+    return len(roots) > 1 or any(len(c) > len(LATIN_ROOT_RE.match(c).group()) for _, c in latin)
+
+
+def _strip_punct(token):
+    # "B," "….C#m" "|A" -> acorde limpio + desplazamiento inicial
+    start, end = 0, len(token)
+    while start < end and token[start] in BAR_CHARS:
+        start += 1
+    while end > start and token[end - 1] in BAR_CHARS:
+        end -= 1
+    return token[start:end], start
+
+
+_TOKEN_RE = re.compile(r"\S+")  # sin alternancias: un solo recorrido lineal
+
+
+def _tokens(line, i=0):
+    """(columna, token) recorriendo la línea una vez."""
+    for m in _TOKEN_RE.finditer(line, i):
+        yield m.start(), m.group()
+
+
+def _bracket(token):
+    """'[Chorus]' -> 'Chorus'; None si el token no es un corchete completo."""
+    if len(token) > 2 and token[0] == "[" and token[-1] == "]" and "[" not in token[1:-1]:
+        return token[1:-1]
+    return None
+
+
+def _inline_chords(line):
+    """Quita '[G]' de la letra y devuelve (texto, ((col, acorde), ...)) con col sobre el texto limpio."""
+    out = []
+    chords = []
+    width = 0  # longitud del texto limpio acumulado
+    i, n = 0, len(line)
+    while i < n:
+        if line[i] == "[":
+            j = line.find("]", i + 1, i + 2 + MAX_TOKEN)
+            if j != -1 and is_chord(line[i + 1:j]):
+                chords.append((width, line[i + 1:j]))
+                i = j + 1
+                continue
+        k = line.find("[", i + 1)
+        if k == -1:
+            k = n
+        out.append(line[i:k])
+        width += k - i
+        i = k
+    return "".join(out), tuple(chords)
+
+
+@lru_cache(maxsize=8192)
+def classify_line(line):
+    """
+    Devuelve (tipo, texto, acordes, etiqueta). `acordes` es una tupla de
+    (columna, acorde); `etiqueta` es el nombre de sección si lo hay.
+    """
+    text = line.rstrip()
+    if not text.strip():
+        return ("blank", "", (), None)
+
+    chords = []
+    latin = []          # (columna, acorde) con raíz latina sin corchetes: se decide al final
+    words = []          # tokens que no son acordes ni neutros
+    label = None
+    section_hint = False
+    tempo_hint = False
+    in_paren = False
+    paren_text = False  # "(Ay, ay, ay)": coros entre paréntesis siguen siendo letra
+    start = 0
+    stripped = text.lstrip()
+    if stripped[0] == "[":
+        # "[Interlude: Flamenco Guitar]" puede llevar espacios: se mira antes de tokenizar
+        lead = len(text) - len(stripped)
+        j = text.find("]", lead + 1, lead + 62)
+        if j != -1 and not is_chord(text[lead + 1:j]):
+            label = text[lead + 1:j].strip(" :")
+            start = j + 1
+    n = len(text)
+    for col, tok in _tokens(text, start):
+        if len(words) > _SECTION_MAX_WORDS and len(words) * 2 > len(chords) + len(latin) + (n - col) // 2 + 1:
+            break  # ya no puede ser sección, tempo ni línea de acordes: es letra
+        if in_paren:
+            paren_text = True
+            if ")" in tok:
+                in_paren = False
+                rest = tok[tok.index(")") + 1:]
+                if rest:
+                    col, tok = col + tok.index(")") + 1, rest
+                else:
+                    continue
+            else:
+                continue
+        if tok[0] == "(" and ")" not in tok:
+            in_paren = True
+            continue
+        c0 = tok[0]
+        if c0.islower() and c0 != "x":
+            # las raíces de acorde van en mayúscula: palabra salvo pista de sección/tempo
+            low = tok.lower().rstrip(":,.")
+            if low in SECTION_WORDS:
+                section_hint = True
+                if label is None and not chords and not words:
+                    label = tok.rstrip(":,.")
+            elif low in TEMPO_WORDS or low.endswith("bpm"):
+                tempo_hint = True
+            words.append(tok)
+            continue
+        inner = _bracket(tok)
+        if inner is not None:
+            if is_chord(inner):
+                chords.append((col, inner))
+            elif label is None and not chords and not words:
+                label = inner.strip(" :")
+            else:
+                words.append(tok)
+            continue
+        clean, off = _strip_punct(tok)
+        if not clean:
+            continue  # barras, puntos, separadores
+        if is_chord(clean):
+            (chords if LETTER_CHORD_RE.match(clean) else latin).append((col + off, clean))
+            continue
+        low = clean.lower().rstrip(":")
+        if REPEAT_RE.match(clean):
+            continue
+        if clean[0] == "(" and clean[-1] == ")":
+            paren_text = paren_text or not REPEAT_RE.match(clean[1:-1])
+            continue
+        if TIME_SIG_RE.match(clean):
+            tempo_hint = True
+            continue
+        if low in TEMPO_WORDS or low.endswith("bpm"):
+            tempo_hint = True
+        if low in SECTION_WORDS:
+            section_hint = True
+            if label is None and not chords and not words:
+                label = clean.rstrip(":")
+        words.append(clean)
+
+    if latin:
+        if _latin_chords_ok(latin, chords, words):
+            chords = sorted(chords + latin)
+        else:
+            words.extend(c for _, c in latin)
+    n_words = len(words)
+    if label is not None and n_words <= _SECTION_MAX_WORDS and (n_words <= 1 or section_hint or not chords):
+        return ("section", text, tuple(chords), label)
+    if section_hint and n_words <= _SECTION_MAX_WORDS and len(text) < 80:
+        return ("section", text, tuple(chords), label)
+    if tempo_hint and len(text) < 80 and n_words <= _SECTION_MAX_WORDS:
+        return ("tempo", text, (), None)
+    if chords and n_words * 2 <= len(chords):
+        return ("chords", text, tuple(chords), None)
+    if not chords and not words:
+        if tempo_hint:
+            return ("tempo", text, (), None)
+        return ("lyric", text, (), None) if paren_text else ("blank", "", (), None)
+    if "[" in text:
+        clean, inline = _inline_chords(text)
+        return ("lyric", clean, inline, None)
+    return ("lyric", text, (), None)
+
+
+def _chord_list(chords):
+    return [{"chord": c, "at": at} for at, c in chords]
+
+
+def parse_song(text):
+    """Modelo estructurado: secciones con líneas de letra y acordes posicionados."""
+    sections = [{"name": None, "lines": []}]
+    pending = None  # línea de acordes esperando la letra de debajo
+
+    def flush_pending():
+        nonlocal pending
+        if pending is not None:
+            sections[-1]["lines"].append({"type": "chords", "text": pending[0], "chords": _chord_list(pending[1])})
+            pending = None
+
+    for raw in (text or "").splitlines():
+        kind, line, chords, label = classify_line(raw)
+        if kind == "chords":
+            flush_pending()
+            pending = (line, chords)
+            continue
+        if kind == "lyric":
+            if pending is not None and not chords:
+                chords = pending[1]
+                pending = None
+            else:
+                flush_pending()
+            sections[-1]["lines"].append({"type": "lyric", "text": line, "chords": _chord_list(chords)})
+            continue
+        flush_pending()
+        if kind == "section":
+            if sections[-1]["lines"] or sections[-1]["name"] is not None:
+                sections.append({"name": label, "lines": []})
+            else:
+                sections[-1]["name"] = label
+            if chords:
+                sections[-1]["lines"].append({"type": "chords", "text": line, "chords": _chord_list(chords)})
+        elif kind == "tempo":
+            sections[-1]["lines"].append({"type": "tempo", "text": line})
+        else:
+            sections[-1]["lines"].append({"type": "blank"})
+    flush_pending()
+    if not sections[0]["lines"] and sections[0]["name"] is None:
+        sections.pop(0)
+    return {"sections": sections}
+
+
+def lyrics_only(text):
+    """Solo la letra: sin líneas de acordes, compases, tempo ni marcadores de sección."""
+    out = []
+    for raw in (text or "").splitlines():
+        kind, line, _, _ = classify_line(raw)
+        if kind in ("lyric", "blank"):
+            out.append(line)
+    txt = "\n".join(out)
+    return re.sub(r"\n{3,}", "\n\n", txt).strip()
+
+
+def model_lyrics(model):
+    """La letra del modelo de `parse_song` (lo mismo que lyrics_only, sin volver a clasificar)."""
+    out = []
+    for sec in model["sections"]:
+        for ln in sec["lines"]:
+            if ln["type"] == "lyric":
+                out.append(ln["text"])
+            elif ln["type"] == "blank":
+                out.append("")
+    txt = "\n".join(out)
+    return re.sub(r"\n{3,}", "\n\n", txt).strip()
+
+
+def song_chords(model):
+    """Acordes distintos en orden de aparición."""
+    seen = {}
+    for sec in model["sections"]:
+        for ln in sec["lines"]:
+            for c in ln.get("chords", ()):
+                seen.setdefault(c["chord"], None)
+    return list(seen)
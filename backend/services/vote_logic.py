@@ -28,30 +28,29 @@ import os
 import json
 from collections import Counter
 
+from backend.services.backends import get_backend
+
 VOTES_FILE = VOTES_PATH  # alias local
 
+# Backend de estado (memory: votos residentes en memoria con volcado diferido;
+# sqlite: compartido entre workers). Ver backend/services/backends.py
+store_backend = get_backend()
+vote_store = store_backend.votes
+state_store = store_backend.states
+
+# load_votes/save_votes se mantienen como capa de compatibilidad sobre vote_store
 def load_votes():
-    try:
-        with open(VOTES_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
+    return vote_store.snapshot()
 
 def save_votes(votes):
-    with open(VOTES_FILE, "w", encoding="utf-8") as f:
-        json.dump(votes, f, ensure_ascii=False, indent=2)
+    vote_store.replace(votes)
 
 def count_votes(states):
     return dict(Counter(states.values()))
 
 def load_states():
-    try:
-        with open(SONG_STATES_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {"now_playing": None, "played": []}
+    return state_store.load()
 
 def save_states(states):
-    with open(SONG_STATES_FILE, "w", encoding="utf-8") as f:
-        json.dump(states, f, ensure_ascii=False, indent=2)
+    state_store.save(states)
 
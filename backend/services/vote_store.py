@@ -0,0 +1,67 @@
+# backend/services/vote_store.py
+import threading
+
+from backend.services.persist import WriteBehind, atomic_write_json, read_json
+from backend.services.vote_tally import VoteTally
+
+
+class VoteStore:
+    """
+    Mapa device_id -> song_id autoritativo en memoria.
+    Cada voto es O(1); el JSON en disco se actualiza en diferido (write-behind)
+    con reemplazo atómico, así que un pico de votos no reescribe el fichero
+    una vez por voto.
+    """
+
+    def __init__(self, path, flush_interval=1.0, flush_threshold=500):
+        self.path = path
+        data = read_json(path, {})
+        self._votes = data if isinstance(data, dict) else {}
+        self.tally = VoteTally(self._votes)
+        self._lock = threading.Lock()
+        self._persist = WriteBehind(
+            self.snapshot,
+            lambda d: atomic_write_json(self.path, d),
+            interval=flush_interval,
+            threshold=flush_threshold,
+            name="votes-flusher",
+        )
+
+    def __len__(self):
+        return len(self._votes)
+
+    def get(self, device_id):
+        return self._votes.get(device_id)
+
+    def set(self, device_id, song_id):
+        """Registra el voto y devuelve el anterior (None si no había)."""
+        with self._lock:
+            prev = self._votes.get(device_id)
+            if prev == song_id:
+                return prev
+            self._votes[device_id] = song_id
+            self.tally.move(device_id, prev, song_id)
+        self._persist.touch()
+        return prev
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._votes)
+
+    def replace(self, votes):
+        with self._lock:
+            self._votes = dict(votes or {})
+            self.tally.reset(self._votes)
+        self._persist.touch()
+
+    def count(self, song_id):
+        return self.tally.count(song_id)
+
+    def counts(self):
+        return self.tally.counts()
+
+    def by_song(self):
+        return self.tally.by_song()
+
+    def flush(self):
+        return self._persist.flush()
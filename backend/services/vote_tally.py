@@ -0,0 +1,53 @@
+# backend/services/vote_tally.py
+
+
+class VoteTally:
+    """
+    Recuento incremental de votos.
+    Mantiene por canción el número de votos y el conjunto de dispositivos,
+    actualizados en O(1) cuando un voto se mueve de una canción a otra.
+    """
+
+    def __init__(self, votes=None):
+        self._counts = {}   # song_id -> nº votos
+        self._devices = {}  # song_id -> set(device_id)
+        if votes:
+            self.reset(votes)
+
+    def reset(self, votes):
+        self._counts = {}
+        self._devices = {}
+        for device_id, song_id in votes.items():
+            self.move(device_id, None, song_id)
+
+    def move(self, device_id, prev, song_id):
+        """Mueve el voto de `device_id` de `prev` a `song_id` (cualquiera puede ser None)."""
+        if prev == song_id:
+            return
+        if prev is not None:
+            devs = self._devices.get(prev)
+            if devs is not None and device_id in devs:
+                devs.discard(device_id)
+                if devs:
+                    self._counts[prev] -= 1
+                else:
+                    del self._devices[prev]
+                    del self._counts[prev]
+        if song_id is not None:
+            devs = self._devices.setdefault(song_id, set())
+            if device_id not in devs:
+                devs.add(device_id)
+                self._counts[song_id] = self._counts.get(song_id, 0) + 1
+
+    def count(self, song_id):
+        return self._counts.get(song_id, 0)
+
+    def counts(self):
+        return dict(self._counts)
+
+    def devices(self, song_id):
+        return self._devices.get(song_id, set())
+
+    def by_song(self):
+        """Mapa song_id -> [device_id] (formato `byDevice` de los eventos update)."""
+        return {sid: list(devs) for sid, devs in self._devices.items()}
@@ -52,7 +52,7 @@ window.getSongState = getSongState;
 
 // ✅ Escuchar evento de reinicio de sesión por WebSocket
 if (typeof io !== 'undefined') {
-  const socket = io();
+  const socket = io({transports: ['websocket', 'polling']});
   socket.on("session_reset", () => {
     console.log("Reset event received. Clearing local state...");
     localStorage.removeItem('songStates');
@@ -0,0 +1,49 @@
+// frontend/public/updateSeq.js
+// Orden de los deltas "update". Con varios workers cada uno reserva su seq y
+// publica por separado, así que dos deltas seguidos pueden llegar cruzados.
+// Ante un hueco se guardan los posteriores y se espera un momento; solo si el
+// hueco no se rellena se pide el snapshot completo (onGap).
+function createSeqBuffer(onDelta, onGap, waitMs = 500) {
+  let last = null;            // último seq aplicado (null = esperando snapshot)
+  const pending = new Map();  // seq -> delta llegado antes de tiempo
+  let timer = null;
+
+  function stopTimer() {
+    if (timer) { clearTimeout(timer); timer = null; }
+  }
+
+  function drain() {
+    let applied = false;
+    while (pending.has(last + 1)) {
+      const delta = pending.get(last + 1);
+      pending.delete(last + 1);
+      last = delta.seq;
+      onDelta(delta);
+      applied = true;
+    }
+    if (!pending.size) stopTimer();
+    else if (!timer) timer = setTimeout(() => { timer = null; if (pending.size) onGap(); }, waitMs);
+    return applied;
+  }
+
+  return {
+    // snapshot recibido: los deltas guardados posteriores a él siguen valiendo
+    reset(seq) {
+      last = seq;
+      for (const s of [...pending.keys()]) if (s <= seq) pending.delete(s);
+      drain();
+    },
+    // se va a pedir un snapshot: se ignora todo hasta recibirlo
+    clear() {
+      last = null;
+      pending.clear();
+      stopTimer();
+    },
+    // true si se aplicó algún delta
+    push(delta) {
+      if (last === null || delta.seq <= last) return false;
+      pending.set(delta.seq, delta);
+      return drain();
+    },
+  };
+}
@@ -0,0 +1,65 @@
+# tests/test_broadcast_deltas.py
+"""Deltas de `update`: seq creciente, solo lo que cambió, snapshots completos."""
+from backend.services.broadcast import UpdateBroadcaster, diff_states
+
+
+def _broadcaster(**kw):
+    frames = []
+    updates = UpdateBroadcaster(lambda event, payload, to=None: frames.append((to, payload)), **kw)
+    return updates, frames
+
+
+def test_deltas_carry_increasing_seq_and_only_changes():
+    updates, frames = _broadcaster()
+    assert updates.publish(counts={"s1": 1}) is True
+    assert updates.publish(states={"s2": "done"}) is True
+    assert updates.publish(counts={}, states={}) is False   # sin cambios no se emite
+    assert [p for _, p in frames] == [
+        {"seq": 1, "counts": {"s1": 1}, "states": {}},
+        {"seq": 2, "counts": {}, "states": {"s2": "done"}},
+    ]
+    assert updates.seq == 2
+
+
+def test_snapshot_keeps_seq_and_broadcast_snapshot_advances_it():
+    updates, frames = _broadcaster()
+    updates.publish(counts={"s1": 1})
+    snap = updates.snapshot({"s1": 1}, {}, version=7)
+    assert snap == {"seq": 1, "full": True, "counts": {"s1": 1}, "states": {}, "version": 7}
+    sent = updates.publish_snapshot({}, {}, to="room")
+    assert sent["seq"] == 2 and frames[-1] == ("room", sent)
+
+
+def test_broadcast_snapshot_discards_pending_deltas():
+    updates, frames = _broadcaster(window=60, max_latency=60, start_task=lambda fn, *a: None)
+    updates.publish(counts={"s1": 4})
+    updates.publish_snapshot({}, {})
+    assert updates.scheduler.flush() is False
+    assert [p["seq"] for _, p in frames] == [1]
+    assert updates.scheduler.stats()["events"] == 0
+
+
+def test_seq_order_survives_out_of_order_delivery():
+    updates, frames = _broadcaster()
+    for n in (1, 2, 3):
+        updates.publish(counts={"s1": n})
+    latest = {}
+    for _, payload in sorted(reversed(frames), key=lambda f: f[1]["seq"]):
+        latest.update(payload["counts"])
+    assert latest == {"s1": 3}
+
+
+def test_subscribers_see_every_frame():
+    updates, _ = _broadcaster()
+    seen = []
+    updates.subscribe(lambda p: seen.append(p["seq"]))
+    updates.subscribe(lambda p: 1 / 0)   # un listener roto no corta la difusión
+    updates.publish(counts={"s1": 1})
+    updates.publish_snapshot({}, {})
+    assert seen == [1, 2]
+
+
+def test_diff_states():
+    old = {"a": "playing", "b": "queued", "c": "done"}
+    new = {"a": "done", "b": "queued", "d": "queued"}
+    assert diff_states(old, new) == {"a": "done", "d": "queued", "c": None}
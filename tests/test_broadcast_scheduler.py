@@ -0,0 +1,92 @@
+# tests/test_broadcast_scheduler.py
+"""Agrupación de ráfagas: un frame por sala, con latencia máxima acotada."""
+from backend.services.broadcast import BroadcastScheduler, UpdateBroadcaster
+
+
+class FakeTime:
+    """Reloj simulado: sleep() avanza el reloj y ejecuta los cambios programados."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.tasks = []
+        self._due = []
+
+    def clock(self):
+        return self.now
+
+    def at(self, t, fn):
+        self._due.append((t, fn))
+        self._due.sort(key=lambda d: d[0])
+
+    def sleep(self, seconds):
+        end = self.now + seconds
+        while self._due and self._due[0][0] <= end:
+            t, fn = self._due.pop(0)
+            self.now = t
+            fn()
+        self.now = end
+
+    def start_task(self, fn, *args):
+        self.tasks.append((fn, args))
+
+    def run(self):
+        """Drena las tareas; sin tareas, salta al siguiente cambio programado."""
+        while self.tasks or self._due:
+            if not self.tasks:
+                self.sleep(self._due[0][0] - self.now)
+                continue
+            fn, args = self.tasks.pop(0)
+            fn(*args)
+
+
+def _scheduler(window=0.15, max_latency=0.5):
+    t, frames = FakeTime(), []
+    sched = BroadcastScheduler(lambda room, s: frames.append((t.now, room, s)), window=window,
+                               max_latency=max_latency, start_task=t.start_task, sleep=t.sleep, clock=t.clock)
+    return sched, t, frames
+
+
+def test_burst_merges_into_one_frame_last_value_wins():
+    sched, t, frames = _scheduler()
+    sched.submit(counts={"s1": 1})
+    t.at(0.05, lambda: sched.submit(counts={"s1": 2, "s2": 1}))
+    t.at(0.10, lambda: sched.submit(counts={"s1": 3}, states={"s2": "done"}))
+    t.run()
+    assert frames == [(0.25, None, {"counts": {"s1": 3, "s2": 1}, "states": {"s2": "done"}})]
+    assert sched.stats()["merged"] == 2
+
+
+def test_max_latency_caps_an_endless_burst():
+    sched, t, frames = _scheduler(window=0.15, max_latency=0.5)
+    sched.submit(counts={"s1": 0})
+    for i in range(1, 20):   # un voto cada 0.1 s: la sala nunca queda en silencio
+        t.at(i * 0.1, lambda i=i: sched.submit(counts={"s1": i}))
+    t.run()
+    assert [(round(at, 2), s["counts"]["s1"]) for at, _, s in frames] == [(0.5, 5), (1.1, 11), (1.7, 17), (2.05, 19)]
+
+
+def test_rooms_are_flushed_independently():
+    sched, t, frames = _scheduler()
+    sched.submit("a", counts={"s1": 1})
+    sched.submit("b", counts={"s1": 9})
+    t.run()
+    assert sorted((room, s["counts"]["s1"]) for _, room, s in frames) == [("a", 1), ("b", 9)]
+
+
+def test_zero_window_emits_immediately():
+    sched, t, frames = _scheduler(window=0)
+    sched.submit(counts={"s1": 1})
+    sched.submit(counts={"s1": 2})
+    assert [s["counts"] for _, _, s in frames] == [{"s1": 1}, {"s1": 2}]
+    assert t.tasks == []
+
+
+def test_merged_burst_goes_out_as_a_single_delta():
+    t, frames = FakeTime(), []
+    updates = UpdateBroadcaster(lambda event, payload, to=None: frames.append(payload),
+                                window=0.15, max_latency=0.5, start_task=t.start_task, sleep=t.sleep)
+    updates.scheduler._clock = t.clock
+    for n in range(1, 6):
+        updates.publish(counts={"s1": n})
+    t.run()
+    assert frames == [{"seq": 1, "counts": {"s1": 5}, "states": {}}]
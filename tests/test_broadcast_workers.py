@@ -0,0 +1,72 @@
+# tests/test_broadcast_workers.py
+"""Dos workers sobre el mismo SQLite: el delta con mayor `seq` lleva el recuento más reciente."""
+from backend.services.broadcast import UpdateBroadcaster
+from backend.services.sqlite_backend import open_db, SqliteVoteStore, SqliteSequence
+
+
+def _worker(path, frames):
+    db = open_db(str(path))   # conexión propia, como un proceso de gunicorn
+    votes = SqliteVoteStore(db)
+    updates = UpdateBroadcaster(
+        lambda event, payload, to=None: frames.append(payload),
+        window=60, max_latency=60,
+        start_task=lambda fn, *a: None,   # sin drenado automático: los flush los decide el test
+        sequence=SqliteSequence(db),
+        recount=lambda ids: {sid: votes.count(sid) for sid in ids},
+    )
+    return votes, updates
+
+
+def _vote(votes, updates, device, song):
+    prev = votes.set(device, song)
+    counts = {song: votes.count(song)}
+    if prev is not None:
+        counts[prev] = votes.count(prev)
+    updates.publish(counts=counts)
+
+
+def _latest(frames, song):
+    """Lo que acaba viendo un cliente que aplica los deltas en orden de seq."""
+    value = None
+    for payload in sorted(frames, key=lambda p: p["seq"]):
+        if song in payload["counts"]:
+            value = payload["counts"][song]
+    return value
+
+
+def test_older_count_flushed_later_is_reread(tmp_path):
+    frames = []
+    path = tmp_path / "state.sqlite3"
+    votes_a, updates_a = _worker(path, frames)
+    votes_b, updates_b = _worker(path, frames)
+
+    _vote(votes_a, updates_a, "d1", "s1")   # A lee 1 y lo deja pendiente
+    _vote(votes_b, updates_b, "d2", "s1")   # B lee 2...
+    updates_b.scheduler.flush()             # ...y emite primero (seq 1)
+    updates_a.scheduler.flush()             # A emite después (seq 2)
+
+    assert [p["seq"] for p in frames] == [1, 2]
+    assert frames[1]["counts"] == {"s1": 2}
+    assert _latest(frames, "s1") == votes_a.count("s1") == 2
+
+
+def test_moved_vote_reports_zero_for_emptied_song(tmp_path):
+    frames = []
+    path = tmp_path / "state.sqlite3"
+    votes_a, updates_a = _worker(path, frames)
+    votes_b, updates_b = _worker(path, frames)
+
+    _vote(votes_a, updates_a, "d1", "s1")
+    _vote(votes_b, updates_b, "d1", "s2")   # el mismo dispositivo cambia de canción en otro worker
+    updates_b.scheduler.flush()
+    updates_a.scheduler.flush()
+
+    assert _latest(frames, "s1") == 0
+    assert _latest(frames, "s2") == 1
+
+
+def test_without_recount_counts_are_sent_as_published():
+    frames = []
+    updates = UpdateBroadcaster(lambda event, payload, to=None: frames.append(payload))
+    updates.publish(counts={"s1": 3})
+    assert frames == [{"seq": 1, "counts": {"s1": 3}, "states": {}}]
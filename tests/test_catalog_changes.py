@@ -0,0 +1,89 @@
+# tests/test_catalog_changes.py
+"""/catalog/changes: parches upsert/delete acumulados desde `since`, o reset."""
+import pytest
+
+from backend.services.catalog_store import CatalogRepository
+from backend.services.catalog_pipeline import catalog_delta
+
+ROWS = [
+    {"id": "a", "name": "Bohemian Rhapsody", "artist": "Queen", "genre": "Rock"},
+    {"id": "b", "name": "La Bamba", "artist": "Ritchie Valens", "genre": "Rock"},
+]
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = CatalogRepository(str(tmp_path / "catalog.sqlite3"), changelog_keep=5)
+    for r in ROWS:
+        repo.insert(r)
+    return repo
+
+
+def _apply(catalog, delta):
+    """Lo que hace el cliente con un parche."""
+    assert not delta["reset"]
+    by_id = {e["id"]: e for e in catalog}
+    for sid in delta["delete"]:
+        by_id.pop(sid, None)
+    for e in delta["upsert"]:
+        by_id[e["id"]] = e
+    return sorted(by_id.values(), key=lambda e: e["id"])
+
+
+def test_up_to_date_client_gets_an_empty_patch(repo):
+    v = repo.version()
+    assert catalog_delta(repo, v) == {"version": v, "since": v, "reset": False, "upsert": [], "delete": []}
+
+
+def test_upserts_are_merged_per_id(repo):
+    since = repo.version()
+    repo.update_field("a", "genre", "Opera")
+    repo.update_field("a", "year", "1975")
+    repo.insert({"id": "c", "name": "Despacito", "artist": "Luis Fonsi"})
+    delta = catalog_delta(repo, since)
+    assert delta["version"] == since + 3
+    assert [e["id"] for e in delta["upsert"]] == ["a", "c"]
+    assert delta["upsert"][0]["genre"] == "Opera" and delta["upsert"][0]["year"] == "1975"
+    assert delta["delete"] == []
+
+
+def test_deleted_and_disabled_songs_are_deletes(repo):
+    since = repo.version()
+    repo.delete(["a"])
+    repo.set_enabled({"b": False})
+    delta = catalog_delta(repo, since)
+    assert delta["upsert"] == [] and sorted(delta["delete"]) == ["a", "b"]
+
+
+def test_insert_then_delete_in_the_same_window(repo):
+    since = repo.version()
+    repo.insert({"id": "c", "name": "Despacito", "artist": "Luis Fonsi"})
+    repo.delete(["c"])
+    assert catalog_delta(repo, since)["delete"] == ["c"]
+
+
+def test_patch_matches_the_current_catalog(repo):
+    since = repo.version()
+    before = [{"id": r["id"], "title": r["name"], "artist": r["artist"], "genre": r["genre"]} for r in ROWS]
+    repo.update_field("b", "name", "La Bamba (live)")
+    repo.delete(["a"])
+    repo.insert({"id": "c", "name": "Despacito", "artist": "Luis Fonsi"})
+    after = _apply(before, catalog_delta(repo, since))
+    assert [(e["id"], e["title"]) for e in after] == [("b", "La Bamba (live)"), ("c", "Despacito")]
+
+
+def test_reset_after_import(repo, tmp_path):
+    since = repo.version()
+    csv_path = tmp_path / "catalog.csv"
+    csv_path.write_text("id;name;artist\nz;Zombie;The Cranberries\n", encoding="utf-8")
+    repo.import_csv(str(csv_path))
+    delta = catalog_delta(repo, since)
+    assert delta == {"version": repo.version(), "since": since, "reset": True}
+
+
+def test_reset_when_the_log_is_trimmed(repo):
+    since = repo.version()
+    for n in range(10):   # changelog_keep=5: los primeros cambios ya no están
+        repo.update_field("a", "year", str(1970 + n))
+    assert catalog_delta(repo, since)["reset"] is True
+    assert catalog_delta(repo, repo.version() - 2)["reset"] is False
@@ -0,0 +1,69 @@
+# tests/test_catalog_follower.py
+"""Las tres vistas en memoria siguen al repositorio, también con cambios hechos por otro worker."""
+import json
+
+import pytest
+
+from backend.services.catalog_store import CatalogRepository
+from backend.services.catalog_pipeline import CatalogJsonPipeline
+from backend.services.facet_index import FacetIndex
+from backend.services.search_index import SearchIndex
+
+ROWS = [
+    {"id": "a", "name": "Bohemian Rhapsody", "artist": "Queen", "genre": "Rock", "year": "1975"},
+    {"id": "b", "name": "La Bamba", "artist": "Ritchie Valens", "genre": "Rock", "year": "1958"},
+]
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Dos repositorios sobre el mismo fichero: dos procesos de gunicorn."""
+    db = str(tmp_path / "catalog.sqlite3")
+    here, other = CatalogRepository(db), CatalogRepository(db)
+    for r in ROWS:
+        here.insert(r)
+    return here, other
+
+
+def _views(repo, tmp_path):
+    return {
+        "search": SearchIndex().attach(repo),
+        "facets": FacetIndex().attach(repo),
+        "pipeline": CatalogJsonPipeline(repo, output=str(tmp_path / "catalog.json")),
+    }
+
+
+def test_local_changes_apply_incrementally(workers, tmp_path):
+    here, _ = workers
+    views = _views(here, tmp_path)
+    here.update_field("b", "genre", "Latin")
+    for view in views.values():
+        assert view.version == here.version()
+    assert views["facets"].query({"genre": ["Latin"]})[0]["id"] == "b"
+    assert json.loads((tmp_path / "catalog.json").read_text())[1]["genre"] == "Latin"
+
+
+def test_sync_catches_up_with_another_worker(workers, tmp_path):
+    here, other = workers
+    views = _views(here, tmp_path)
+    other.insert({"id": "c", "name": "Despacito", "artist": "Luis Fonsi", "genre": "Pop"})
+    other.delete(["a"])
+
+    assert views["search"].search("despacito")[0]["id"] == "c"   # search() hace sync
+    assert views["search"].search("bohemian") == []
+    assert dict(views["facets"].counts()["genre"]) == {"Rock": 1, "Pop": 1}
+    views["pipeline"].sync()
+    assert [e["id"] for e in views["pipeline"].catalog()] == ["b", "c"]
+    for view in views.values():
+        assert view.version == other.version()
+
+
+def test_sync_reloads_after_an_import(workers, tmp_path):
+    here, other = workers
+    views = _views(here, tmp_path)
+    csv_path = tmp_path / "catalog.csv"
+    csv_path.write_text("id;name;artist\nz;Zombie;The Cranberries\n", encoding="utf-8")
+    other.import_csv(str(csv_path))
+    views["pipeline"].sync()
+    assert [e["id"] for e in views["pipeline"].catalog()] == ["z"]
+    assert [h["id"] for h in views["search"].search("zombie")] == ["z"]
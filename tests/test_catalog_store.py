@@ -0,0 +1,55 @@
+# tests/test_catalog_store.py
+import os
+
+from backend.services.catalog_store import CatalogRepository
+
+HEADER = "id;name;artist;year;language;genre;popularity;duration;mood;key;tempo;enabled\n"
+
+
+def _write_csv(path, *rows):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER)
+        for sid, name in rows:
+            f.write(f"{sid};{name};Artist;;;;;;;;;Y\n")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))  # firma distinta aunque sea el mismo segundo
+
+
+def test_first_boot_imports_csv(tmp_path):
+    csv_path = tmp_path / "catalog.csv"
+    _write_csv(csv_path, ("a", "Uno"), ("b", "Dos"))
+    repo = CatalogRepository(str(tmp_path / "catalog.sqlite3"), str(csv_path))
+    assert [r["id"] for r in repo.all()] == ["a", "b"]
+
+
+def test_changed_csv_on_boot_keeps_app_edits(tmp_path):
+    csv_path, db = tmp_path / "catalog.csv", str(tmp_path / "catalog.sqlite3")
+    _write_csv(csv_path, ("a", "Uno"), ("b", "Dos"))
+    repo = CatalogRepository(db, str(csv_path))
+    repo.insert({"id": "app", "name": "Desde la app"})
+    repo.update_field("a", "name", "Uno (editado)")
+    repo.delete(["b"])
+
+    _write_csv(csv_path, ("a", "Uno"), ("b", "Dos"), ("c", "Tres"))   # deploy / checkout / touch
+    repo = CatalogRepository(db, str(csv_path))
+
+    assert repo.get("app")["name"] == "Desde la app"
+    assert repo.get("a")["name"] == "Uno (editado)"
+    assert repo.get("c")["name"] == "Tres"
+    assert not repo.exists("b")   # borrada desde la app: el CSV no la resucita
+
+
+def test_unchanged_csv_is_not_reread(tmp_path):
+    csv_path, db = tmp_path / "catalog.csv", str(tmp_path / "catalog.sqlite3")
+    _write_csv(csv_path, ("a", "Uno"))
+    version = CatalogRepository(db, str(csv_path)).version()
+    assert CatalogRepository(db, str(csv_path)).version() == version
+
+
+def test_import_csv_is_an_explicit_reset(tmp_path):
+    csv_path = tmp_path / "catalog.csv"
+    _write_csv(csv_path, ("a", "Uno"))
+    repo = CatalogRepository(str(tmp_path / "catalog.sqlite3"), str(csv_path))
+    repo.insert({"id": "app", "name": "Desde la app"})
+    assert repo.import_csv() == 1
+    assert not repo.exists("app")
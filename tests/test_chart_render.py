@@ -0,0 +1,109 @@
+# tests/test_chart_render.py
+"""Transposición y capo en el servidor: acordes correctos y columnas conservadas."""
+import pytest
+
+from backend.services.chart_render import RenderCache, parse_transform, render_chart, transpose_chord
+from backend.services.tab_parser import classify_line
+
+TAB = """[Verso]
+Em(079900)  C      G
+Hello darkness my old friend
+G        D  Em  C/B
+I've come to talk with you again
+[G]Sol [Em]tu
+Estribillo: C G
+"""
+
+
+def _columns(line):
+    kind, _, chords, _ = classify_line(line)
+    assert kind in ("chords", "section")
+    return [col for col, _ in chords]
+
+
+@pytest.mark.parametrize("chord, semitones, expected", [
+    ("C#m7/G#", 2, "D#m7/A#"),
+    ("Bb", 2, "C"),
+    ("Bb", -2, "Ab"),
+    ("Em(079900)", 2, "F#m(079900)"),   # la digitación no se toca
+    ("Am(CM7)", 2, "Bm(DM7)"),          # el acorde alternativo sí
+    ("Sol7", 2, "La7"),
+    ("Em", 12, "Em"),
+])
+def test_transpose_chord(chord, semitones, expected):
+    assert transpose_chord(chord, semitones) == expected
+
+
+def test_notation_and_accidentals():
+    assert transpose_chord("C#", 0, accidentals="flats") == "Db"
+    assert transpose_chord("Bb", 0, notation="latin") == "Sib"
+    assert transpose_chord("Sol", 0, notation="english") == "G"
+
+
+def test_transpose_keeps_chord_columns():
+    out = render_chart(TAB, 2).splitlines()
+    src = TAB.splitlines()
+    assert out[1] == "F#m(079900) D      A"
+    assert out[3] == "A        E  F#m D/C#"
+    assert _columns(out[1]) == _columns(src[1])
+    assert _columns(out[3]) == _columns(src[3])
+    assert out[2] == src[2] and out[4] == src[4]   # la letra no cambia
+    assert out[5] == "[A]Sol [F#m]tu"
+    assert out[6] == "Estribillo: D A"
+
+
+def test_capo_writes_shapes_below_and_header():
+    out = render_chart(TAB, 0, capo=2).splitlines()
+    assert out[0] == "Capo 2"
+    assert out[2] == "Dm(079900)  A#     F"
+    assert _columns(out[2]) == _columns(TAB.splitlines()[1])
+
+
+def test_transpose_and_capo_cancel_out():
+    out = render_chart(TAB, 3, capo=3)
+    assert out == "Capo 3\n" + TAB
+
+
+def test_identity_returns_the_text_untouched():
+    assert render_chart(TAB, 12) is TAB
+
+
+def test_shrinking_chord_pads_to_keep_columns():
+    line = "F#m   C#m  B"
+    out = render_chart(line, 1, accidentals="flats")
+    assert out == "Gm    Dm   C"
+    assert _columns(out) == _columns(line)
+
+
+@pytest.mark.parametrize("args, expected", [
+    ({}, None),
+    ({"transpose": "14"}, (2, 0, None, None)),
+    ({"transpose": "-1", "capo": "3", "notation": "Latin"}, (11, 3, "latin", None)),
+])
+def test_parse_transform(args, expected):
+    assert parse_transform(args) == expected
+
+
+@pytest.mark.parametrize("args, error", [
+    ({"transpose": "x"}, "transpose"),
+    ({"capo": "12"}, "capo"),
+    ({"notation": "solfa"}, "notation"),
+])
+def test_parse_transform_errors(args, error):
+    with pytest.raises(ValueError, match=error):
+        parse_transform(args)
+
+
+def test_render_cache_reuses_variants():
+    cache, loads = RenderCache(max_entries=1), []
+
+    def load():
+        loads.append(1)
+        return TAB
+
+    first = cache.get_or_render("h1", (2, 0, None, None), load)
+    assert cache.get_or_render("h1", (2, 0, None, None), load) is first
+    cache.get_or_render("h1", (5, 0, None, None), load)   # expulsa la primera variante
+    cache.get_or_render("h1", (2, 0, None, None), load)
+    assert len(loads) == 3
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,72 @@
+# tests/test_facet_index.py
+"""Facetado disyuntivo: cada faceta se cuenta con los filtros de las demás."""
+import pytest
+
+from backend.services.facet_index import FacetIndex, decade
+
+ROWS = [
+    {"id": "a", "name": "Bohemian Rhapsody", "artist": "Queen", "genre": "Rock", "year": "1975", "language": "en"},
+    {"id": "b", "name": "La Bamba", "artist": "Ritchie Valens", "genre": "Rock", "year": "1958", "language": "es"},
+    {"id": "c", "name": "Despacito", "artist": "Luis Fonsi", "genre": "Pop", "year": "2017", "language": "es"},
+    {"id": "d", "name": "Mediterráneo", "artist": "Serrat", "genre": "Pop", "year": "1971", "language": "es"},
+    {"id": "e", "name": "Sin género", "artist": "Queen", "enabled": "N"},
+]
+
+
+@pytest.fixture
+def facets():
+    index = FacetIndex()
+    index.rebuild(ROWS)
+    return index
+
+
+def _counts(facets, facet, filters=None):
+    return dict(map(tuple, facets.counts(filters)[facet]))
+
+
+def test_counts_without_filters(facets):
+    assert _counts(facets, "genre") == {"Rock": 2, "Pop": 2, "[Unknown]": 1}
+    assert _counts(facets, "decade") == {"1970s": 2, "1950s": 1, "2010s": 1, "[Unknown]": 1}
+    assert facets.counts()["genre"][0] == ["Pop", 2]   # empates por valor
+
+
+def test_selected_facet_keeps_its_own_alternatives(facets):
+    filters = {"genre": ["Rock"]}
+    assert _counts(facets, "genre", filters) == {"Rock": 2, "Pop": 2, "[Unknown]": 1}
+    assert _counts(facets, "language", filters) == {"en": 1, "es": 1}
+    assert _counts(facets, "decade", filters) == {"1970s": 1, "1950s": 1}
+
+
+def test_other_facets_narrow_each_count(facets):
+    filters = {"genre": ["Rock"], "language": ["es"]}
+    assert _counts(facets, "genre", filters) == {"Rock": 1, "Pop": 2}     # solo por idioma
+    assert _counts(facets, "language", filters) == {"en": 1, "es": 1}     # solo por género
+    assert _counts(facets, "artist", filters) == {"Ritchie Valens": 1}
+
+
+def test_values_within_a_facet_are_ored(facets):
+    filters = {"genre": ["Rock", "Pop"], "decade": ["1970s"]}
+    assert [e["id"] for e in facets.query(filters)] == ["a", "d"]
+    assert _counts(facets, "decade", filters) == {"1970s": 2, "1950s": 1, "2010s": 1}
+
+
+def test_unknown_matches_empty_and_unknown_facets_are_ignored(facets):
+    assert [e["id"] for e in facets.query({"genre": ["[Unknown]"]})] == ["e"]
+    assert len(facets.query({"mood": ["happy"], "genre": []})) == 5
+
+
+def test_query_groups(facets):
+    groups = facets.query({"language": ["es"]}, group="decade")
+    assert [[k, [e["id"] for e in v]] for k, v in groups] == [["1950s", ["b"]], ["1970s", ["d"]], ["2010s", ["c"]]]
+
+
+def test_reindex_moves_a_song_between_values(facets):
+    facets.index(dict(ROWS[1], genre="Latin"))
+    assert _counts(facets, "genre") == {"Pop": 2, "Rock": 1, "Latin": 1, "[Unknown]": 1}
+    facets.remove("a")
+    assert "Rock" not in _counts(facets, "genre")
+
+
+@pytest.mark.parametrize("year, expected", [("1975", "1970s"), ("2017-05-01", "2010s"), ("75", ""), ("", "")])
+def test_decade(year, expected):
+    assert decade(year) == expected
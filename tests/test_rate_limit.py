@@ -0,0 +1,69 @@
+# tests/test_rate_limit.py
+"""Token bucket con memoria acotada: recarga, caducidad (TTL) y expulsión LRU."""
+from backend.services.rate_limit import TokenBucketLimiter, allow_all
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _limiter(clock, **kw):
+    kw.setdefault("rate", 1)
+    kw.setdefault("burst", 2)
+    return TokenBucketLimiter(clock=clock, name="test", **kw)
+
+
+def test_burst_then_refill():
+    clock = Clock()
+    lim = _limiter(clock)
+    assert [lim.allow("ip") for _ in range(3)] == [True, True, False]
+    assert lim.retry_after("ip") == 1.0
+    clock.now = 1.0
+    assert lim.allow("ip") is True
+    assert lim.allow("ip") is False
+
+
+def test_idle_keys_expire_after_ttl():
+    clock = Clock()
+    lim = _limiter(clock)   # ttl por defecto = burst / rate = 2 s
+    assert lim.ttl == 2.0
+    lim.allow("a")
+    clock.now = 1.0
+    lim.allow("b")
+    clock.now = 2.5   # "a" lleva 2.5 s sin uso, "b" 1.5 s
+    lim.allow("c")
+    assert list(lim._buckets) == ["b", "c"]
+
+
+def test_expiring_a_key_does_not_change_decisions():
+    clock = Clock()
+    lim = _limiter(clock)
+    lim.allow("a")
+    lim.allow("a")
+    clock.now = lim.ttl   # justo al caducar el cubo ya estaría lleno otra vez
+    lim.allow("other")
+    assert "a" not in lim._buckets
+    assert [lim.allow("a") for _ in range(3)] == [True, True, False]
+
+
+def test_max_keys_evicts_least_recently_used():
+    clock = Clock()
+    lim = _limiter(clock, max_keys=2, ttl=3600)
+    lim.allow("a")
+    lim.allow("b")
+    lim.allow("a")   # "a" pasa a ser la más reciente
+    lim.allow("c")
+    assert len(lim) == 2
+    assert list(lim._buckets) == ["a", "c"]
+
+
+def test_allow_all_spends_nothing_on_rejection():
+    clock = Clock()
+    by_ip, by_device = _limiter(clock, burst=1), _limiter(clock, burst=3)
+    assert allow_all((by_ip, "ip"), (by_device, "dev")) is True
+    assert allow_all((by_ip, "ip"), (by_device, "dev")) is False
+    assert by_device.peek("dev", cost=2) is True   # el rechazo por IP no gastó la ficha del dispositivo
@@ -0,0 +1,94 @@
+# tests/test_search_index.py
+"""Búsqueda: prefijo sobre el último término, erratas de una edición y acentos."""
+import pytest
+
+from backend.services.catalog_store import CatalogRepository
+from backend.services.search_index import SearchIndex, _within_one, normalize
+
+ROWS = [
+    {"id": "hey", "name": "Hey Jude", "artist": "The Beatles", "genre": "Pop"},
+    {"id": "let", "name": "Let It Be", "artist": "The Beatles", "genre": "Pop"},
+    {"id": "bea", "name": "Beautiful Day", "artist": "U2", "genre": "Rock"},
+    {"id": "can", "name": "Canción del Mariachi", "artist": "Los Lobos", "genre": "Latin"},
+    {"id": "cel", "name": "Cel·la", "artist": "Els Pets", "genre": "Pop", "enabled": "N"},
+]
+LYRICS = {"let": "When I find myself in times of trouble, mother Mary comes to me"}
+
+
+@pytest.fixture
+def index(tmp_path):
+    repo = CatalogRepository(str(tmp_path / "catalog.sqlite3"))
+    for r in ROWS:
+        repo.insert(r)
+    return SearchIndex(lambda sid: LYRICS.get(sid, "")).attach(repo)
+
+
+def _ids(hits):
+    return [h["id"] for h in hits]
+
+
+def test_prefix_on_last_term(index):
+    assert set(_ids(index.search("bea"))) == {"hey", "let", "bea"}
+    assert _ids(index.search("beautiful da")) == ["bea"]
+    assert index.search("b") == []   # prefijos de una letra no se expanden
+
+
+def test_prefix_only_on_last_term(index):
+    assert index.search("bea jude") == []
+    assert _ids(index.search("jude bea")) == ["hey"]
+
+
+def test_exact_match_ranks_above_prefix_and_typo(index):
+    assert index.search("beatles")[0]["score"] > index.search("beatle")[0]["score"]
+    exact = index.search("jude")[0]["score"]
+    typo = index.search("jdue")[0]["score"]
+    assert exact > typo > 0
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("beatels", {"hey", "let"}),    # trasposición
+    ("beatle", {"hey", "let"}),     # prefijo
+    ("mariachy", {"can"}),          # sustitución
+    ("mariiachi", {"can"}),         # inserción
+    ("troble", {"let"}),            # borrado, en la letra
+])
+def test_typos(index, query, expected):
+    assert set(_ids(index.search(query))) == expected
+
+
+def test_short_terms_are_not_fuzzy(index):
+    assert index.search("jxdx") == []   # dos cambios
+    assert index.search("u3") == []   # menos de 4 letras: sin erratas
+
+
+def test_accents_and_catalan_middle_dot(index):
+    assert _ids(index.search("cancion")) == ["can"]
+    assert _ids(index.search("CANCIÓN")) == ["can"]
+    assert _ids(index.search("cella", include_disabled=True)) == ["cel"]
+    assert normalize("Cel·la Ça") == "cella ca"
+
+
+def test_disabled_songs_are_hidden_by_default(index):
+    assert index.search("pets") == []
+
+
+def test_index_follows_the_repository(index):
+    index.repo.update_field("hey", "name", "Hey Judy")
+    assert _ids(index.search("judy")) == ["hey"]
+    index.repo.delete(["bea"])
+    assert "bea" not in _ids(index.search("bea"))
+    assert "beautiful" not in index._vocab
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("jude", "jude", True),
+    ("jude", "jdue", True),
+    ("jude", "judy", True),
+    ("jude", "jud", True),
+    ("jude", "judes", True),
+    ("jude", "juded", True),
+    ("jude", "djeu", False),
+    ("jude", "ju", False),
+])
+def test_within_one(a, b, expected):
+    assert _within_one(a, b) is expected
@@ -0,0 +1,53 @@
+# tests/test_static_assets.py
+import gzip
+
+import pytest
+from flask import Flask
+
+from backend.services.static_assets import StaticAssets, pick_encoding
+from backend.services.song_text_cache import SongTextCache
+
+app = Flask(__name__)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("*;q=0.5, br;q=0", "gzip"),
+    ("gzip;q=0.9, br;q=0.1", "gzip"),
+    ("identity", None),
+    ("", None),
+])
+def test_pick_encoding_honours_q_values(header, expected):
+    with app.test_request_context(headers={"Accept-Encoding": header}):
+        assert pick_encoding(("br", "gzip")) == expected
+
+
+def test_pick_encoding_only_from_available():
+    with app.test_request_context(headers={"Accept-Encoding": "br"}):
+        assert pick_encoding(("gzip",)) is None
+
+
+def test_send_skips_refused_gzip(tmp_path):
+    path = tmp_path / "catalog.json"
+    path.write_text('{"songs": [' + ", ".join(['"x"'] * 200) + "]}")
+    assets = StaticAssets()
+    with app.test_request_context(headers={"Accept-Encoding": "gzip;q=0"}):
+        resp = assets.send(tmp_path, "catalog.json")
+        assert "Content-Encoding" not in resp.headers
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        resp = assets.send(tmp_path, "catalog.json")
+        resp.direct_passthrough = False
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(resp.get_data()) == path.read_bytes()
+
+
+def test_song_text_cache_skips_refused_encoding(tmp_path):
+    path = tmp_path / "TABx.txt"
+    path.write_text("C G Am F\n" * 100)
+    cache = SongTextCache()
+    with app.test_request_context(headers={"Accept-Encoding": "gzip;q=0, identity"}):
+        resp = cache.send(tmp_path, "TABx.txt", path)
+        assert "Content-Encoding" not in resp.headers
+        assert resp.get_data() == path.read_bytes()
@@ -0,0 +1,81 @@
+# tests/test_tab_parser.py
+import pytest
+
+from backend.services import tab_parser
+from backend.services.tab_parser import classify_line, parse_song, lyrics_only, model_lyrics
+
+SONG = """Cielito lindo
+[Intro]
+Do Sol Lam Fa
+
+[Verso 1]
+Am        G
+Si la vida te da la espalda
+   Lam       Mi7
+Si, Mi amor, no llores
+La La La
+"""
+
+
+@pytest.mark.parametrize("line", [
+    "Si la vida te da la espalda",
+    "Si, Mi amor",
+    "Mi amor, Si",
+    "La La La",
+    "Re Re Re",
+    "Si",
+])
+def test_latin_words_stay_lyrics(line):
+    assert classify_line(line)[0] == "lyric"
+
+
+@pytest.mark.parametrize("line, chords", [
+    ("Do Sol Lam Fa", ["Do", "Sol", "Lam", "Fa"]),
+    ("La Mi", ["La", "Mi"]),
+    ("Sol7", ["Sol7"]),
+    ("Am Sol C", ["Am", "Sol", "C"]),
+    ("Re/Fa#  Mi", ["Re/Fa#", "Mi"]),
+])
+def test_latin_chord_lines(line, chords):
+    kind, _, found, _ = classify_line(line)
+    assert kind == "chords"
+    assert [c for _, c in found] == chords
+
+
+def test_bracketed_latin_roots_are_chords():
+    kind, text, chords, _ = classify_line("[La]que te [Mi]quiero")
+    assert (kind, text, chords) == ("lyric", "que te quiero", ((0, "La"), (7, "Mi")))
+
+
+def test_latin_chords_in_section_line():
+    kind, _, chords, label = classify_line("Estribillo: Do Sol")
+    assert (kind, label, [c for _, c in chords]) == ("section", "Estribillo", ["Do", "Sol"])
+
+
+def test_spanish_lyrics_survive():
+    lyrics = lyrics_only(SONG)
+    assert "Si la vida te da la espalda" in lyrics
+    assert "Si, Mi amor, no llores" in lyrics
+    assert "La La La" in lyrics
+    assert "Do Sol" not in lyrics
+
+
+def test_model_lyrics_matches_lyrics_only():
+    assert model_lyrics(parse_song(SONG)) == lyrics_only(SONG)
+
+
+def test_parse_paste_classifies_each_line_once(monkeypatch):
+    from backend.api import ingest
+
+    calls = []
+    real = tab_parser.classify_line
+
+    def counting(line):
+        calls.append(line)
+        return real(line)
+
+    monkeypatch.setattr(tab_parser, "classify_line", counting)
+    info = ingest._parse_paste(SONG)
+    assert len(calls) == len(SONG.splitlines())
+    assert info["lyrics_guess"] == lyrics_only(SONG)
+    assert info["chords"][:4] == ["Do", "Sol", "Lam", "Fa"]
@@ -0,0 +1,46 @@
+# tests/test_thumbnails.py
+import os
+
+from backend.services import thumbnails
+from backend.services.thumbnails import ThumbnailPipeline, ThumbJob
+
+
+def _run(pipeline, items):
+    job = ThumbJob(items)
+    pipeline.run(items, job=job)
+    return job
+
+
+def test_touch_does_not_regenerate_and_hub_never_hashes(tmp_path, monkeypatch):
+    src = tmp_path / "queen.jpg"
+    src.write_bytes(b"jpeg-bytes" * 100)
+    pipeline = ThumbnailPipeline(tmp_path / "thumbs", workers=1)
+    assert _run(pipeline, [("Queen", src)]).generated == 1
+
+    def no_hash_on_hub(path):
+        raise AssertionError("file_sha1 en el hilo del hub")
+
+    monkeypatch.setattr(thumbnails, "file_sha1", no_hash_on_hub)   # los procesos del pool no lo ven
+    st = os.stat(src)
+    os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))   # touch
+    job = _run(pipeline, [("Queen", src)])
+    assert (job.generated, job.skipped, job.errors) == (0, 1, 0)
+    assert _run(pipeline, [("Queen", src)]).skipped == 1   # la firma nueva quedó guardada
+
+
+def test_stale_variants_are_deleted(tmp_path):
+    out = tmp_path / "thumbs"
+    old_src = tmp_path / "queen.jpg"
+    old_src.write_bytes(b"old" * 100)
+    pipeline = ThumbnailPipeline(out, workers=1)
+    _run(pipeline, [("Queen", old_src)])
+    old_files = {v["file"] for v in pipeline._index["Queen"]["variants"]}
+    assert all((out / f).exists() for f in old_files)
+
+    new_src = tmp_path / "queen.png"
+    new_src.write_bytes(b"new" * 100)
+    assert _run(pipeline, [("Queen", new_src)]).generated == 1
+    new_files = {v["file"] for v in pipeline._index["Queen"]["variants"]}
+    assert all((out / f).exists() for f in new_files)
+    assert not any((out / f).exists() for f in old_files - new_files)
+    assert pipeline.manifest()["Queen"] in new_files
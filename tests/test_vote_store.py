@@ -0,0 +1,70 @@
+# tests/test_vote_store.py
+"""Votos en memoria con volcado diferido (write-behind) al JSON."""
+import json
+import time
+
+from backend.services.persist import WriteBehind
+from backend.services.vote_store import VoteStore
+
+
+def _store(tmp_path, **kw):
+    kw.setdefault("flush_interval", 3600)   # el hilo de fondo no vuelca durante el test
+    return VoteStore(str(tmp_path / "votes.json"), **kw)
+
+
+def test_votes_are_not_written_until_flush(tmp_path):
+    store = _store(tmp_path)
+    assert store.set("d1", "imagine") is None
+    assert store.set("d1", "yesterday") == "imagine"
+    assert not (tmp_path / "votes.json").exists()
+    assert store.flush() is True
+    assert json.loads((tmp_path / "votes.json").read_text()) == {"d1": "yesterday"}
+    assert store.flush() is False   # nada pendiente
+
+
+def test_flushed_totals_survive_a_restart(tmp_path):
+    store = _store(tmp_path)
+    for device, song in [("d1", "imagine"), ("d2", "imagine"), ("d3", "yesterday"), ("d3", "imagine")]:
+        store.set(device, song)
+    store.flush()
+    again = _store(tmp_path)
+    assert again.counts() == {"imagine": 3}
+    assert again.get("d3") == "imagine"
+    assert len(again) == 3
+
+
+def test_repeated_vote_does_not_mark_pending(tmp_path):
+    store = _store(tmp_path)
+    store.set("d1", "imagine")
+    store.flush()
+    store.set("d1", "imagine")
+    assert store._persist.pending == 0
+
+
+def test_threshold_wakes_the_flusher(tmp_path):
+    store = _store(tmp_path, flush_threshold=3)
+    for i in range(3):
+        store.set(f"d{i}", "imagine")
+    path = tmp_path / "votes.json"
+    deadline = time.monotonic() + 2
+    while not path.exists() and time.monotonic() < deadline:   # el hilo vuelca antes del intervalo
+        time.sleep(0.01)
+    assert json.loads(path.read_text()) == {"d0": "imagine", "d1": "imagine", "d2": "imagine"}
+
+
+def test_failed_write_keeps_changes_pending():
+    written, fail = [], [True]
+
+    def write(data):
+        if fail[0]:
+            raise OSError("disco lleno")
+        written.append(data)
+
+    wb = WriteBehind(lambda: {"d1": "imagine"}, write, interval=3600)
+    wb._thread = object()   # sin hilo de fondo: solo flush() explícito
+    wb.touch(2)
+    assert wb.flush() is False
+    assert wb.pending == 2
+    fail[0] = False
+    assert wb.flush() is True
+    assert written == [{"d1": "imagine"}] and wb.pending == 0
@@ -0,0 +1,38 @@
+# tests/test_vote_tally.py
+"""El recuento incremental coincide con recontar todos los votos."""
+import random
+from collections import Counter
+
+from backend.services.vote_tally import VoteTally
+
+
+def test_move_keeps_counts_and_devices():
+    tally = VoteTally({"d1": "imagine", "d2": "imagine"})
+    tally.move("d2", "imagine", "yesterday")
+    assert tally.counts() == {"imagine": 1, "yesterday": 1}
+    assert tally.devices("yesterday") == {"d2"}
+    tally.move("d1", "imagine", None)   # voto retirado: la canción desaparece
+    assert tally.counts() == {"yesterday": 1}
+    assert tally.by_song() == {"yesterday": ["d2"]}
+
+
+def test_moves_are_idempotent():
+    tally = VoteTally()
+    tally.move("d1", None, "imagine")
+    tally.move("d1", None, "imagine")
+    tally.move("d1", "imagine", "imagine")
+    tally.move("d9", "yesterday", None)   # prev desconocido
+    assert tally.counts() == {"imagine": 1}
+
+
+def test_matches_a_full_recount():
+    rnd = random.Random(7)
+    votes, tally = {}, VoteTally()
+    for _ in range(2000):
+        device, song = f"d{rnd.randrange(50)}", rnd.choice(["a", "b", "c", None])
+        tally.move(device, votes.get(device), song)
+        if song is None:
+            votes.pop(device, None)
+        else:
+            votes[device] = song
+    assert tally.counts() == dict(Counter(votes.values()))